@@ -1,11 +1,18 @@
 from flask import Flask, request, jsonify, render_template
 from backend.broker_integration.broker import broker
+from backend.broker_integration.order_store import order_store
+from backend.cache.swr import StaleWhileRevalidateCache
 from backend.sentiment_analysis.analyzer import SentimentAnalyzer
 from backend.technical_analysis.analyzer import TechnicalAnalyzer
 from backend.fundamental_analysis.analyzer import FundamentalAnalyzer
+from backend.fundamental_analysis.snapshot import FundamentalsSnapshot
 from backend.recommendation_engine.recommender import TradeRecommender
+from backend.screener.screener import get_index_stocks
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
 from dotenv import load_dotenv
 import os
+import threading
+import time
 
 load_dotenv()
 
@@ -15,12 +22,63 @@ app = Flask(__name__,
 )
 app.secret_key = os.urandom(24)
 
+# Per-component time budgets in seconds for /api/v1/analyze, measured from the
+# start of the request. A component past its budget is left out of the
+# response; a cache-backed load keeps running and fills the cache for later.
+ANALYSIS_TIMEOUTS = {
+    'sentiment': float(os.getenv('ANALYZE_SENTIMENT_TIMEOUT', 6)),
+    'technical': float(os.getenv('ANALYZE_TECHNICAL_TIMEOUT', 5)),
+    'fundamental': float(os.getenv('ANALYZE_FUNDAMENTAL_TIMEOUT', 8))
+}
+
 # Initialize analyzers
 sentiment_analyzer = SentimentAnalyzer()
-technical_analyzer = TechnicalAnalyzer()
-fundamental_analyzer = FundamentalAnalyzer()
+technical_analyzer = TechnicalAnalyzer(timeout=ANALYSIS_TIMEOUTS['technical'])
+fundamental_snapshot = FundamentalsSnapshot()
+fundamental_snapshot.start(get_index_stocks())   # Daily snapshot of the screener universe
+fundamental_analyzer = FundamentalAnalyzer(snapshot=fundamental_snapshot)
 recommender = TradeRecommender()
 
+def load_sentiment(symbol):
+    """Sentiment for the cache, or None when no source answered so the stale value is kept"""
+    sentiment = sentiment_analyzer.analyze(symbol)
+    return sentiment if sentiment and sentiment.get('sources') else None
+
+def load_fundamentals(symbol):
+    """Fundamentals for the cache, or None when the symbol returned no metrics"""
+    return fundamental_analyzer.analyze(symbol) or None
+
+# Sentiment and fundamentals change slowly and come from rate-limited APIs;
+# requests are answered from these caches and refreshed in the background
+sentiment_cache = StaleWhileRevalidateCache(
+    load_sentiment,
+    soft_ttl=300,
+    hard_ttl=3600,
+    max_size=2000
+)
+fundamental_cache = StaleWhileRevalidateCache(
+    load_fundamentals,
+    soft_ttl=6 * 3600,
+    hard_ttl=24 * 3600,
+    max_size=2000,
+    negative_ttl=300
+)
+
+# Shared by all requests so each analysis does not start its own threads. Work
+# is only submitted while a worker is free, so calls that outlive their budget
+# cannot queue up later requests behind them.
+ANALYZE_WORKERS = int(os.getenv('ANALYZE_WORKERS', 16))
+analysis_executor = ThreadPoolExecutor(max_workers=ANALYZE_WORKERS, thread_name_prefix='analyze')
+analysis_slots = threading.BoundedSemaphore(ANALYZE_WORKERS)
+
+def submit_analysis(fn, symbol):
+    """Run fn(symbol) on a free analysis worker; None when every worker is busy"""
+    if not analysis_slots.acquire(blocking=False):
+        return None
+    future = analysis_executor.submit(fn, symbol)
+    future.add_done_callback(lambda _: analysis_slots.release())
+    return future
+
 @app.route('/')
 def index():
     """Render the main page"""
@@ -56,24 +114,47 @@ def analyze():
 
     symbol = data['symbol']
     
-    # Perform analysis
-    sentiment_score = sentiment_analyzer.analyze(symbol)
-    technical_signals = technical_analyzer.analyze(symbol)
-    fundamental_metrics = fundamental_analyzer.analyze(symbol)
+    # Run the analyses concurrently; latency is bounded by the slowest allowed component
+    start = time.monotonic()
+    futures = {
+        'sentiment': submit_analysis(sentiment_cache.get, symbol),
+        'technical': submit_analysis(technical_analyzer.analyze, symbol),
+        'fundamental': submit_analysis(fundamental_cache.get, symbol)
+    }
+    rejected = [component for component, future in futures.items() if future is None]
+    if len(rejected) == len(futures):
+        return jsonify({'error': 'Analysis capacity exhausted, retry shortly'}), 503, {'Retry-After': '1'}
+    
+    results = {component: None for component in futures}
+    timed_out = []
+    for component, future in futures.items():
+        if future is None:
+            app.logger.warning(f"No free worker for {component} analysis of {symbol}")
+            continue
+        remaining = ANALYSIS_TIMEOUTS[component] - (time.monotonic() - start)
+        try:
+            results[component] = future.result(timeout=max(remaining, 0))
+        except TimeoutError:
+            app.logger.warning(f"Timed out running {component} analysis for {symbol}")
+            timed_out.append(component)
+        except Exception as e:
+            app.logger.error(f"Error running {component} analysis for {symbol}: {str(e)}")
     
-    # Generate recommendation
+    # Generate recommendation from whichever components answered
     recommendation = recommender.get_recommendation(
-        sentiment_score,
-        technical_signals,
-        fundamental_metrics
+        results['sentiment'],
+        results['technical'],
+        results['fundamental']
     )
     
     return jsonify({
         'symbol': symbol,
-        'sentiment': sentiment_score,
-        'technical': technical_signals,
-        'fundamental': fundamental_metrics,
-        'recommendation': recommendation
+        'sentiment': results['sentiment'],
+        'technical': results['technical'],
+        'fundamental': results['fundamental'],
+        'recommendation': recommendation,
+        'timed_out': timed_out,
+        'rejected': rejected
     })
 
 @app.route('/api/v1/trade', methods=['POST'])
@@ -139,6 +220,7 @@ def webhook():
             # Handle order updates
             order_id = data.get('order_id')
             status = data.get('status')
+            order_store.apply_postback(data)
             app.logger.info(f"Order {order_id} status updated to {status}")
         elif feed_type == 'position':
             # Handle position updates
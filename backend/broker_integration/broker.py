@@ -1,37 +1,107 @@
-from flask import current_app
+from flask import current_app, has_app_context
+from concurrent.futures import ThreadPoolExecutor
 import os
 from dotenv import load_dotenv
+from backend.broker_integration.instruments import InstrumentIndex
+from backend.broker_integration.order_store import order_store
+from backend.broker_integration.rate_limiter import TokenBucket
+from backend.broker_integration.session import BrokerSession
+from backend.market_data.feed import MarketDataFeed
 
 load_dotenv()
 
+# Basket orders are dicts of these fields on every broker:
+#   symbol, quantity, transaction_type ('BUY'/'SELL'),
+#   order_type ('MARKET' or 'LIMIT', default 'MARKET'), price (LIMIT only),
+#   stop_loss and target (optional)
+
+def _place_basket(place, orders, max_workers, rate_limiter=None):
+    """Submit orders concurrently and collect per-order results and failures"""
+    app = current_app._get_current_object() if has_app_context() else None
+
+    def submit(order):
+        try:
+            if rate_limiter:
+                rate_limiter.acquire()
+            if app is None:
+                result = place(**order)
+            else:
+                with app.app_context():
+                    result = place(**order)
+            if not result or result.get('status') == 'error':
+                message = result.get('message') if result else 'No response from broker'
+                return {'symbol': order.get('symbol'), 'status': 'error', 'error': message}
+            return {'symbol': order.get('symbol'), 'status': 'success', 'order': result}
+        except Exception as e:
+            return {'symbol': order.get('symbol'), 'status': 'error', 'error': str(e)}
+
+    if not orders:
+        return {'status': 'success', 'succeeded': 0, 'failed': 0, 'results': []}
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(orders))) as executor:
+        results = list(executor.map(submit, orders))
+
+    failed = sum(1 for r in results if r['status'] == 'error')
+    if failed == 0:
+        status = 'success'
+    elif failed == len(results):
+        status = 'error'
+    else:
+        status = 'partial'
+    return {'status': status, 'succeeded': len(results) - failed, 'failed': failed, 'results': results}
+
 class AngelBroker:
     def __init__(self):
         self.api_key = os.getenv('ANGEL_API_KEY')
         self.client_id = os.getenv('ANGEL_CLIENT_ID')
         self.pin = os.getenv('ANGEL_PIN')
         self.totp_key = os.getenv('ANGEL_TOTP_KEY')
-        self.smart_api = SmartConnect(api_key=self.api_key)
-        self.access_token = None
-        self.refresh_token = None
-        self.feed_token = None
+        # Pooled keep-alive connections and background token renewal, shared across threads
+        self.session = BrokerSession(self.api_key, self.client_id, self.pin, self.totp_key)
+        # Symbol -> token index, loaded from disk and refreshed daily in the background
+        self.instruments = InstrumentIndex()
+        self.instruments.start()
+        # Order state kept current by postbacks instead of order book downloads
+        self.order_store = order_store
+        self.reconcile_interval = int(os.getenv('ORDER_RECONCILE_INTERVAL', 60))
+        # Shared across basket submissions so bursts stay within the broker's order rate
+        self.order_rate_limiter = TokenBucket(float(os.getenv('BROKER_ORDER_RATE', 10)))
+        self.market_feed = None
+
+    @property
+    def smart_api(self):
+        return self.session.client
+
+    @property
+    def access_token(self):
+        return self.session.access_token
+
+    @property
+    def refresh_token(self):
+        return self.session.refresh_token
+
+    @property
+    def feed_token(self):
+        return self.session.feed_token
 
     def login(self):
         """Login to Angel Broking"""
         try:
-            totp = pyotp.TOTP(self.totp_key)
-            data = self.smart_api.generateSession(
-                self.client_id,
-                self.pin,
-                totp.now()
-            )
-            self.refresh_token = data['data']['refreshToken']
-            self.access_token = data['data']['jwtToken']
-            self.feed_token = self.smart_api.getfeedToken()
+            self.session.login()
+            self.session.start()
+            self._seed_order_store()
             return True
         except Exception as e:
             current_app.logger.error(f"Error logging in: {str(e)}")
             return False
 
+    def start_market_feed(self, symbols):
+        """Stream ticks for symbols over the feed token instead of polling prices"""
+        if self.market_feed is None:
+            self.market_feed = MarketDataFeed(self.session, self.instruments)
+        self.market_feed.start(symbols)
+        return self.market_feed
+
     def get_profile(self):
         """Get user profile"""
         try:
@@ -59,14 +129,19 @@ class AngelBroker:
     def execute_trade(self, symbol, transaction_type, quantity, price=None):
         """Execute a trade"""
         try:
-            if not self.access_token:
-                raise Exception("Not authenticated with Angel Broking")
+            # Normally a no-op: the session renews itself ahead of expiry
+            self.session.ensure_session()
+
+            # Resolve the token locally; never search the broker on the order path
+            token = self._get_token(symbol)
+            if token is None:
+                raise Exception(f"No instrument token found for {symbol}")
 
             # Prepare order parameters
             order_params = {
                 "variety": "NORMAL",
                 "tradingsymbol": symbol,
-                "symboltoken": self._get_token(symbol),
+                "symboltoken": token,
                 "transactiontype": transaction_type,  # "BUY" or "SELL"
                 "exchange": "NSE",
                 "ordertype": "MARKET" if price is None else "LIMIT",
@@ -80,19 +155,56 @@ class AngelBroker:
 
             # Place order
             order_id = self.smart_api.placeOrder(order_params)
+            if not order_id:
+                raise Exception("Order rejected by broker")
+            self.order_store.upsert({
+                "orderid": order_id,
+                "tradingsymbol": symbol,
+                "transactiontype": transaction_type,
+                "quantity": quantity,
+                "status": "open pending"
+            })
             return {"status": "success", "order_id": order_id}
         except Exception as e:
             current_app.logger.error(f"Error executing trade: {str(e)}")
             return {"status": "error", "message": str(e)}
 
+    def _place_basket_item(self, symbol, quantity, transaction_type, order_type="MARKET", price=None,
+                           stop_loss=None, target=None):
+        """execute_trade for one basket order
+
+        NORMAL orders cannot carry a stop loss or target, so an order with
+        either is rejected rather than placed without its protection.
+        """
+        if stop_loss is not None or target is not None:
+            return {"status": "error", "message": "Stop loss and target are not supported on Angel basket orders"}
+        return self.execute_trade(symbol, transaction_type, quantity, price if order_type == "LIMIT" else None)
+
+    def place_basket_order(self, orders, max_workers=10, rate_limiter=None):
+        """Place several orders concurrently
+
+        Each order is a basket order dict (see the top of this module).
+        Returns one response with per-order results; status is 'partial' if
+        only some failed. Orders are paced by rate_limiter, by default the
+        broker's own order rate limiter.
+        """
+        return _place_basket(self._place_basket_item, orders, max_workers, rate_limiter or self.order_rate_limiter)
+
+    def _seed_order_store(self):
+        """Seed the order store once and start the reconciliation sweep"""
+        if not self.order_store.seeded:
+            orders = self.get_order_book()
+            if orders is None:
+                return
+            self.order_store.seed(orders)
+        self.order_store.start_reconciliation(self.get_order_book, self.reconcile_interval)
+
     def get_order_status(self, order_id):
         """Get status of an order"""
         try:
-            orders = self.smart_api.orderBook()
-            for order in orders['data']:
-                if order['orderid'] == order_id:
-                    return order['status']
-            return None
+            if not self.order_store.seeded:
+                self._seed_order_store()
+            return self.order_store.get_status(order_id)
         except Exception as e:
             current_app.logger.error(f"Error fetching order status: {str(e)}")
             return None
@@ -124,10 +236,7 @@ class AngelBroker:
     def _get_token(self, symbol):
         """Get token for a symbol"""
         try:
-            # You might want to maintain a cache of symbols and their tokens
-            # For now, we'll need to implement this based on your needs
-            # You can use self.smart_api.searchScrip() or maintain a mapping
-            pass
+            return self.instruments.get_token(symbol)
         except Exception as e:
             current_app.logger.error(f"Error getting token for symbol {symbol}: {str(e)}")
             return None
@@ -182,21 +291,48 @@ class BrokerClient:
             current_app.logger.error(f"Error fetching holdings: {str(e)}")
             return None
 
-    def place_order(self, symbol, quantity, side, order_type="MARKET"):
+    def get_positions(self):
+        """Get mock open positions"""
+        try:
+            return []
+        except Exception as e:
+            current_app.logger.error(f"Error fetching positions: {str(e)}")
+            return None
+
+    def get_portfolio_value(self):
+        """Get mock portfolio value"""
+        try:
+            return 1000000.0
+        except Exception as e:
+            current_app.logger.error(f"Error fetching portfolio value: {str(e)}")
+            return None
+
+    def place_order(self, symbol, quantity, transaction_type, order_type="MARKET", stop_loss=None, target=None):
         """Place mock order"""
         try:
             return {
                 "order_id": "mock_order_123",
                 "symbol": symbol,
                 "quantity": quantity,
-                "side": side,
+                "transaction_type": transaction_type,
                 "order_type": order_type,
+                "stop_loss": stop_loss,
+                "target": target,
                 "status": "PLACED"
             }
         except Exception as e:
             current_app.logger.error(f"Error placing order: {str(e)}")
             return None
 
+    def _place_basket_item(self, symbol, quantity, transaction_type, order_type="MARKET", price=None,
+                           stop_loss=None, target=None):
+        """place_order for one basket order"""
+        return self.place_order(symbol, quantity, transaction_type, order_type=order_type, stop_loss=stop_loss, target=target)
+
+    def place_basket_order(self, orders, max_workers=10, rate_limiter=None):
+        """Place several mock orders concurrently, paced by rate_limiter if given"""
+        return _place_basket(self._place_basket_item, orders, max_workers, rate_limiter)
+
     def get_order_status(self, order_id):
         """Get mock order status"""
         try:
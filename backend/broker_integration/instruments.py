@@ -0,0 +1,166 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+import numpy as np
+import requests
+
+logger = logging.getLogger(__name__)
+
+INSTRUMENT_MASTER_URL = "https://margincalculator.angelbroking.com/OpenAPI_File/files/OpenAPIScripMaster.json"
+
+class InstrumentIndex:
+    """Memory-mapped symbol -> token index built from the Angel instrument master
+
+    The index is an open-addressing hash table stored as a structured numpy
+    array of (64-bit key hash, token) slots. It is saved with np.save and
+    opened with mmap_mode='r', so startup costs one mmap and a lookup is a
+    hash plus (on average) one or two slot probes. A daemon thread rebuilds
+    the file from the instrument master once a day and swaps it in atomically;
+    lookups never wait on it.
+    """
+
+    SLOT_DTYPE = np.dtype([('hash', '<u8'), ('token', '<i8')])
+
+    def __init__(self, cache_dir=None, url=INSTRUMENT_MASTER_URL, exchanges=('NSE', 'BSE'),
+                 refresh_interval=24 * 60 * 60):
+        self.cache_dir = cache_dir or os.getenv(
+            'SMART_TRADER_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.smart_trader')
+        )
+        self.path = os.path.join(self.cache_dir, 'instrument_index.npy')
+        self.url = url
+        self.exchanges = set(exchanges)
+        self.refresh_interval = refresh_interval  # Seconds between instrument master downloads
+        self._table = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __len__(self):
+        table = self._table
+        return 0 if table is None else int(np.count_nonzero(table['hash']))
+
+    @property
+    def loaded(self):
+        return self._table is not None
+
+    @staticmethod
+    def _hash(key):
+        """Stable 64-bit hash of an index key; 0 is reserved for empty slots"""
+        value = int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), 'little')
+        return value or 1
+
+    @staticmethod
+    def _key(symbol, exchange='NSE'):
+        """Normalise 'RELIANCE.NS' / 'RELIANCE-EQ' style symbols to an index key"""
+        symbol = symbol.upper()
+        if symbol.endswith('.NS'):
+            symbol, exchange = symbol[:-3], 'NSE'
+        elif symbol.endswith('.BO'):
+            symbol, exchange = symbol[:-3], 'BSE'
+        return f"{exchange}:{symbol}"
+
+    def get_token(self, symbol, exchange='NSE'):
+        """Look up the symbol token; returns None if unknown or the index is not loaded yet"""
+        table = self._table
+        if table is None:
+            return None
+
+        hashes = table['hash']
+        mask = len(table) - 1
+        h = self._hash(self._key(symbol, exchange))
+        i = h & mask
+        while True:
+            slot_hash = hashes[i]
+            if slot_hash == h:
+                return str(table['token'][i])
+            if slot_hash == 0:
+                return None
+            i = (i + 1) & mask
+
+    def build(self, records):
+        """Build a hash table from instrument master records"""
+        keys, tokens = [], []
+        for record in records:
+            exchange = record.get('exch_seg')
+            token = str(record.get('token', ''))
+            if exchange not in self.exchanges or not token.isdigit():
+                continue
+            symbol = record['symbol'].upper()
+            keys.append(f"{exchange}:{symbol}")
+            tokens.append(int(token))
+            # Equity series are also reachable by the bare name, e.g. NSE:RELIANCE
+            if symbol.endswith('-EQ'):
+                keys.append(f"{exchange}:{symbol[:-3]}")
+                tokens.append(int(token))
+
+        # Keep the load factor at or below one half
+        size = 1 << max(4, (2 * len(keys) - 1).bit_length())
+        mask = size - 1
+        hashes = [0] * size
+        slot_tokens = [0] * size
+        for key, token in zip(keys, tokens):
+            h = self._hash(key)
+            i = h & mask
+            while hashes[i] not in (0, h):
+                i = (i + 1) & mask
+            hashes[i] = h
+            slot_tokens[i] = token
+
+        table = np.zeros(size, dtype=self.SLOT_DTYPE)
+        table['hash'] = hashes
+        table['token'] = slot_tokens
+        return table
+
+    def load(self):
+        """Memory-map the cached index if there is one"""
+        try:
+            if os.path.exists(self.path):
+                self._table = np.load(self.path, mmap_mode='r')
+                return True
+        except Exception as e:
+            logger.error(f"Error loading instrument index: {str(e)}")
+        return False
+
+    def refresh(self):
+        """Download the instrument master, rebuild the index and swap it in"""
+        try:
+            response = requests.get(self.url, timeout=60)
+            response.raise_for_status()
+            table = self.build(response.json())
+
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp.npy"
+            np.save(tmp_path, table)
+            os.replace(tmp_path, self.path)
+            self._table = np.load(self.path, mmap_mode='r')
+            logger.info(f"Instrument index refreshed with {len(self)} keys")
+            return True
+        except Exception as e:
+            logger.error(f"Error refreshing instrument index: {str(e)}")
+            return False
+
+    def _age(self):
+        try:
+            return time.time() - os.path.getmtime(self.path)
+        except OSError:
+            return None
+
+    def _refresh_loop(self):
+        age = self._age()
+        delay = 0 if age is None or age >= self.refresh_interval else self.refresh_interval - age
+        while not self._stop.wait(delay):
+            self.refresh()
+            delay = self.refresh_interval
+
+    def start(self):
+        """Load the cached index and keep it refreshed in the background"""
+        self.load()
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._refresh_loop, name='instrument-index', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop the background refresh"""
+        self._stop.set()
@@ -0,0 +1,147 @@
+import itertools
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from backend.broker_integration.rate_limiter import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+# Job states reported by OrderQueue.get
+QUEUED = 'QUEUED'
+RUNNING = 'RUNNING'
+COMPLETED = 'COMPLETED'
+FAILED = 'FAILED'
+
+class OrderQueue:
+    """Bounded, prioritised order pipeline drained by worker threads
+
+    submit() returns a tracking id immediately; workers call the handler for
+    each job in priority order, paced by a token bucket that follows the
+    broker's order rate limit. Repeated submissions with the same idempotency
+    key return the original tracking id instead of placing a second order,
+    unless that job failed: a failed job releases its key so it can be retried.
+    """
+
+    _STOP = object()
+
+    def __init__(self, handler, workers=4, maxsize=100, rate_limiter=None, max_history=10000):
+        self.handler = handler
+        self.workers = workers
+        self.max_history = max_history  # Finished jobs kept for status lookups
+        self.rate_limiter = rate_limiter or TokenBucket(float(os.getenv('BROKER_ORDER_RATE', 10)))
+        self._queue = queue.PriorityQueue(maxsize)
+        self._jobs = OrderedDict()
+        self._idempotency = {}
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+        self._threads = []
+
+    def start(self):
+        """Start the worker threads"""
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f'order-worker-{i}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def stop(self):
+        """Let workers finish queued jobs and exit"""
+        for _ in self._threads:
+            self._queue.put((float('inf'), next(self._sequence), None, self._STOP))
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def submit(self, payload, priority=0, idempotency_key=None):
+        """Queue a job and return its tracking id
+
+        Higher priority runs first. Raises queue.Full when the queue is at
+        capacity so callers can shed load instead of blocking.
+        """
+        self.start()
+        with self._lock:
+            if idempotency_key is not None and idempotency_key in self._idempotency:
+                return self._idempotency[idempotency_key]
+
+            tracking_id = uuid.uuid4().hex
+            self._jobs[tracking_id] = {
+                'tracking_id': tracking_id,
+                'idempotency_key': idempotency_key,
+                'status': QUEUED,
+                'priority': priority,
+                'submitted_at': time.time(),
+                'result': None,
+                'error': None
+            }
+            if idempotency_key is not None:
+                self._idempotency[idempotency_key] = tracking_id
+            self._prune()
+
+            try:
+                self._queue.put_nowait((-priority, next(self._sequence), tracking_id, payload))
+            except queue.Full:
+                del self._jobs[tracking_id]
+                self._idempotency.pop(idempotency_key, None)
+                raise
+        return tracking_id
+
+    def get(self, tracking_id):
+        """Get a copy of a job's state"""
+        job = self._jobs.get(tracking_id)
+        return dict(job) if job else None
+
+    def pending(self):
+        """Number of jobs waiting for a worker"""
+        return self._queue.qsize()
+
+    def _prune(self):
+        """Forget the oldest finished jobs beyond max_history; caller holds the lock"""
+        excess = len(self._jobs) - self.max_history
+        for tracking_id in list(self._jobs):
+            if excess <= 0:
+                break
+            job = self._jobs[tracking_id]
+            if job['status'] in (COMPLETED, FAILED):
+                del self._jobs[tracking_id]
+                self._idempotency.pop(job['idempotency_key'], None)
+                excess -= 1
+
+    def _update(self, tracking_id, **fields):
+        with self._lock:
+            job = self._jobs.get(tracking_id)
+            if job:
+                job.update(fields)
+
+    def _fail(self, tracking_id, **fields):
+        """Mark a job failed and release its idempotency key for a retry"""
+        with self._lock:
+            job = self._jobs.get(tracking_id)
+            if job:
+                job.update(fields, status=FAILED)
+                if self._idempotency.get(job['idempotency_key']) == tracking_id:
+                    del self._idempotency[job['idempotency_key']]
+
+    def _work(self):
+        while True:
+            _, _, tracking_id, payload = self._queue.get()
+            try:
+                if payload is self._STOP:
+                    return
+                self.rate_limiter.acquire()
+                self._update(tracking_id, status=RUNNING, started_at=time.time())
+                result = self.handler(payload)
+                if isinstance(result, dict) and result.get('status') == 'error':
+                    self._fail(tracking_id, result=result, error=result.get('error'), finished_at=time.time())
+                else:
+                    self._update(tracking_id, status=COMPLETED, result=result, error=None, finished_at=time.time())
+            except Exception as e:
+                logger.error(f"Error executing queued order {tracking_id}: {e}")
+                self._fail(tracking_id, error=str(e), finished_at=time.time())
+            finally:
+                self._queue.task_done()
@@ -0,0 +1,125 @@
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Order states that can no longer change
+TERMINAL_STATUSES = {'complete', 'rejected', 'cancelled'}
+
+class OrderStore:
+    """In-process order state keyed by order id
+
+    Seeded once from the broker order book, then kept current from postback
+    webhooks, with a periodic reconciliation sweep against the order book to
+    catch missed postbacks. Status lookups are dict reads.
+    """
+
+    def __init__(self):
+        self.seeded = False
+        self._orders = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __len__(self):
+        return len(self._orders)
+
+    @staticmethod
+    def _order_id(order):
+        return order.get('orderid') or order.get('order_id')
+
+    @staticmethod
+    def _status(order):
+        status = order.get('orderstatus') or order.get('status')
+        return status.lower() if isinstance(status, str) else status
+
+    def _merge(self, order, authoritative=False):
+        """Merge one order update; caller holds the lock"""
+        order_id = self._order_id(order)
+        if not order_id:
+            return False
+
+        current = self._orders.get(order_id)
+        status = self._status(order)
+        # Late or replayed postbacks must not move a finished order back to open
+        if (current and not authoritative and current.get('status') in TERMINAL_STATUSES
+                and status not in TERMINAL_STATUSES):
+            return False
+
+        merged = dict(current or {})
+        merged.update(order)
+        merged['orderid'] = order_id
+        merged['status'] = status
+        self._orders[order_id] = merged
+        return True
+
+    def seed(self, orders):
+        """Replace the store with a full order book snapshot"""
+        with self._lock:
+            self._orders = {}
+            for order in orders or []:
+                self._merge(order, authoritative=True)
+            self.seeded = True
+
+    def upsert(self, order):
+        """Record an order placed or updated by this process"""
+        with self._lock:
+            return self._merge(order)
+
+    def apply_postback(self, data):
+        """Apply an order postback from the broker webhook"""
+        with self._lock:
+            return self._merge(data)
+
+    def get(self, order_id):
+        """Get a copy of the latest known state of an order"""
+        order = self._orders.get(order_id)
+        return dict(order) if order else None
+
+    def get_status(self, order_id):
+        """Get the latest known status of an order"""
+        order = self._orders.get(order_id)
+        return order['status'] if order else None
+
+    def reconcile(self, orders):
+        """Merge a fresh order book; the broker's view wins over local state"""
+        if orders is None:
+            return 0
+        with self._lock:
+            changed = 0
+            for order in orders:
+                order_id = self._order_id(order)
+                current = self._orders.get(order_id)
+                if current is None or current.get('status') != self._status(order):
+                    changed += 1
+                self._merge(order, authoritative=True)
+            self.seeded = True
+        if changed:
+            logger.info(f"Order reconciliation updated {changed} orders")
+        return changed
+
+    def _reconcile_loop(self, fetch_order_book, interval):
+        while not self._stop.wait(interval):
+            try:
+                self.reconcile(fetch_order_book())
+            except Exception as e:
+                logger.error(f"Error reconciling orders: {str(e)}")
+
+    def start_reconciliation(self, fetch_order_book, interval=60):
+        """Reconcile against fetch_order_book() every interval seconds in the background"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._reconcile_loop,
+                args=(fetch_order_book, interval),
+                name='order-reconciliation',
+                daemon=True
+            )
+            self._thread.start()
+
+    def stop(self):
+        """Stop the reconciliation sweep"""
+        self._stop.set()
+
+# Shared order store, fed by the postback webhook
+order_store = OrderStore()
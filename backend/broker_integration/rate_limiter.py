@@ -0,0 +1,48 @@
+import threading
+import time
+
+class TokenBucket:
+    """Thread-safe token bucket for pacing calls to the broker
+
+    Holds up to ``capacity`` tokens and refills at ``rate`` tokens per second,
+    so bursts of up to ``capacity`` calls go through immediately and the
+    sustained rate never exceeds ``rate``.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)                     # Tokens added per second
+        self.capacity = float(capacity or rate)     # Maximum burst size
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, tokens=1):
+        """Take tokens if available without waiting"""
+        with self._lock:
+            self._refill()
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return True
+            return False
+
+    def acquire(self, tokens=1, timeout=None):
+        """Block until tokens are available; returns False if timeout expires first"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return True
+                wait = (tokens - self._tokens) / self.rate
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            time.sleep(wait)
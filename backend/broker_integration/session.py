@@ -0,0 +1,212 @@
+import base64
+import json
+import logging
+import os
+import threading
+import time
+import pyotp
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# Assumed token lifetime when a JWT carries no readable exp claim
+DEFAULT_TOKEN_LIFETIME = 60 * 60
+
+_smart_connect_class = None
+
+def _pooled_smart_connect():
+    """SmartConnect subclass that sends requests through a shared requests.Session
+
+    SmartConnect._request calls the module-level requests.request, which opens
+    a new connection (and TLS handshake) per call. Built lazily because
+    importing SmartApi performs network calls.
+    """
+    global _smart_connect_class
+    if _smart_connect_class is not None:
+        return _smart_connect_class
+
+    from urllib.parse import urljoin
+    from SmartApi import SmartConnect
+    import SmartApi.smartExceptions as ex
+
+    class PooledSmartConnect(SmartConnect):
+        def _request(self, route, method, parameters=None):
+            params = parameters.copy() if parameters else {}
+            url = urljoin(self.root, self._routes[route].format(**params))
+            headers = self.requestHeaders()
+            if self.access_token:
+                headers["Authorization"] = f"Bearer {self.access_token}"
+
+            body = json.dumps(params)
+            r = self.reqsession.request(
+                method,
+                url,
+                data=body if method in ("POST", "PUT") else None,
+                params=body if method in ("GET", "DELETE") else None,
+                headers=headers,
+                verify=not self.disable_ssl,
+                timeout=self.timeout,
+                proxies=self.proxies
+            )
+
+            try:
+                data = r.json()
+            except ValueError:
+                raise ex.DataException(f"Couldn't parse the JSON response received from the server: {r.content}")
+
+            if data.get("error_type"):
+                if self.session_expiry_hook and r.status_code == 403 and data["error_type"] == "TokenException":
+                    self.session_expiry_hook()
+                exception = getattr(ex, data["error_type"], ex.GeneralException)
+                raise exception(data["message"], code=r.status_code)
+            return data
+
+    _smart_connect_class = PooledSmartConnect
+    return _smart_connect_class
+
+def token_expiry(jwt_token):
+    """Expiry time (epoch seconds) from a JWT's exp claim, or None if unreadable"""
+    try:
+        payload = jwt_token.split('.')[1]
+        payload += '=' * (-len(payload) % 4)
+        return float(json.loads(base64.urlsafe_b64decode(payload))['exp'])
+    except Exception:
+        return None
+
+class BrokerSession:
+    """Angel One session shared by every thread that talks to the broker
+
+    Holds one pooled keep-alive HTTP session and the current tokens. A daemon
+    thread renews the JWT with the refresh token shortly before it expires
+    (falling back to a full TOTP login if renewal fails) and pings the API
+    host between renewals so pooled connections stay warm.
+    """
+
+    def __init__(self, api_key=None, client_id=None, pin=None, totp_key=None, root=None, pool_size=10,
+                 refresh_margin=300, keepalive_interval=30):
+        self.api_key = api_key or os.getenv('ANGEL_API_KEY')
+        self.client_id = client_id or os.getenv('ANGEL_CLIENT_ID')
+        self.pin = pin or os.getenv('ANGEL_PIN')
+        self.totp_key = totp_key or os.getenv('ANGEL_TOTP_KEY')
+        self.root = root or os.getenv('ANGEL_API_ROOT')   # API host override, e.g. a local stub
+        self.refresh_margin = refresh_margin            # Seconds before expiry to renew the JWT
+        self.keepalive_interval = keepalive_interval    # Seconds between keep-alive pings
+
+        self.http = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.http.mount('https://', adapter)
+        self.http.mount('http://', adapter)
+
+        self.access_token = None
+        self.refresh_token = None
+        self.feed_token = None
+        self.expires_at = None
+        self._client = None
+        self._lock = threading.RLock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def client(self):
+        """SmartConnect client bound to the pooled HTTP session"""
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    client = _pooled_smart_connect()(api_key=self.api_key, root=self.root)
+                    client.reqsession = self.http
+                    client.setSessionExpiryHook(self._on_session_expired)
+                    self._client = client
+        return self._client
+
+    @property
+    def authenticated(self):
+        return self.access_token is not None
+
+    def _set_tokens(self, access_token, refresh_token=None, feed_token=None):
+        """Store a new token set; caller holds the lock"""
+        self.access_token = access_token
+        if refresh_token:
+            self.refresh_token = refresh_token
+        if feed_token:
+            self.feed_token = feed_token
+        self.expires_at = token_expiry(access_token) or time.time() + DEFAULT_TOKEN_LIFETIME
+
+    def login(self):
+        """Full TOTP login"""
+        with self._lock:
+            totp = pyotp.TOTP(self.totp_key)
+            data = self.client.generateSession(self.client_id, self.pin, totp.now())
+            if not data.get('status'):
+                raise Exception(data.get('message') or 'Login rejected by broker')
+            self._set_tokens(
+                self.client.access_token,
+                data['data']['refreshToken'],
+                self.client.getfeedToken()
+            )
+            logger.info("Broker session logged in")
+
+    def refresh(self):
+        """Renew the JWT with the refresh token, logging in again if that fails"""
+        with self._lock:
+            try:
+                if not self.refresh_token:
+                    raise Exception("No refresh token")
+                data = self.client.generateToken(self.refresh_token)['data']
+                self._set_tokens(data['jwtToken'], data.get('refreshToken'), data.get('feedToken'))
+                logger.info("Broker session token renewed")
+            except Exception as e:
+                logger.warning(f"Token renewal failed, logging in again: {str(e)}")
+                self.login()
+
+    def ensure_session(self):
+        """Make sure there is a token valid beyond the refresh margin"""
+        if self.access_token and time.time() < self.expires_at - self.refresh_margin:
+            return
+        with self._lock:
+            # Another thread may have renewed while we waited for the lock
+            if self.access_token and time.time() < self.expires_at - self.refresh_margin:
+                return
+            if self.access_token:
+                self.refresh()
+            else:
+                self.login()
+
+    def _on_session_expired(self):
+        """Session expiry hook; the broker rejected the token before we expected"""
+        with self._lock:
+            self.expires_at = 0
+
+    def keepalive(self):
+        """Touch the API host so pooled connections are not dropped as idle"""
+        try:
+            self.http.head(self.client.root, timeout=5)
+        except Exception as e:
+            logger.debug(f"Broker keep-alive failed: {str(e)}")
+
+    def _maintain_loop(self):
+        while True:
+            delay = self.keepalive_interval
+            if self.access_token:
+                delay = max(0, min(delay, self.expires_at - self.refresh_margin - time.time()))
+            if self._stop.wait(delay):
+                return
+            try:
+                if self.access_token and time.time() >= self.expires_at - self.refresh_margin:
+                    self.refresh()
+                else:
+                    self.keepalive()
+            except Exception as e:
+                logger.error(f"Error maintaining broker session: {str(e)}")
+                self._stop.wait(self.keepalive_interval)
+
+    def start(self):
+        """Keep the session renewed and warm in the background"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._maintain_loop, name='broker-session', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop background maintenance"""
+        self._stop.set()
@@ -0,0 +1,252 @@
+import base64
+import json
+import logging
+import random
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+from backend.broker_integration.rate_limiter import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+INSTRUMENTS_PATH = "/OpenAPI_File/files/OpenAPIScripMaster.json"
+
+DEFAULT_INSTRUMENTS = [
+    {'token': '2885', 'symbol': 'RELIANCE-EQ', 'name': 'RELIANCE', 'exch_seg': 'NSE'},
+    {'token': '11536', 'symbol': 'TCS-EQ', 'name': 'TCS', 'exch_seg': 'NSE'},
+    {'token': '1333', 'symbol': 'HDFCBANK-EQ', 'name': 'HDFCBANK', 'exch_seg': 'NSE'},
+    {'token': '1594', 'symbol': 'INFY-EQ', 'name': 'INFY', 'exch_seg': 'NSE'},
+    {'token': '3045', 'symbol': 'SBIN-EQ', 'name': 'SBIN', 'exch_seg': 'NSE'}
+]
+
+def _make_jwt(lifetime):
+    """Unsigned JWT whose exp claim is lifetime seconds from now"""
+    def encode(data):
+        return base64.urlsafe_b64encode(json.dumps(data).encode()).decode().rstrip('=')
+    return f"{encode({'alg': 'none'})}.{encode({'exp': int(time.time() + lifetime), 'jti': uuid.uuid4().hex})}.stub"
+
+class SmartAPIStubServer:
+    """Local HTTP stand-in for the SmartAPI endpoints AngelBroker uses
+
+    Serves login and token renewal, orders, the order book, positions,
+    holdings and RMS with keep-alive HTTP/1.1. Latency, jitter, injected
+    errors and the order rate limit are configurable so the order path can
+    be load tested without the live service. Orders fill immediately at a
+    fixed price.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, jitter=0.0, error_rate=0.0,
+                 order_rate_limit=None, token_lifetime=8 * 60 * 60, instruments=None, seed=None):
+        self.latency = latency                  # Seconds added to every response
+        self.jitter = jitter                    # Extra uniform random latency, in seconds
+        self.error_rate = error_rate            # Fraction of requests answered with a server error
+        self.token_lifetime = token_lifetime
+        self.instruments = instruments or DEFAULT_INSTRUMENTS
+        self.order_limiter = TokenBucket(order_rate_limit) if order_rate_limit else None
+        self.stats = {'requests': 0, 'orders': 0, 'rate_limited': 0, 'errors_injected': 0}
+        self.orders = {}
+        self.client_code = None
+        self._tokens = set()
+        self._refresh_tokens = set()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._routes = {
+            ('POST', '/rest/auth/angelbroking/user/v1/loginByPassword'): self._login,
+            ('POST', '/rest/auth/angelbroking/jwt/v1/generateTokens'): self._generate_tokens,
+            ('GET', '/rest/secure/angelbroking/user/v1/getProfile'): self._profile,
+            ('POST', '/rest/secure/angelbroking/order/v1/placeOrder'): self._place_order,
+            ('POST', '/rest/secure/angelbroking/order/v1/cancelOrder'): self._cancel_order,
+            ('GET', '/rest/secure/angelbroking/order/v1/getOrderBook'): self._order_book,
+            ('GET', '/rest/secure/angelbroking/order/v1/getPosition'): self._positions,
+            ('GET', '/rest/secure/angelbroking/portfolio/v1/getHolding'): self._holdings,
+            ('GET', '/rest/secure/angelbroking/user/v1/getRMS'): self._rms,
+            ('GET', INSTRUMENTS_PATH): lambda body: (200, self.instruments)
+        }
+        self.httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Headers and body go out in separate writes; without this, delayed ACKs add ~40ms
+            disable_nagle_algorithm = True
+
+            def _respond(self, method):
+                length = int(self.headers.get('Content-Length') or 0)
+                body = self.rfile.read(length) if length else b''
+                status, payload = stub.handle(method, self.path.split('?')[0], self.headers, body)
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                self._respond('GET')
+
+            def do_POST(self):
+                self._respond('POST')
+
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+
+        return Handler
+
+    def handle(self, method, path, headers, body):
+        """Route one request; returns (HTTP status, JSON payload)"""
+        with self._lock:
+            self.stats['requests'] += 1
+            delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0)
+            inject_error = self.error_rate and self._random.random() < self.error_rate
+        if delay:
+            time.sleep(delay)
+
+        route = self._routes.get((method, path))
+        if route is None:
+            return 404, {'status': False, 'message': 'Not found', 'errorcode': 'AB1000', 'data': None}
+
+        if '/secure/' in path:
+            auth = headers.get('Authorization', '')
+            if auth[len('Bearer '):] not in self._tokens:
+                return 403, {'message': 'Invalid Token', 'errorcode': 'AG8001', 'error_type': 'TokenException'}
+        if inject_error:
+            with self._lock:
+                self.stats['errors_injected'] += 1
+            return 500, {'status': False, 'message': 'Injected error', 'errorcode': 'AB1004', 'data': None}
+        if path.endswith('/placeOrder') and self.order_limiter and not self.order_limiter.try_acquire():
+            with self._lock:
+                self.stats['rate_limited'] += 1
+            return 429, {'status': False, 'message': 'Access denied because of exceeding access rate',
+                         'errorcode': 'AB1019', 'data': None}
+
+        try:
+            params = json.loads(body) if body else {}
+        except ValueError:
+            return 400, {'status': False, 'message': 'Invalid JSON', 'errorcode': 'AB1001', 'data': None}
+        return route(params)
+
+    def _ok(self, data):
+        return 200, {'status': True, 'message': 'SUCCESS', 'errorcode': '', 'data': data}
+
+    def _issue_tokens(self):
+        jwt, refresh = _make_jwt(self.token_lifetime), uuid.uuid4().hex
+        with self._lock:
+            self._tokens.add(jwt)
+            self._refresh_tokens.add(refresh)
+        return {'jwtToken': jwt, 'refreshToken': refresh, 'feedToken': uuid.uuid4().hex}
+
+    def _login(self, params):
+        if not params.get('clientcode') or not str(params.get('totp', '')).isdigit():
+            return 200, {'status': False, 'message': 'Invalid totp', 'errorcode': 'AB1050', 'data': None}
+        self.client_code = params['clientcode']
+        return self._ok(self._issue_tokens())
+
+    def _generate_tokens(self, params):
+        if params.get('refreshToken') not in self._refresh_tokens:
+            return 403, {'message': 'Invalid refresh token', 'errorcode': 'AG8002', 'error_type': 'TokenException'}
+        return self._ok(self._issue_tokens())
+
+    def _profile(self, params):
+        return self._ok({'clientcode': self.client_code or 'STUB', 'name': 'Stub User',
+                         'exchanges': ['NSE', 'BSE']})
+
+    def _place_order(self, params):
+        missing = [k for k in ('tradingsymbol', 'symboltoken', 'transactiontype', 'quantity') if k not in params]
+        if missing:
+            return 200, {'status': False, 'message': f"Missing {', '.join(missing)}", 'errorcode': 'AB4008', 'data': None}
+        order_id = uuid.uuid4().hex[:15].upper()
+        order = dict(params, orderid=order_id, status='complete', orderstatus='complete',
+                     averageprice=params.get('price') or 100.0, filledshares=str(params['quantity']))
+        with self._lock:
+            self.orders[order_id] = order
+            self.stats['orders'] += 1
+        return self._ok({'orderid': order_id, 'script': params['tradingsymbol']})
+
+    def _cancel_order(self, params):
+        order = self.orders.get(params.get('orderid'))
+        if order is None:
+            return 200, {'status': False, 'message': 'Order not found', 'errorcode': 'AB2001', 'data': None}
+        if order['status'] == 'complete':
+            return 200, {'status': False, 'message': 'Order already complete', 'errorcode': 'AB4036', 'data': None}
+        order['status'] = order['orderstatus'] = 'cancelled'
+        return self._ok({'orderid': order['orderid']})
+
+    def _order_book(self, params):
+        with self._lock:
+            return self._ok(list(self.orders.values()))
+
+    def _positions(self, params):
+        positions = {}
+        with self._lock:
+            for order in self.orders.values():
+                if order['status'] != 'complete':
+                    continue
+                quantity = int(order['quantity']) * (1 if order['transactiontype'] == 'BUY' else -1)
+                position = positions.setdefault(order['tradingsymbol'], {
+                    'tradingsymbol': order['tradingsymbol'], 'symboltoken': order['symboltoken'],
+                    'netqty': 0, 'avgnetprice': order['averageprice']
+                })
+                position['netqty'] += quantity
+        return self._ok([dict(p, netqty=str(p['netqty'])) for p in positions.values()])
+
+    def _holdings(self, params):
+        return self._ok([{'tradingsymbol': 'TCS-EQ', 'symboltoken': '11536', 'quantity': 10, 'averageprice': 3500.0}])
+
+    def _rms(self, params):
+        return self._ok({'net': '1000000.00', 'availablecash': '1000000.00', 'utiliseddebits': '0.00'})
+
+    def start(self):
+        """Serve in a background thread"""
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name='smartapi-stub', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop serving"""
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+def run_load(place, orders, concurrency=10):
+    """Call place(**order) for every order from a thread pool and report latency
+
+    An order counts as failed if place raises or returns a falsy result or
+    one whose status is 'error' (AngelBroker) or False (raw SmartAPI).
+    """
+    def timed(order):
+        start = time.perf_counter()
+        try:
+            result = place(**order)
+            ok = bool(result) and not (isinstance(result, dict) and result.get('status') in ('error', False))
+        except Exception:
+            ok = False
+        return time.perf_counter() - start, ok
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(timed, orders))
+    elapsed = time.perf_counter() - start
+
+    latencies = np.array([r[0] for r in results]) * 1000
+    failed = sum(1 for r in results if not r[1])
+    p50, p99 = np.percentile(latencies, [50, 99]) if len(latencies) else (0.0, 0.0)
+    return {
+        'orders': len(results),
+        'failed': failed,
+        'elapsed': elapsed,
+        'throughput': len(results) / elapsed if elapsed else 0.0,
+        'p50_ms': float(p50),
+        'p99_ms': float(p99),
+        'max_ms': float(latencies.max()) if len(latencies) else 0.0
+    }
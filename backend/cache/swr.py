@@ -0,0 +1,122 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# Shared by all caches; background refreshes never block a request thread
+_executor = ThreadPoolExecutor(max_workers=int(os.getenv('CACHE_REFRESH_WORKERS', 4)), thread_name_prefix='cache-refresh')
+
+class StaleWhileRevalidateCache:
+    """Bounded cache that answers from memory and refreshes in the background
+
+    A value younger than soft_ttl is returned as is. Between soft_ttl and
+    hard_ttl it is still returned immediately, and one background refresh
+    is started. Past hard_ttl, or for an unknown key, the caller loads the
+    value itself. Concurrent callers for the same key share one load, so
+    a burst of requests makes one upstream call.
+
+    A load fails if the loader raises or returns None. A failed refresh
+    keeps serving the stale value. A failed first load is remembered for
+    negative_ttl, during which callers get the default instead of
+    retrying the upstream. Entries are evicted least recently used beyond
+    max_size.
+    """
+
+    def __init__(self, loader, soft_ttl, hard_ttl, max_size=1024, negative_ttl=30):
+        self.loader = loader              # key -> value; None or an exception means failure
+        self.soft_ttl = soft_ttl          # Seconds before a value is refreshed in the background
+        self.hard_ttl = hard_ttl          # Seconds before a value is no longer served
+        self.max_size = max_size
+        self.negative_ttl = negative_ttl  # Seconds a failure suppresses further loads
+        self.stats = {'hits': 0, 'stale': 0, 'misses': 0, 'negative': 0, 'refreshes': 0, 'failures': 0}
+
+        self._entries = OrderedDict()     # key -> [value, loaded_at, failed_at]; LRU
+        self._inflight = {}               # key -> Future of the running load
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, default=None):
+        """Cached value for key, loading it only on a miss"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                value, loaded_at, failed_at = entry
+                recently_failed = failed_at is not None and now - failed_at < self.negative_ttl
+                if loaded_at is not None and now - loaded_at < self.hard_ttl:
+                    if now - loaded_at < self.soft_ttl:
+                        self.stats['hits'] += 1
+                    else:
+                        self.stats['stale'] += 1
+                        if not recently_failed:
+                            self._begin_load(key, background=True)
+                    return value
+                if recently_failed:
+                    self.stats['negative'] += 1
+                    return default
+            self.stats['misses'] += 1
+            future, owner = self._begin_load(key, background=False)
+
+        if owner:
+            self._load(key, future)
+        value, failed = future.result()
+        return default if failed else value
+
+    def _begin_load(self, key, background):
+        """Future for key's load and whether the caller must run it; call with the lock held"""
+        future = self._inflight.get(key)
+        if future is not None:
+            return future, False
+        future = self._inflight[key] = Future()
+        if background:
+            self.stats['refreshes'] += 1
+            _executor.submit(self._load, key, future)
+            return future, False
+        return future, True
+
+    def _load(self, key, future):
+        try:
+            value = self.loader(key)
+        except Exception as e:
+            logger.error(f"Error loading {key}: {str(e)}")
+            value = None
+        failed = value is None
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if not failed:
+                self._entries[key] = [value, now, None]
+            elif entry is not None:
+                entry[2] = now
+            else:
+                self._entries[key] = [None, None, now]
+            if failed:
+                self.stats['failures'] += 1
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+            del self._inflight[key]
+        future.set_result((value, failed))
+
+    def refresh(self, key):
+        """Start a background refresh of key; returns its Future of (value, failed)"""
+        with self._lock:
+            future, _ = self._begin_load(key, background=True)
+        return future
+
+    def invalidate(self, key):
+        """Forget key so the next get loads it"""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
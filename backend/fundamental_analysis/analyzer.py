@@ -1,12 +1,19 @@
 import yfinance as yf
-from bs4 import BeautifulSoup
-import requests
+from backend.fundamental_analysis.earnings import EarningsFetcher
 
 class FundamentalAnalyzer:
-    def __init__(self):
-        pass
+    def __init__(self, snapshot=None):
+        # Optional FundamentalsSnapshot answering for the universe without network calls
+        self.snapshot = snapshot
+        self.earnings = EarningsFetcher()
     
     def analyze(self, symbol):
+        # Serve from the daily snapshot; fetch live only for symbols it does not have
+        if self.snapshot is not None:
+            metrics = self.snapshot.get(symbol)
+            if metrics is not None:
+                return metrics
+        
         # Get stock information
         stock = yf.Ticker(symbol)
         
@@ -62,41 +69,22 @@ class FundamentalAnalyzer:
         metrics['earnings_growth'] = info.get('earningsGrowth')
         metrics['revenue_growth_yearly'] = info.get('revenueGrowth')
         
+        # Classification, for comparing a stock with its sector
+        metrics['sector'] = info.get('sector')
+        
         # Remove None values
         metrics = {k: v for k, v in metrics.items() if v is not None}
         
         return metrics
     
     def _get_quarterly_earnings(self, symbol):
+        return self.get_quarterly_earnings([symbol]).get(symbol)
+    
+    def get_quarterly_earnings(self, symbols):
+        """Quarterly earnings rows for many symbols in one concurrent batch"""
         try:
-            url = f"https://finance.yahoo.com/quote/{symbol}/analysis"
-            response = requests.get(url)
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            earnings_table = soup.find('table', {'class': 'W(100%) M(0) BdB Bdc($seperatorColor)'})
-            if earnings_table:
-                rows = earnings_table.find_all('tr')
-                earnings_data = []
-                
-                for row in rows[1:]:  # Skip header row
-                    cols = row.find_all('td')
-                    if cols:
-                        quarter = cols[0].text.strip()
-                        eps_estimate = cols[1].text.strip()
-                        eps_actual = cols[2].text.strip()
-                        surprise = cols[3].text.strip()
-                        
-                        earnings_data.append({
-                            'quarter': quarter,
-                            'eps_estimate': eps_estimate,
-                            'eps_actual': eps_actual,
-                            'surprise': surprise
-                        })
-                
-                return earnings_data
-            
-            return None
+            return self.earnings.fetch(symbols)
         
         except Exception as e:
             print(f"Error fetching quarterly earnings: {str(e)}")
-            return None
+            return {}
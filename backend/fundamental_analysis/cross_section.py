@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+
+# Factors in the composite score, and whether a higher value is better
+FACTORS = {
+    'pe_ratio': False,
+    'revenue_growth': True,
+    'profit_margins': True
+}
+
+class CrossSection:
+    """Fundamentals of the whole universe as one table, ranked within sectors
+
+    Each factor gets a percentile rank in (0, 1] among the symbol's sector
+    peers (<factor>_rank, ascending in the raw value) and a quintile from
+    1 to 5 (<factor>_quintile). A sector with fewer than min_sector_size
+    ranked symbols, or a symbol without a sector, is ranked against the
+    whole universe instead. A P/E of zero or below (losses) is not ranked.
+
+    composite is the mean of the factor ranks, each oriented so that 1 is
+    best, over the factors a symbol has. All columns are computed once per
+    table with grouped vectorized ranks. A screen is then a single
+    DataFrame.query, e.g.
+    screen('pe_ratio_quintile == 1 and revenue_growth > 0').
+    """
+
+    def __init__(self, table, factors=None, min_sector_size=5):
+        self.factors = FACTORS if factors is None else factors   # column -> higher is better
+        self.min_sector_size = min_sector_size
+        self.frame = self._rank(table)
+
+    @classmethod
+    def from_metrics(cls, metrics, **kwargs):
+        """Cross-section from {symbol: FundamentalAnalyzer metrics}"""
+        return cls(pd.DataFrame.from_dict(metrics, orient='index').reindex(list(metrics)), **kwargs)
+
+    @classmethod
+    def from_snapshot(cls, snapshot, **kwargs):
+        """Cross-section of every symbol in a FundamentalsSnapshot"""
+        return cls(snapshot.to_frame(), **kwargs)
+
+    def __len__(self):
+        return len(self.frame)
+
+    def _percentiles(self, values, sector):
+        """Percentile ranks within sectors, or across the universe for small or unknown sectors"""
+        sector_ranks = values.groupby(sector).rank(pct=True)
+        universe_ranks = values.rank(pct=True)
+        peers = values.notna().groupby(sector).transform('sum').to_numpy()
+        use_universe = (peers < self.min_sector_size) | (sector.to_numpy() == '')[:, None]
+        return sector_ranks.mask(use_universe, universe_ranks)
+
+    def _rank(self, table):
+        frame = table.copy()
+        for column in self.factors:
+            if column not in frame:
+                frame[column] = np.nan
+        values = frame[list(self.factors)].astype(float)
+        if 'pe_ratio' in values:
+            values['pe_ratio'] = values['pe_ratio'].where(values['pe_ratio'] > 0)
+        sector = frame['sector'].fillna('') if 'sector' in frame else pd.Series('', index=frame.index)
+
+        ranks = self._percentiles(values, sector)
+        signs = np.where(list(self.factors.values()), 1.0, -1.0)
+        oriented = self._percentiles(values * signs, sector)
+        for column in self.factors:
+            frame[f'{column}_rank'] = ranks[column]
+            frame[f'{column}_quintile'] = np.ceil(ranks[column] * 5).clip(1, 5)
+        frame['composite'] = oriented.mean(axis=1)
+        return frame
+
+    def scores(self, symbols=None, default=0.5):
+        """Composite score per symbol, default where a symbol has no ranked factor"""
+        composite = self.frame['composite']
+        if symbols is not None:
+            composite = composite.reindex(symbols)
+        return composite.fillna(default)
+
+    def screen(self, expr):
+        """Symbols matching a DataFrame.query expression, best composite first"""
+        return self.frame.query(expr).sort_values('composite', ascending=False).index.tolist()
@@ -0,0 +1,121 @@
+import asyncio
+import logging
+import threading
+import aiohttp
+from lxml import html
+
+logger = logging.getLogger(__name__)
+
+EARNINGS_URL = "https://finance.yahoo.com/quote/{symbol}/analysis"
+EARNINGS_TABLE_CLASS = "W(100%) M(0) BdB Bdc($seperatorColor)"
+USER_AGENT = "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36"
+
+def parse_earnings(page):
+    """Quarter, EPS estimate, EPS actual and surprise rows from an analysis page, or None without the table"""
+    tree = html.fromstring(page)
+    tables = tree.xpath('//table[@class=$cls]', cls=EARNINGS_TABLE_CLASS)
+    if not tables:
+        return None
+    earnings = []
+    for row in tables[0].xpath('.//tr')[1:]:   # Skip header row
+        cols = [cell.text_content().strip() for cell in row.xpath('./td')]
+        if len(cols) >= 4:
+            earnings.append({
+                'quarter': cols[0],
+                'eps_estimate': cols[1],
+                'eps_actual': cols[2],
+                'surprise': cols[3]
+            })
+    return earnings
+
+class EarningsFetcher:
+    """Batched quarterly earnings scraper
+
+    Pages are fetched concurrently over one pooled aiohttp session, at
+    most `concurrency` connections at a time. The session lives on a
+    private event loop thread, so connections stay alive between
+    batches. Every page's ETag and Last-Modified are kept. Later fetches
+    revalidate with If-None-Match / If-Modified-Since, and a 304 reuses
+    the earnings parsed before without downloading or parsing the page
+    again. Pages are parsed with lxml.
+    """
+
+    def __init__(self, url=EARNINGS_URL, concurrency=8, timeout=10):
+        self.url = url                  # Page URL template with a {symbol} field
+        self.concurrency = concurrency  # Simultaneous connections
+        self.timeout = timeout          # Seconds per request
+        self.stats = {'fetched': 0, 'not_modified': 0, 'errors': 0}
+        self._validated = {}            # symbol -> (etag, last_modified, earnings)
+        self._session = None
+        self._loop = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _ensure_loop(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name='earnings-fetcher', daemon=True)
+                self._thread.start()
+        return self._loop
+
+    async def _get_session(self):
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.concurrency, ttl_dns_cache=300),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                headers={'User-Agent': USER_AGENT}
+            )
+        return self._session
+
+    async def _fetch_one(self, session, symbol):
+        cached = self._validated.get(symbol)
+        headers = {}
+        if cached is not None:
+            etag, last_modified, _ = cached
+            if etag:
+                headers['If-None-Match'] = etag
+            if last_modified:
+                headers['If-Modified-Since'] = last_modified
+        try:
+            async with session.get(self.url.format(symbol=symbol), headers=headers) as response:
+                if response.status == 304 and cached is not None:
+                    self.stats['not_modified'] += 1
+                    return cached[2]
+                response.raise_for_status()
+                page = await response.read()
+                etag, last_modified = response.headers.get('ETag'), response.headers.get('Last-Modified')
+            earnings = parse_earnings(page)
+            self.stats['fetched'] += 1
+            if etag or last_modified:
+                self._validated[symbol] = (etag, last_modified, earnings)
+            return earnings
+        except Exception as e:
+            self.stats['errors'] += 1
+            logger.error(f"Error fetching quarterly earnings for {symbol}: {str(e)}")
+            return cached[2] if cached is not None else None
+
+    async def fetch_async(self, symbols):
+        """Earnings for each symbol, fetched concurrently; None where unavailable"""
+        session = await self._get_session()
+        results = await asyncio.gather(*(self._fetch_one(session, symbol) for symbol in symbols))
+        return dict(zip(symbols, results))
+
+    def fetch(self, symbols):
+        """Blocking fetch_async for callers outside an event loop"""
+        symbols = list(dict.fromkeys(symbols))
+        if not symbols:
+            return {}
+        future = asyncio.run_coroutine_threadsafe(self.fetch_async(symbols), self._ensure_loop())
+        return future.result()
+
+    def close(self):
+        """Close the pooled session and stop the loop thread"""
+        with self._lock:
+            if self._loop is None or not self._thread.is_alive():
+                return
+            if self._session is not None:
+                asyncio.run_coroutine_threadsafe(self._session.close(), self._loop).result(self.timeout)
+                self._session = None
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(self.timeout)
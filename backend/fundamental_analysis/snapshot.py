@@ -0,0 +1,230 @@
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+import yfinance as yf
+from backend.fundamental_analysis.analyzer import FundamentalAnalyzer
+
+logger = logging.getLogger(__name__)
+
+# Numeric columns of the snapshot, as produced by FundamentalAnalyzer._calculate_metrics
+METRIC_COLUMNS = (
+    'market_cap', 'pe_ratio', 'forward_pe', 'price_to_book',
+    'quarterly_revenue', 'revenue_growth',
+    'profit_margins', 'operating_margins',
+    'dividend_yield', 'payout_ratio',
+    'debt_to_equity', 'current_ratio',
+    'earnings_growth', 'revenue_growth_yearly'
+)
+TEXT_COLUMNS = ('sector',)
+
+class FundamentalsSnapshot:
+    """Daily columnar snapshot of fundamentals for the whole universe
+
+    A bulk job fetches info and quarterly financials for every symbol once
+    a day and writes them as one .npz file: a symbol column, a float64
+    column per metric (NaN where missing) and a sector column. Loading
+    builds a symbol -> row dict, so a lookup is one dict probe plus one
+    read per column. The row map, columns and as_of are published together
+    as one tuple, so a lookup never mixes two snapshots.
+
+    Symbols that miss are remembered (at most max_misses of them) and
+    fetched within miss_interval, merged into the current snapshot. A
+    symbol whose fetch fails keeps its previous row; a missed symbol whose
+    fetch fails is dropped and not recorded again for failure_ttl.
+    """
+
+    def __init__(self, cache_dir=None, refresh_interval=24 * 60 * 60, miss_interval=15 * 60, max_workers=8,
+                 max_misses=1000, failure_ttl=24 * 60 * 60):
+        self.analyzer = FundamentalAnalyzer()   # Computes metrics from the fetched yfinance data
+        self.cache_dir = cache_dir or os.getenv(
+            'SMART_TRADER_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.smart_trader')
+        )
+        self.path = os.path.join(self.cache_dir, 'fundamentals_snapshot.npz')
+        self.refresh_interval = refresh_interval  # Seconds between bulk refreshes
+        self.miss_interval = miss_interval        # Seconds before missed symbols are fetched
+        self.max_workers = max_workers            # Concurrent yfinance fetches during a refresh
+        self.max_misses = max_misses              # Missed symbols remembered between refreshes
+        self.failure_ttl = failure_ttl            # Seconds a symbol that failed to fetch is not retried as a miss
+        self._state = ({}, None, None)            # (symbol -> row, columns, as_of), replaced as a whole
+        self._misses = set()      # Guarded by _lock; added to by request threads
+        self._failed = {}         # symbol -> time its fetch failed; guarded by _lock
+        self._universe = set()    # Guarded by _lock
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def as_of(self):
+        """Epoch seconds of the loaded snapshot, or None without one"""
+        return self._state[2]
+
+    def __len__(self):
+        return len(self._state[0])
+
+    def __contains__(self, symbol):
+        return symbol in self._state[0]
+
+    def get(self, symbol):
+        """Snapshot metrics for symbol, or None if it is not in the snapshot"""
+        metrics = self._lookup(self._state, symbol)
+        if metrics is None:
+            self._record_miss(symbol)
+        return metrics
+
+    def _record_miss(self, symbol):
+        with self._lock:
+            failed_at = self._failed.get(symbol)
+            if failed_at is not None and time.time() - failed_at < self.failure_ttl:
+                return
+            if len(self._misses) < self.max_misses:
+                self._misses.add(symbol)
+
+    @staticmethod
+    def _lookup(state, symbol):
+        """Metrics for symbol from one published state, without recording a miss"""
+        rows, columns, _ = state
+        row = rows.get(symbol)
+        if row is None or columns is None:
+            return None
+        metrics = {}
+        for name in METRIC_COLUMNS:
+            value = columns[name][row]
+            if value == value:
+                metrics[name] = float(value)
+        for name in TEXT_COLUMNS:
+            if columns[name][row]:
+                metrics[name] = str(columns[name][row])
+        return metrics
+
+    def to_frame(self):
+        """The whole snapshot as a DataFrame indexed by symbol"""
+        columns = self._state[1]
+        if columns is None:
+            return pd.DataFrame(columns=list(METRIC_COLUMNS + TEXT_COLUMNS))
+        return pd.DataFrame(
+            {name: columns[name] for name in METRIC_COLUMNS + TEXT_COLUMNS},
+            index=pd.Index(columns['symbol'], name='symbol')
+        )
+
+    def _fetch(self, symbol):
+        stock = yf.Ticker(symbol)
+        info = stock.info
+        return self.analyzer._calculate_metrics(info, stock.quarterly_financials)
+
+    def build(self, rows):
+        """Column arrays from a {symbol: metrics} mapping"""
+        symbols = sorted(rows)
+        columns = {'symbol': np.array(symbols, dtype=str)}
+        for name in METRIC_COLUMNS:
+            columns[name] = np.array([rows[s].get(name, np.nan) for s in symbols], dtype=float)
+        for name in TEXT_COLUMNS:
+            columns[name] = np.array([rows[s].get(name) or '' for s in symbols], dtype=str)
+        return columns
+
+    def _install(self, columns, as_of):
+        rows = {symbol: i for i, symbol in enumerate(columns['symbol'].tolist())}
+        self._state = (rows, columns, as_of)   # One assignment: readers see the old or the new snapshot
+
+    def load(self):
+        """Load the snapshot file if there is one"""
+        try:
+            if os.path.exists(self.path):
+                with np.load(self.path) as data:
+                    columns = {name: data[name] for name in data.files if name != 'as_of'}
+                    as_of = float(data['as_of'])
+                self._install(columns, as_of)
+                return True
+        except Exception as e:
+            logger.error(f"Error loading fundamentals snapshot: {str(e)}")
+        return False
+
+    def refresh(self, symbols=(), full=True):
+        """Fetch fundamentals, write a new snapshot and swap it in
+
+        A full refresh fetches the whole universe; otherwise only symbols are
+        fetched and merged into the current snapshot.
+        """
+        state = self._state
+        with self._lock:
+            if full:
+                universe = sorted(set(symbols) | self._universe | set(state[0]) | self._misses)
+                self._universe.update(symbols)
+            else:
+                universe = sorted(set(symbols))   # Kept on by their rows only if the fetch succeeds
+        if not universe:
+            return False
+        try:
+            rows = {} if full else {symbol: self._lookup(state, symbol) for symbol in state[0]}
+            failed = []
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                fetched = executor.map(self._safe_fetch, universe)
+                for symbol, metrics in zip(universe, fetched):
+                    if not metrics:
+                        metrics = self._lookup(state, symbol)   # Keep the previous row over nothing
+                    if metrics:
+                        rows[symbol] = metrics
+                    else:
+                        failed.append(symbol)
+
+            columns = self.build(rows)
+            as_of = time.time() if full or self.as_of is None else self.as_of
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                np.savez(f, as_of=as_of, **columns)
+            os.replace(tmp_path, self.path)
+            self._install(columns, as_of)
+            with self._lock:
+                # Misses that failed are dropped too; they are not recorded again for failure_ttl
+                self._misses.difference_update(universe)
+                now = time.time()
+                self._failed = {s: t for s, t in self._failed.items() if now - t < self.failure_ttl}
+                self._failed.update((symbol, now) for symbol in failed)
+            logger.info(f"Fundamentals snapshot refreshed with {len(rows)} symbols")
+            return True
+        except Exception as e:
+            logger.error(f"Error refreshing fundamentals snapshot: {str(e)}")
+            return False
+
+    def _safe_fetch(self, symbol):
+        try:
+            return self._fetch(symbol)
+        except Exception as e:
+            logger.error(f"Error fetching fundamentals for {symbol}: {str(e)}")
+            return None
+
+    def _age(self):
+        """Seconds since the last full refresh, or None without a snapshot"""
+        return None if self.as_of is None else time.time() - self.as_of
+
+    def _refresh_loop(self):
+        delay = 0
+        while not self._stop.wait(delay):
+            age = self._age()
+            with self._lock:
+                misses = set(self._misses)
+            if age is None or age >= self.refresh_interval:
+                self.refresh()
+            elif misses:
+                self.refresh(misses, full=False)
+            age = self._age()
+            due = self.refresh_interval if age is None else self.refresh_interval - age
+            delay = max(min(due, self.miss_interval), 1)
+
+    def start(self, symbols=()):
+        """Load the snapshot and refresh it daily in the background for symbols and any misses"""
+        self.load()
+        with self._lock:
+            self._universe.update(symbols)
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._refresh_loop, name='fundamentals-snapshot', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop the background refresh"""
+        self._stop.set()
@@ -0,0 +1,205 @@
+import logging
+import threading
+from collections import deque
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+class BarAggregator:
+    """Build OHLCV bars per symbol from tick batches
+
+    Each drained batch is reduced in one pass: ticks are lexsorted by
+    (symbol, bar start, time) and each (symbol, bar) group is collapsed with
+    np.maximum/minimum/add.reduceat, so Python-level work scales with the
+    number of bars touched rather than the number of ticks. Bars stay open
+    until the event-time watermark (latest tick time minus the grace window)
+    passes their end, so ticks arriving late within the grace window still
+    land in the right bar; later ones are counted and dropped. Symbols with no
+    ticks in an interval get no bar.
+
+    Tick volume is the broker's cumulative day volume, so bar volume is the
+    increase in it over the bar.
+    """
+
+    def __init__(self, symbols, intervals=(60, 300), grace=2.0, history=500):
+        self.symbols = symbols                              # Shared with the feed; indexed by tick symbol_index
+        self.intervals = [int(i * 1000) for i in intervals]  # Bar lengths in milliseconds
+        self.grace = int(grace * 1000)                       # Late-tick allowance in milliseconds
+        self.history = history                               # Closed bars kept per symbol and interval
+        self.late_ticks = 0
+        self.watermark = None
+
+        self._open = {interval: {} for interval in self.intervals}     # (symbol index, start) -> bar
+        self._closed = {interval: {} for interval in self.intervals}   # symbol index -> deque of bars
+        self._last_volume = {}                                         # Symbol index -> cumulative volume
+        self._callbacks = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def on_bar_close(self, callback):
+        """Register callback(bar) for every finalized bar"""
+        self._callbacks.append(callback)
+        return callback
+
+    def _volume_deltas(self, symbols, volumes, order):
+        """Per-tick volume from cumulative volume, with ticks already in time order per symbol"""
+        symbols = symbols[order]
+        volumes = volumes[order].astype(np.float64)
+        previous = np.empty_like(volumes)
+        previous[1:] = volumes[:-1]
+        starts = np.flatnonzero(np.r_[True, symbols[1:] != symbols[:-1]])
+        previous[starts] = [self._last_volume.get(s, v) for s, v in zip(symbols[starts], volumes[starts])]
+        ends = np.r_[starts[1:], len(symbols)] - 1
+        for s, v in zip(symbols[ends], volumes[ends]):
+            self._last_volume[s] = max(v, self._last_volume.get(s, 0))
+        deltas = np.empty_like(volumes)
+        deltas[order] = np.maximum(volumes - previous, 0)
+        return deltas
+
+    def update(self, batch):
+        """Fold a batch of ticks (dict of arrays as drained from a TickRing) into the bars
+
+        Returns the bars finalized by this batch.
+        """
+        symbols = np.asarray(batch['symbol_index'])
+        if not len(symbols):
+            return []
+        prices = np.asarray(batch['price'], dtype=np.float64)
+        timestamps = np.asarray(batch['timestamp'], dtype=np.int64)
+
+        with self._lock:
+            time_order = np.lexsort((timestamps, symbols))
+            volumes = self._volume_deltas(symbols, np.asarray(batch['volume']), time_order)
+            for interval in self.intervals:
+                self._fold(interval, symbols, prices, volumes, timestamps)
+
+            batch_high = int(timestamps.max())
+            watermark = batch_high - self.grace
+            if self.watermark is None or watermark > self.watermark:
+                self.watermark = watermark
+            closed = self._finalize(self.watermark)
+
+        self._emit(closed)
+        return closed
+
+    def _fold(self, interval, symbols, prices, volumes, timestamps):
+        starts = timestamps - timestamps % interval
+        if self.watermark is not None:
+            # Bars that already closed cannot take more ticks
+            on_time = starts + interval > self.watermark
+            self.late_ticks += int(len(on_time) - on_time.sum())
+            if not on_time.all():
+                symbols, prices, volumes, timestamps, starts = (
+                    a[on_time] for a in (symbols, prices, volumes, timestamps, starts)
+                )
+                if not len(symbols):
+                    return
+
+        order = np.lexsort((timestamps, starts, symbols))
+        symbols, prices, volumes, timestamps, starts = (a[order] for a in (symbols, prices, volumes, timestamps, starts))
+        boundaries = np.flatnonzero(np.r_[True, (symbols[1:] != symbols[:-1]) | (starts[1:] != starts[:-1])])
+        last = np.r_[boundaries[1:], len(symbols)] - 1
+
+        highs = np.maximum.reduceat(prices, boundaries)
+        lows = np.minimum.reduceat(prices, boundaries)
+        bar_volumes = np.add.reduceat(volumes, boundaries)
+
+        open_bars = self._open[interval]
+        for j, first in enumerate(boundaries):
+            key = (int(symbols[first]), int(starts[first]))
+            bar = open_bars.get(key)
+            if bar is None:
+                open_bars[key] = [prices[first], highs[j], lows[j], prices[last[j]], bar_volumes[j],
+                                  timestamps[first], timestamps[last[j]]]
+                continue
+            # Late ticks can extend either end of a bar that is still open
+            if timestamps[first] < bar[5]:
+                bar[0], bar[5] = prices[first], timestamps[first]
+            if timestamps[last[j]] >= bar[6]:
+                bar[3], bar[6] = prices[last[j]], timestamps[last[j]]
+            bar[1] = max(bar[1], highs[j])
+            bar[2] = min(bar[2], lows[j])
+            bar[4] += bar_volumes[j]
+
+    def _finalize(self, watermark):
+        """Close open bars whose end is at or before the watermark; caller holds the lock"""
+        closed = []
+        for interval in self.intervals:
+            open_bars = self._open[interval]
+            due = sorted((start, symbol) for symbol, start in open_bars if watermark is None or start + interval <= watermark)
+            for start, symbol in due:
+                o, h, l, c, v, _, _ = open_bars.pop((symbol, start))
+                bar = {
+                    'symbol': self.symbols[symbol],
+                    'interval': interval // 1000,
+                    'timestamp': start,
+                    'open': float(o),
+                    'high': float(h),
+                    'low': float(l),
+                    'close': float(c),
+                    'volume': float(v)
+                }
+                history = self._closed[interval].get(symbol)
+                if history is None:
+                    history = self._closed[interval][symbol] = deque(maxlen=self.history)
+                history.append(bar)
+                closed.append(bar)
+        return closed
+
+    def _emit(self, bars):
+        for bar in bars:
+            for callback in self._callbacks:
+                try:
+                    callback(bar)
+                except Exception as e:
+                    logger.error(f"Error in bar close callback: {str(e)}")
+
+    def flush(self):
+        """Close every open bar, e.g. at the end of the session"""
+        with self._lock:
+            closed = self._finalize(None)
+        self._emit(closed)
+        return closed
+
+    def to_frame(self, symbol, interval=60):
+        """Closed bars of a symbol as an OHLCV DataFrame, as TechnicalAnalyzer expects"""
+        try:
+            index = self.symbols.index(symbol)
+        except ValueError:
+            return pd.DataFrame(columns=['Open', 'High', 'Low', 'Close', 'Volume'])
+        with self._lock:
+            bars = list(self._closed[int(interval * 1000)].get(index, ()))
+        df = pd.DataFrame(bars, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
+        df.index = pd.to_datetime(df.pop('timestamp'), unit='ms')
+        df.columns = ['Open', 'High', 'Low', 'Close', 'Volume']
+        return df
+
+    def consume(self, ring, max_items=None):
+        """Drain a TickRing into the bars"""
+        batch = ring.drain(max_items)
+        return self.update(batch) if len(batch['price']) else []
+
+    def _consume_loop(self, ring, poll_interval):
+        while not self._stop.wait(poll_interval):
+            try:
+                self.consume(ring)
+            except Exception as e:
+                logger.error(f"Error aggregating ticks: {str(e)}")
+
+    def start(self, ring, poll_interval=0.05):
+        """Consume ticks from ring in the background"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._consume_loop,
+                args=(ring, poll_interval),
+                name='bar-aggregator',
+                daemon=True
+            )
+            self._thread.start()
+
+    def stop(self):
+        """Stop background consumption"""
+        self._stop.set()
@@ -0,0 +1,235 @@
+import asyncio
+import json
+import logging
+import threading
+import uuid
+import numpy as np
+from websockets.asyncio.client import connect
+
+logger = logging.getLogger(__name__)
+
+FEED_URL = "wss://smartapisocket.angelone.in/smart-stream"
+
+# Subscription modes and exchange segment codes of the SmartAPI stream
+MODE_LTP = 1
+MODE_QUOTE = 2
+NSE_CM = 1
+
+# Binary tick packets are little-endian; prices are in paise
+LTP_PACKET = np.dtype({
+    'names': ['mode', 'exchange', 'token', 'sequence', 'exchange_timestamp', 'ltp'],
+    'formats': ['u1', 'u1', 'S25', '<i8', '<i8', '<i8'],
+    'offsets': [0, 1, 2, 27, 35, 43],
+    'itemsize': 51
+})
+QUOTE_PACKET = np.dtype({
+    'names': LTP_PACKET.names + ('last_traded_quantity', 'average_price', 'volume',
+                                 'total_buy_quantity', 'total_sell_quantity',
+                                 'open', 'high', 'low', 'close'),
+    'formats': ['u1', 'u1', 'S25', '<i8', '<i8', '<i8', '<i8', '<i8', '<i8',
+                '<f8', '<f8', '<i8', '<i8', '<i8', '<i8'],
+    'offsets': [0, 1, 2, 27, 35, 43, 51, 59, 67, 75, 83, 91, 99, 107, 115],
+    'itemsize': 123
+})
+
+class TickRing:
+    """Single-producer, single-consumer ring of ticks in preallocated arrays
+
+    The feed thread is the only writer of head and the consumer the only
+    writer of tail, so no lock is needed. When the ring is full new ticks are
+    dropped and counted rather than overwriting unread ones.
+    """
+
+    def __init__(self, capacity=65536):
+        self.capacity = capacity
+        self.symbol_index = np.zeros(capacity, dtype=np.int32)
+        self.price = np.zeros(capacity, dtype=np.float64)
+        self.volume = np.zeros(capacity, dtype=np.int64)
+        self.timestamp = np.zeros(capacity, dtype=np.int64)   # Exchange time, epoch milliseconds
+        self.dropped = 0
+        self._head = 0   # Total ticks written
+        self._tail = 0   # Total ticks read
+
+    def __len__(self):
+        return self._head - self._tail
+
+    def push(self, symbol_index, price, volume, timestamp):
+        """Append one tick; returns False if the ring is full"""
+        head = self._head
+        if head - self._tail >= self.capacity:
+            self.dropped += 1
+            return False
+        i = head % self.capacity
+        self.symbol_index[i] = symbol_index
+        self.price[i] = price
+        self.volume[i] = volume
+        self.timestamp[i] = timestamp
+        # Publish only after the slot is fully written
+        self._head = head + 1
+        return True
+
+    def drain(self, max_items=None):
+        """Copy out pending ticks in arrival order as a dict of arrays"""
+        tail = self._tail
+        count = self._head - tail
+        if max_items is not None:
+            count = min(count, max_items)
+        idx = (tail + np.arange(count)) % self.capacity
+        batch = {
+            'symbol_index': self.symbol_index[idx],
+            'price': self.price[idx],
+            'volume': self.volume[idx],
+            'timestamp': self.timestamp[idx]
+        }
+        self._tail = tail + count
+        return batch
+
+class MarketDataFeed:
+    """WebSocket tick feed for the SmartAPI streaming endpoint
+
+    Runs an asyncio client in a daemon thread, decodes each binary packet with
+    np.frombuffer and pushes it into a TickRing for the consumer. The latest
+    price per symbol is also kept in a preallocated array for point lookups.
+    Reconnects and resubscribes automatically.
+    """
+
+    def __init__(self, session, instruments, url=FEED_URL, mode=MODE_QUOTE, capacity=65536,
+                 max_symbols=1000, heartbeat_interval=10, reconnect_delay=1):
+        self.session = session            # Supplies access_token, feed_token, api_key and client_id
+        self.instruments = instruments    # Symbol -> token lookup
+        self.url = url
+        self.mode = mode
+        self.heartbeat_interval = heartbeat_interval
+        self.reconnect_delay = reconnect_delay
+        self.ticks = TickRing(capacity)
+        self.symbols = []
+        self.last_price = np.full(max_symbols, np.nan)
+        self.last_timestamp = np.zeros(max_symbols, dtype=np.int64)
+        self.connected = threading.Event()
+
+        self._token_index = {}   # Token bytes -> symbol index
+        self._symbol_index = {}
+        self._loop = None
+        self._task = None
+        self._ws = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    def get_ltp(self, symbol):
+        """Latest traded price of a subscribed symbol, or None before its first tick"""
+        i = self._symbol_index.get(symbol)
+        if i is None or np.isnan(self.last_price[i]):
+            return None
+        return float(self.last_price[i])
+
+    def subscribe(self, symbols):
+        """Add symbols to the subscription; resolves tokens through the instrument index"""
+        new_tokens = []
+        for symbol in symbols:
+            if symbol in self._symbol_index:
+                continue
+            if len(self.symbols) >= len(self.last_price):
+                logger.warning(f"Feed is full; not subscribing {symbol}")
+                break
+            token = self.instruments.get_token(symbol)
+            if token is None:
+                logger.warning(f"No instrument token for {symbol}; not subscribing")
+                continue
+            index = len(self.symbols)
+            self.symbols.append(symbol)
+            self._symbol_index[symbol] = index
+            self._token_index[token.encode()] = index
+            new_tokens.append(token)
+
+        if new_tokens and self._loop is not None and self.connected.is_set():
+            asyncio.run_coroutine_threadsafe(self._send_subscribe(new_tokens), self._loop)
+        return new_tokens
+
+    def _headers(self):
+        return {
+            'Authorization': f"Bearer {self.session.access_token}",
+            'x-api-key': self.session.api_key,
+            'x-client-code': self.session.client_id,
+            'x-feed-token': self.session.feed_token
+        }
+
+    async def _send_subscribe(self, tokens):
+        await self._ws.send(json.dumps({
+            'correlationID': uuid.uuid4().hex[:10],
+            'action': 1,
+            'params': {
+                'mode': self.mode,
+                'tokenList': [{'exchangeType': NSE_CM, 'tokens': list(tokens)}]
+            }
+        }))
+
+    def _on_packet(self, message):
+        """Decode one binary tick packet into the ring"""
+        if len(message) < LTP_PACKET.itemsize:
+            return
+        quote = len(message) >= QUOTE_PACKET.itemsize
+        packet = np.frombuffer(message, dtype=QUOTE_PACKET if quote else LTP_PACKET, count=1)[0]
+        index = self._token_index.get(packet['token'])
+        if index is None:
+            return
+        price = packet['ltp'] / 100.0
+        timestamp = int(packet['exchange_timestamp'])
+        self.last_price[index] = price
+        self.last_timestamp[index] = timestamp
+        self.ticks.push(index, price, packet['volume'] if quote else 0, timestamp)
+
+    async def _heartbeat(self, ws):
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            await ws.send('ping')
+
+    async def _run(self):
+        while not self._stop.is_set():
+            try:
+                async with connect(self.url, additional_headers=self._headers(), ping_interval=None) as ws:
+                    self._ws = ws
+                    # Mark connected first so symbols added meanwhile are sent, at worst twice
+                    self.connected.set()
+                    tokens = [token.decode() for token in list(self._token_index)]
+                    if tokens:
+                        await self._send_subscribe(tokens)
+                    heartbeat = asyncio.ensure_future(self._heartbeat(ws))
+                    try:
+                        async for message in ws:
+                            if isinstance(message, bytes):
+                                self._on_packet(message)
+                    finally:
+                        heartbeat.cancel()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Market data feed error: {str(e)}")
+            finally:
+                self.connected.clear()
+                self._ws = None
+            if not self._stop.is_set():
+                await asyncio.sleep(self.reconnect_delay)
+
+    def _thread_main(self):
+        self._loop = asyncio.new_event_loop()
+        try:
+            self._task = self._loop.create_task(self._run())
+            self._loop.run_until_complete(self._task)
+        finally:
+            self._loop.close()
+
+    def start(self, symbols=None):
+        """Connect in the background, subscribing to symbols"""
+        if symbols:
+            self.subscribe(symbols)
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._thread_main, name='market-data-feed', daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=5):
+        """Disconnect and stop the feed thread"""
+        self._stop.set()
+        if self._loop is not None and self._thread is not None and self._thread.is_alive():
+            self._loop.call_soon_threadsafe(self._task.cancel)
+            self._thread.join(timeout)
@@ -0,0 +1,120 @@
+import asyncio
+import json
+import logging
+import threading
+import time
+import numpy as np
+from websockets.asyncio.server import serve
+from backend.market_data.feed import LTP_PACKET, QUOTE_PACKET, MODE_LTP, MODE_QUOTE, NSE_CM
+
+logger = logging.getLogger(__name__)
+
+def encode_tick(token, ltp, mode=MODE_QUOTE, volume=0, sequence=0, exchange_timestamp=None, **fields):
+    """Encode one binary tick packet as sent by the SmartAPI stream; prices in rupees"""
+    packet = np.zeros(1, dtype=QUOTE_PACKET if mode == MODE_QUOTE else LTP_PACKET)
+    packet['mode'] = mode
+    packet['exchange'] = NSE_CM
+    packet['token'] = str(token).encode()
+    packet['sequence'] = sequence
+    packet['exchange_timestamp'] = exchange_timestamp if exchange_timestamp is not None else int(time.time() * 1000)
+    packet['ltp'] = round(ltp * 100)
+    if mode == MODE_QUOTE:
+        packet['volume'] = volume
+        for name, value in fields.items():
+            packet[name] = round(value * 100) if name in ('open', 'high', 'low', 'close', 'average_price') else value
+    return packet.tobytes()
+
+class LocalFeedServer:
+    """Local stand-in for the SmartAPI streaming endpoint
+
+    Accepts subscribe messages, answers 'ping' with 'pong' and sends published
+    ticks to every client subscribed to the token. Runs in its own thread;
+    used by the tests and for development without market hours.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0):
+        self.host = host
+        self.port = port
+        self.connections = 0
+        self.headers = []        # Request headers of each connection, for auth checks
+        self._subscriptions = {}  # Connection -> (mode, set of tokens)
+        self._loop = None
+        self._thread = None
+        self._ready = threading.Event()
+        self._stopped = None
+
+    @property
+    def url(self):
+        return f"ws://{self.host}:{self.port}/smart-stream"
+
+    def subscribed_tokens(self):
+        """All tokens any client is currently subscribed to"""
+        tokens = set()
+        for _, subscribed in list(self._subscriptions.values()):
+            tokens |= subscribed
+        return tokens
+
+    async def _handler(self, ws):
+        self.connections += 1
+        self.headers.append(dict(ws.request.headers))
+        self._subscriptions[ws] = (MODE_LTP, set())
+        try:
+            async for message in ws:
+                if message == 'ping':
+                    await ws.send('pong')
+                    continue
+                request = json.loads(message)
+                params = request.get('params', {})
+                mode, tokens = self._subscriptions[ws]
+                requested = {t for group in params.get('tokenList', []) for t in group.get('tokens', [])}
+                if request.get('action') == 1:
+                    self._subscriptions[ws] = (params.get('mode', mode), tokens | requested)
+                elif request.get('action') == 0:
+                    self._subscriptions[ws] = (mode, tokens - requested)
+        finally:
+            self._subscriptions.pop(ws, None)
+
+    async def _broadcast(self, token, ltp, kwargs):
+        for ws, (mode, tokens) in list(self._subscriptions.items()):
+            if token in tokens:
+                await ws.send(encode_tick(token, ltp, mode=mode, **kwargs))
+
+    def publish(self, token, ltp, **kwargs):
+        """Send a tick for token to its subscribers; blocks until sent"""
+        future = asyncio.run_coroutine_threadsafe(self._broadcast(str(token), ltp, kwargs), self._loop)
+        future.result(timeout=5)
+
+    def disconnect_all(self):
+        """Drop every client connection, e.g. to exercise reconnects"""
+        async def close():
+            for ws in list(self._subscriptions):
+                await ws.close()
+        asyncio.run_coroutine_threadsafe(close(), self._loop).result(timeout=5)
+
+    async def _serve(self):
+        self._stopped = asyncio.Event()
+        async with serve(self._handler, self.host, self.port) as server:
+            self.port = server.sockets[0].getsockname()[1]
+            self._ready.set()
+            await self._stopped.wait()
+
+    def _thread_main(self):
+        self._loop = asyncio.new_event_loop()
+        try:
+            self._loop.run_until_complete(self._serve())
+        finally:
+            self._loop.close()
+
+    def start(self):
+        """Start serving in a background thread and wait until it listens"""
+        self._thread = threading.Thread(target=self._thread_main, name='local-feed-server', daemon=True)
+        self._thread.start()
+        if not self._ready.wait(5):
+            raise RuntimeError("Local feed server did not start")
+        return self
+
+    def stop(self):
+        """Stop the server"""
+        if self._loop is not None and self._thread.is_alive():
+            self._loop.call_soon_threadsafe(self._stopped.set)
+            self._thread.join(5)
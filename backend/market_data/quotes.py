@@ -0,0 +1,132 @@
+import logging
+import threading
+import time
+import pandas as pd
+import yfinance as yf
+
+logger = logging.getLogger(__name__)
+
+class QuoteService:
+    """Last-price lookups served from memory
+
+    Prices come from, in order of preference: the streaming feed, a cached
+    price that has not expired, and a batched yfinance download of every
+    missing symbol in one request. Fetched prices live for a sub-second TTL
+    so a burst of lookups (e.g. a basket of orders) shares one download;
+    prices pushed in with update() or by the background refresh can live
+    longer. Concurrent misses wait on one fetch instead of each downloading.
+    """
+
+    def __init__(self, feed=None, ttl=0.5, timeout=10):
+        self.feed = feed          # Optional MarketDataFeed
+        self.ttl = ttl            # Seconds a fetched price stays fresh
+        self.timeout = timeout    # Download timeout in seconds
+        self._prices = {}         # symbol -> (price, expires_at)
+        self._fetch_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def update(self, prices, max_age=None):
+        """Store known prices, e.g. the closes the screener just analysed"""
+        expires_at = time.monotonic() + (self.ttl if max_age is None else max_age)
+        for symbol, price in prices.items():
+            if price is not None and price == price:
+                self._prices[symbol] = (float(price), expires_at)
+
+    def _cached(self, symbol, now):
+        """Fresh price from the feed or cache, or None"""
+        if self.feed is not None:
+            price = self.feed.get_ltp(symbol)
+            if price is not None:
+                return price
+        entry = self._prices.get(symbol)
+        if entry is not None and entry[1] > now:
+            return entry[0]
+        return None
+
+    def _download(self, symbols):
+        """Latest one-minute close for each symbol in a single request"""
+        data = yf.download(symbols, period='1d', interval='1m', progress=False, threads=True, timeout=self.timeout)
+        if data is None or data.empty:
+            return {}
+        closes = data['Close']
+        if isinstance(closes, pd.Series):
+            closes = closes.to_frame(symbols[0])
+        last = closes.ffill().iloc[-1]
+        return {symbol: float(price) for symbol, price in last.items() if pd.notna(price)}
+
+    def get_prices(self, symbols):
+        """Last prices for symbols; one download covers every symbol not in memory"""
+        now = time.monotonic()
+        prices = {}
+        missing = []
+        for symbol in symbols:
+            price = self._cached(symbol, now)
+            if price is None:
+                missing.append(symbol)
+            else:
+                prices[symbol] = price
+        if not missing:
+            return prices
+
+        with self._fetch_lock:
+            # Another caller may have fetched these while we waited
+            now = time.monotonic()
+            still_missing = []
+            for symbol in missing:
+                price = self._cached(symbol, now)
+                if price is None:
+                    still_missing.append(symbol)
+                else:
+                    prices[symbol] = price
+            if still_missing:
+                try:
+                    fetched = self._download(still_missing)
+                    self.update(fetched)
+                    prices.update(fetched)
+                except Exception as e:
+                    logger.error(f"Error fetching quotes: {str(e)}")
+
+        # Fall back to the last known price, however old, rather than nothing
+        for symbol in missing:
+            if symbol not in prices and symbol in self._prices:
+                prices[symbol] = self._prices[symbol][0]
+        return prices
+
+    def get_price(self, symbol):
+        """Last price of one symbol, or None if it is unknown"""
+        price = self._cached(symbol, time.monotonic())
+        if price is not None:
+            return price
+        return self.get_prices([symbol]).get(symbol)
+
+    def refresh(self, symbols, max_age=None):
+        """Batch-download prices for symbols into memory"""
+        try:
+            fetched = self._download(list(symbols))
+            self.update(fetched, max_age)
+            return fetched
+        except Exception as e:
+            logger.error(f"Error refreshing quotes: {str(e)}")
+            return {}
+
+    def _refresh_loop(self, symbols, interval):
+        while not self._stop.wait(interval):
+            self.refresh(symbols, max_age=2 * interval)
+
+    def start(self, symbols, interval=5):
+        """Refresh symbols every interval seconds so lookups never wait on a download"""
+        if self._thread is None or not self._thread.is_alive():
+            self.refresh(symbols, max_age=2 * interval)
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._refresh_loop,
+                args=(list(symbols), interval),
+                name='quote-refresh',
+                daemon=True
+            )
+            self._thread.start()
+
+    def stop(self):
+        """Stop the background refresh"""
+        self._stop.set()
@@ -1,10 +1,16 @@
-from sklearn.preprocessing import MinMaxScaler
 import numpy as np
+import pandas as pd
 
 class TradeRecommender:
+    # Flattened feature columns used by the batch API, with the defaults the
+    # scalar scorers fall back to when a key is missing
+    FEATURE_DEFAULTS = {
+        'sentiment': {'overall_score': 0},
+        'technical': {'rsi': 50, 'macd': 0, 'macd_signal': 0, 'sma_20': 0, 'sma_50': 0},
+        'fundamental': {'pe_ratio': 0, 'revenue_growth': 0, 'profit_margins': 0}
+    }
+    
     def __init__(self):
-        self.scaler = MinMaxScaler()
-        
         # Define weights for different analysis components
         self.weights = {
             'sentiment': 0.3,
@@ -12,7 +18,7 @@ class TradeRecommender:
             'fundamental': 0.3
         }
     
-    def get_recommendation(self, sentiment_data, technical_data, fundamental_data):
+    def get_recommendation(self, sentiment_data, technical_data, fundamental_data, current_price=None):
         # Calculate individual scores
         sentiment_score = self._calculate_sentiment_score(sentiment_data)
         technical_score = self._calculate_technical_score(technical_data)
@@ -25,8 +31,10 @@ class TradeRecommender:
             fundamental_score * self.weights['fundamental']
         )
         
-        # Generate recommendation
-        recommendation = self._generate_recommendation(final_score)
+        # Generate recommendation around the latest traded price
+        if current_price is None and technical_data:
+            current_price = technical_data.get('current_price')
+        recommendation = self._generate_recommendation(final_score, current_price)
         
         return {
             'recommendation': recommendation['action'],
@@ -110,27 +118,149 @@ class TradeRecommender:
         # Normalize score to [0, 1] range
         return (score + 3) / 6
     
-    def _generate_recommendation(self, score):
-        current_price = 100  # This should be fetched from real-time data
+    def _generate_recommendation(self, score, current_price=None):
+        if current_price is None:
+            # Without a price only the action and confidence are meaningful
+            current_price = np.nan
         
         if score >= 0.7:
-            return {
+            recommendation = {
                 'action': 'BUY',
                 'confidence': score,
                 'target_price': current_price * 1.1,  # 10% profit target
                 'stop_loss': current_price * 0.95  # 5% stop loss
             }
         elif score <= 0.3:
-            return {
+            recommendation = {
                 'action': 'SELL',
                 'confidence': 1 - score,
                 'target_price': current_price * 0.9,  # 10% profit target
                 'stop_loss': current_price * 1.05  # 5% stop loss
             }
         else:
-            return {
+            recommendation = {
                 'action': 'HOLD',
                 'confidence': 0.5,
                 'target_price': current_price,
                 'stop_loss': current_price * 0.95
             }
+        
+        for key in ['target_price', 'stop_loss']:
+            if np.isnan(recommendation[key]):
+                recommendation[key] = None
+        return recommendation
+    
+    @classmethod
+    def features_from_analysis(cls, sentiment_data, technical_data, fundamental_data, current_price=None):
+        """Flatten one symbol's analysis dicts into a row for get_recommendations_batch
+        
+        Uses the same keys as the scalar scorers. A missing component leaves its
+        columns NaN so the batch scorer falls back to a neutral 0.5.
+        """
+        row = {column: np.nan for defaults in cls.FEATURE_DEFAULTS.values() for column in defaults}
+        
+        if sentiment_data:
+            row['overall_score'] = sentiment_data.get('overall_score', 0)
+        
+        if technical_data:
+            indicators = technical_data.get('indicators', {})
+            macd = indicators.get('macd', {})
+            sma = indicators.get('sma', {})
+            row.update({
+                'rsi': indicators.get('rsi', 50),
+                'macd': macd.get('macd', 0),
+                'macd_signal': macd.get('signal', 0),
+                'sma_20': sma.get('20', 0),
+                'sma_50': sma.get('50', 0)
+            })
+            if current_price is None:
+                current_price = technical_data.get('current_price')
+        
+        if fundamental_data:
+            row.update({
+                'pe_ratio': fundamental_data.get('pe_ratio', 0),
+                'revenue_growth': fundamental_data.get('revenue_growth', 0),
+                'profit_margins': fundamental_data.get('profit_margins', 0)
+            })
+        
+        row['current_price'] = np.nan if current_price is None else current_price
+        return row
+    
+    def _component_frame(self, features, component):
+        """Feature columns of one component with defaults filled in, plus a missing mask"""
+        defaults = self.FEATURE_DEFAULTS[component]
+        frame = features.reindex(columns=list(defaults)).astype(float)
+        missing = frame.isna().all(axis=1).to_numpy()
+        return frame.fillna(defaults), missing
+    
+    def _sentiment_scores(self, features):
+        frame, missing = self._component_frame(features, 'sentiment')
+        scores = (frame['overall_score'].to_numpy() + 1) / 2
+        return np.where(missing, 0.5, scores)
+    
+    def _technical_scores(self, features):
+        frame, missing = self._component_frame(features, 'technical')
+        rsi = frame['rsi'].to_numpy()
+        score = (
+            (rsi < 30).astype(int) - (rsi > 70).astype(int)
+            + np.where(frame['macd'].to_numpy() > frame['macd_signal'].to_numpy(), 1, -1)
+            + np.where(frame['sma_20'].to_numpy() > frame['sma_50'].to_numpy(), 1, -1)
+        )
+        return np.where(missing, 0.5, (score + 3) / 6)
+    
+    def _fundamental_scores(self, features):
+        frame, missing = self._component_frame(features, 'fundamental')
+        pe_ratio = frame['pe_ratio'].to_numpy()
+        revenue_growth = frame['revenue_growth'].to_numpy()
+        profit_margins = frame['profit_margins'].to_numpy()
+        score = (
+            ((pe_ratio > 0) & (pe_ratio < 25)).astype(int) - (pe_ratio > 50).astype(int)
+            + (revenue_growth > 10).astype(int) - (revenue_growth < 0).astype(int)
+            + (profit_margins > 0.2).astype(int) - (profit_margins < 0).astype(int)
+        )
+        return np.where(missing, 0.5, (score + 3) / 6)
+    
+    def get_recommendations_batch(self, features, cross_section=None):
+        """Score a whole universe at once
+        
+        features is a DataFrame indexed by symbol with the columns listed in
+        FEATURE_DEFAULTS plus current_price (see features_from_analysis).
+        With a CrossSection, the fundamental score is the symbol's
+        sector-relative composite rank instead of the absolute thresholds,
+        for every symbol it ranks.
+        Returns a DataFrame with the same fields as get_recommendation.
+        """
+        sentiment_score = self._sentiment_scores(features)
+        technical_score = self._technical_scores(features)
+        fundamental_score = self._fundamental_scores(features)
+        if cross_section is not None:
+            composite = cross_section.frame['composite'].reindex(features.index).to_numpy(dtype=float)
+            fundamental_score = np.where(np.isnan(composite), fundamental_score, composite)
+        
+        final_score = (
+            sentiment_score * self.weights['sentiment'] +
+            technical_score * self.weights['technical'] +
+            fundamental_score * self.weights['fundamental']
+        )
+        
+        buy = final_score >= 0.7
+        sell = ~buy & (final_score <= 0.3)
+        if 'current_price' in features:
+            current_price = features['current_price'].astype(float).to_numpy()
+        else:
+            current_price = np.full(len(features), np.nan)
+        
+        return pd.DataFrame({
+            'recommendation': np.select([buy, sell], ['BUY', 'SELL'], default='HOLD'),
+            'confidence': np.select([buy, sell], [final_score, 1 - final_score], default=0.5),
+            'target_price': np.select([buy, sell], [current_price * 1.1, current_price * 0.9], default=current_price),
+            'stop_loss': np.select([buy, sell], [current_price * 0.95, current_price * 1.05], default=current_price * 0.95),
+            'overall_score': final_score,
+            'sentiment_score': sentiment_score,
+            'technical_score': technical_score,
+            'fundamental_score': fundamental_score
+        }, index=features.index)
+    
+    def rank_universe(self, features, cross_section=None):
+        """Batch-score the universe and order it from strongest BUY to strongest SELL"""
+        return self.get_recommendations_batch(features, cross_section).sort_values('overall_score', ascending=False)
@@ -2,8 +2,12 @@ import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 import logging
+import threading
 from backend.broker_integration.broker import BrokerClient
+from backend.broker_integration.order_queue import OrderQueue
 from backend.risk_management.calculator import RiskCalculator
+from backend.risk_management.allocator import PortfolioAllocator
+from backend.risk_management.risk_book import PortfolioRiskBook
 
 logger = logging.getLogger(__name__)
 
@@ -15,25 +19,51 @@ class RecommendationEngine:
         self.executed_trades = []
         self.max_active_trades = 5
         self.max_position_size = 0.1  # 10% of portfolio per trade
+        self.stop_loss_atr_multiple = 2  # Stop loss distance in ATRs
+        self.target_reward_multiple = 2  # Reward multiple when no resistance is found
+        self.risk_book = PortfolioRiskBook()  # Reconciled with broker positions every cycle
+        self.allocator = PortfolioAllocator(
+            self.risk_calculator,
+            max_active_trades=self.max_active_trades,
+            max_position_size=self.max_position_size
+        )
+        # Orders are placed off the request thread, in priority order and within broker rate limits
+        self.order_queue = OrderQueue(self.execute_recommendation)
+        self._lock = threading.Lock()
         
     def process_signals(self, screening_results):
         """Process screening results and generate actionable recommendations"""
         current_positions = self.broker.get_positions()
         portfolio_value = self.broker.get_portfolio_value()
+        if current_positions is not None:
+            # Positions closed by stops, manual trades or the broker leave the book here
+            self.risk_book.reconcile(current_positions)
+        else:
+            current_positions = []
+        for result in screening_results:
+            price = result.get('analysis', {}).get('current_price')
+            if price is not None:
+                self.risk_book.on_price(result['symbol'], price)
         
         recommendations = []
+        entry_candidates = []
         for result in screening_results:
             try:
-                recommendation = self._create_recommendation(
-                    result, 
-                    current_positions,
-                    portfolio_value
-                )
-                if recommendation:
+                recommendation = self._create_recommendation(result, current_positions)
+                if not recommendation:
+                    continue
+                if recommendation['type'] == 'ENTRY':
+                    entry_candidates.append(recommendation)
+                else:
                     recommendations.append(recommendation)
             except Exception as e:
                 logger.error(f"Error processing signal for {result['symbol']}: {e}")
         
+        # Size, score and validate all entries in one vectorized pass
+        recommendations.extend(
+            self._size_entries(entry_candidates, current_positions, portfolio_value)
+        )
+        
         # Sort recommendations by priority
         recommendations.sort(key=lambda x: x['priority'], reverse=True)
         
@@ -41,7 +71,7 @@ class RecommendationEngine:
         self.active_recommendations = recommendations
         return recommendations
     
-    def _create_recommendation(self, screening_result, current_positions, portfolio_value):
+    def _create_recommendation(self, screening_result, current_positions):
         """Create a trading recommendation based on screening results and current positions"""
         symbol = screening_result['symbol']
         signals = screening_result['signals']
@@ -79,65 +109,164 @@ class RecommendationEngine:
                 })
                 return recommendation
         else:
-            # No position, check for entry
+            # No position, check for entry; sizing happens in _size_entries
             if buy_score > sell_score and buy_score >= 2:
-                # Calculate position size
-                risk_params = self.risk_calculator.calculate_risk_parameters(
-                    symbol,
-                    portfolio_value,
-                    analysis
-                )
-                
-                if risk_params['risk_level'] in ['LOW', 'MEDIUM']:
-                    recommendation.update({
-                        'action': 'BUY',
-                        'type': 'ENTRY',
-                        'quantity': risk_params['suggested_quantity'],
-                        'priority': buy_score,
-                        'reasons': [s['reason'] for s in buy_signals],
-                        'risk_level': risk_params['risk_level'],
-                        'stop_loss': risk_params['stop_loss'],
-                        'target': risk_params['target']
-                    })
-                    return recommendation
+                entry_price = analysis['current_price']
+                stop_loss, target = self._entry_levels(entry_price, analysis)
+                recommendation.update({
+                    'action': 'BUY',
+                    'type': 'ENTRY',
+                    'priority': buy_score,
+                    'reasons': [s['reason'] for s in buy_signals],
+                    'entry_price': entry_price,
+                    'stop_loss': stop_loss,
+                    'target': target
+                })
+                return recommendation
         
         return None
     
+    def _entry_levels(self, price, analysis):
+        """Derive stop loss from ATR and target from the nearest resistance"""
+        atr = analysis.get('indicators', {}).get('volatility', {}).get('atr')
+        if not atr or np.isnan(atr):
+            atr = price * self.risk_calculator.max_loss_percent
+        stop_loss = price - self.stop_loss_atr_multiple * atr
+        
+        resistances = [level for level in analysis.get('support_resistance', []) if level > price]
+        if resistances:
+            target = min(resistances)
+        else:
+            target = price + self.target_reward_multiple * (price - stop_loss)
+        return stop_loss, target
+    
+    def _size_entries(self, candidates, current_positions, portfolio_value):
+        """Size, score and allocate entry candidates as one batch"""
+        if not candidates:
+            return []
+        
+        prices = np.array([c['entry_price'] for c in candidates], dtype=float)
+        stop_losses = np.array([c['stop_loss'] for c in candidates], dtype=float)
+        targets = np.array([c['target'] for c in candidates], dtype=float)
+        priorities = np.array([c['priority'] for c in candidates], dtype=float)
+        
+        quantities = self.risk_calculator.calculate_position_sizes(prices, stop_losses, portfolio_value)
+        risk_reward = self.risk_calculator.calculate_risk_reward_ratios(prices, stop_losses, targets)
+        # Per-trade checks only; portfolio-level limits are applied by the allocator
+        valid, reasons = self.risk_calculator.validate_trades(prices, quantities, stop_losses, portfolio_value)
+        risk_levels = np.select(
+            [valid & (risk_reward >= 2), valid & (risk_reward >= 1)],
+            ['LOW', 'MEDIUM'],
+            default='HIGH'
+        )
+        
+        # Share the risk budget and active-trade slots across the whole batch
+        acceptable = np.isin(risk_levels, ['LOW', 'MEDIUM'])
+        allocation = self.allocator.allocate(
+            prices,
+            stop_losses,
+            np.where(acceptable, quantities, 0),
+            priorities,
+            portfolio_value,
+            existing_positions=self.risk_book,
+            risk_reward=risk_reward
+        )
+        
+        recommendations = []
+        for i, candidate in enumerate(candidates):
+            if allocation[i] <= 0:
+                logger.debug(f"Skipping {candidate['symbol']}: {reasons[i]}")
+                continue
+            candidate.update({
+                'quantity': int(allocation[i]),
+                'risk_reward': float(risk_reward[i]),
+                'risk_level': str(risk_levels[i])
+            })
+            recommendations.append(candidate)
+        return recommendations
+    
+    def update_stop_loss(self, symbol, stop_loss):
+        """Move an open position's stop loss, e.g. when it is trailed"""
+        self.risk_book.on_stop_loss(symbol, stop_loss)
+    
     def _get_strength_score(self, strength):
         """Convert strength label to numeric score"""
         return {'weak': 1, 'medium': 2, 'strong': 3}.get(strength, 0)
     
-    def execute_recommendation(self, recommendation_id):
-        """Execute a trading recommendation"""
+    def submit_recommendation(self, recommendation_id, idempotency_key=None):
+        """Queue a recommendation for execution and return a tracking id"""
         rec = next((r for r in self.active_recommendations if r['id'] == recommendation_id), None)
         if not rec:
             raise ValueError(f"Recommendation {recommendation_id} not found")
         
+        return self.order_queue.submit(
+            recommendation_id,
+            priority=rec['priority'],
+            idempotency_key=idempotency_key or recommendation_id
+        )
+    
+    def get_execution_status(self, tracking_id):
+        """Get the state of a queued execution"""
+        return self.order_queue.get(tracking_id)
+    
+    def _order_params(self, rec):
+        """Broker order arguments for a recommendation, in the basket order shape"""
+        return {
+            'symbol': rec['symbol'],
+            'quantity': rec['quantity'],
+            'order_type': 'MARKET',
+            'transaction_type': rec['action'],
+            'stop_loss': rec.get('stop_loss'),
+            'target': rec.get('target')
+        }
+    
+    def _record_trade(self, rec, order_id):
+        """Record an executed trade; caller holds self._lock"""
+        trade_record = {
+            'recommendation_id': rec['id'],
+            'order_id': order_id,
+            'symbol': rec['symbol'],
+            'action': rec['action'],
+            'quantity': rec['quantity'],
+            'timestamp': pd.Timestamp.now(),
+            'status': 'EXECUTED'
+        }
+        self.executed_trades.append(trade_record)
+        
+        # Keep the running portfolio risk current with the fill
+        signed_quantity = rec['quantity'] if rec['action'] == 'BUY' else -rec['quantity']
+        self.risk_book.on_fill(rec['symbol'], signed_quantity, rec.get('entry_price'), rec.get('stop_loss'))
+        return trade_record
+    
+    def _claim(self, recommendation_ids):
+        """Take recommendations out of the active list so no other path executes them"""
+        wanted = set(recommendation_ids)
+        with self._lock:
+            recs = [r for r in self.active_recommendations if r['id'] in wanted]
+            self.active_recommendations = [r for r in self.active_recommendations if r['id'] not in wanted]
+        return recs
+    
+    def _release(self, recs):
+        """Return claimed recommendations that were not executed"""
+        if recs:
+            with self._lock:
+                self.active_recommendations.extend(recs)
+                self.active_recommendations.sort(key=lambda x: x['priority'], reverse=True)
+    
+    def execute_recommendation(self, recommendation_id):
+        """Execute a trading recommendation"""
+        claimed = self._claim([recommendation_id])
+        if not claimed:
+            raise ValueError(f"Recommendation {recommendation_id} not found")
+        rec = claimed[0]
+        
         try:
             # Place the order
-            order = self.broker.place_order(
-                symbol=rec['symbol'],
-                quantity=rec['quantity'],
-                order_type='MARKET',
-                transaction_type=rec['action'],
-                stop_loss=rec.get('stop_loss'),
-                target=rec.get('target')
-            )
+            order = self.broker.place_order(**self._order_params(rec))
             
             # Record the executed trade
-            trade_record = {
-                'recommendation_id': rec['id'],
-                'order_id': order['order_id'],
-                'symbol': rec['symbol'],
-                'action': rec['action'],
-                'quantity': rec['quantity'],
-                'timestamp': pd.Timestamp.now(),
-                'status': 'EXECUTED'
-            }
-            self.executed_trades.append(trade_record)
-            
-            # Remove from active recommendations
-            self.active_recommendations = [r for r in self.active_recommendations if r['id'] != recommendation_id]
+            with self._lock:
+                trade_record = self._record_trade(rec, order['order_id'])
             
             return {
                 'status': 'success',
@@ -146,11 +275,47 @@ class RecommendationEngine:
             
         except Exception as e:
             logger.error(f"Error executing recommendation {recommendation_id}: {e}")
+            self._release([rec])
             return {
                 'status': 'error',
                 'error': str(e)
             }
     
+    def execute_recommendations(self, recommendation_ids):
+        """Execute several recommendations as one concurrently submitted basket"""
+        recs = self._claim(recommendation_ids)
+        if not recs:
+            raise ValueError("None of the recommendations were found")
+        
+        try:
+            # Paced by the order queue's token bucket, so baskets and queued orders share one rate limit
+            basket = self.broker.place_basket_order(
+                [self._order_params(rec) for rec in recs],
+                rate_limiter=self.order_queue.rate_limiter
+            )
+        except Exception:
+            self._release(recs)
+            raise
+        
+        trades = []
+        failed = []
+        with self._lock:
+            for rec, result in zip(recs, basket['results']):
+                if result['status'] == 'success':
+                    trades.append(self._record_trade(rec, result['order']['order_id']))
+                else:
+                    logger.error(f"Error executing recommendation {rec['id']}: {result['error']}")
+                    failed.append({'recommendation_id': rec['id'], 'error': result['error']})
+        
+        executed = {t['recommendation_id'] for t in trades}
+        self._release([rec for rec in recs if rec['id'] not in executed])
+        
+        return {
+            'status': basket['status'],
+            'trades': trades,
+            'failed': failed
+        }
+    
     def get_active_recommendations(self):
         """Get current active recommendations"""
         # Clean up old recommendations
@@ -0,0 +1,80 @@
+import logging
+import numpy as np
+from backend.risk_management.calculator import RiskCalculator
+from backend.risk_management.risk_book import PortfolioRiskBook
+
+logger = logging.getLogger(__name__)
+
+class PortfolioAllocator:
+    def __init__(self, risk_calculator=None, max_active_trades=5, max_position_size=0.1):
+        self.risk_calculator = risk_calculator or RiskCalculator()
+        self.max_active_trades = max_active_trades  # Maximum number of open positions
+        self.max_position_size = max_position_size  # Maximum fraction of portfolio per trade
+
+    def allocate(self, prices, stop_losses, quantities, priorities, portfolio_value,
+                 existing_positions=None, risk_reward=None):
+        """Allocate quantities across competing BUY candidates under portfolio limits
+
+        Candidates are ranked by priority (then risk-reward, then smaller risk)
+        and filled greedily up to their requested quantity until the remaining
+        portfolio risk budget or the free active-trade slots run out. Returns an
+        integer array of allocated quantities aligned with the inputs.
+        """
+        prices = np.asarray(prices, dtype=float)
+        stop_losses = np.asarray(stop_losses, dtype=float)
+        quantities = np.asarray(quantities, dtype=float)
+        priorities = np.asarray(priorities, dtype=float)
+        risk_reward = np.zeros(len(prices)) if risk_reward is None else np.asarray(risk_reward, dtype=float)
+
+        allocation = np.zeros(len(prices), dtype=np.int64)
+        try:
+            if not len(prices) or not portfolio_value:
+                return allocation
+
+            # Remaining portfolio risk budget and free slots
+            if existing_positions is None:
+                existing_positions = []
+            existing_risk = self.risk_calculator.calculate_portfolio_risk(existing_positions, portfolio_value)
+            budget = (self.risk_calculator.max_portfolio_risk - existing_risk) * portfolio_value
+            if isinstance(existing_positions, PortfolioRiskBook):
+                open_trades = len(existing_positions)
+            else:
+                open_trades = sum(1 for p in existing_positions if p.get('quantity'))
+            slots = self.max_active_trades - open_trades
+            if budget <= 0 or slots <= 0:
+                return allocation
+
+            # Per-trade caps: requested size, absolute and portfolio-relative position limits
+            with np.errstate(divide='ignore', invalid='ignore'):
+                risk_per_share = np.abs(prices - stop_losses)
+                caps = np.minimum.reduce([
+                    quantities,
+                    np.floor(self.risk_calculator.max_position_size / prices),
+                    np.floor(self.max_position_size * portfolio_value / prices)
+                ])
+            eligible = np.isfinite(caps) & (caps > 0) & np.isfinite(risk_per_share) & (risk_per_share > 0)
+
+            # Rank by priority, then risk-reward, then lower risk per trade
+            order = np.lexsort((caps * risk_per_share, -risk_reward, -priorities))
+            order = order[eligible[order]]
+            if not len(order):
+                return allocation
+            min_risk = risk_per_share[order].min()
+
+            # Greedy fill; the loop is bounded by the number of candidates and
+            # exits as soon as the budget or slots are exhausted
+            remaining = budget
+            for i in order:
+                quantity = min(caps[i], np.floor(remaining / risk_per_share[i]))
+                if quantity <= 0:
+                    continue
+                allocation[i] = quantity
+                remaining -= quantity * risk_per_share[i]
+                slots -= 1
+                if slots == 0 or remaining < min_risk:
+                    break
+
+            return allocation
+        except Exception as e:
+            logger.error(f"Error allocating portfolio: {str(e)}")
+            return np.zeros(len(prices), dtype=np.int64)
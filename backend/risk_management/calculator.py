@@ -1,4 +1,6 @@
 import logging
+import numpy as np
+from backend.risk_management.risk_book import PortfolioRiskBook
 
 logger = logging.getLogger(__name__)
 
@@ -66,6 +68,10 @@ class RiskCalculator:
             if not positions or not portfolio_value:
                 return 0
             
+            # A risk book keeps the total current, so no need to re-sum it
+            if isinstance(positions, PortfolioRiskBook):
+                return positions.portfolio_risk(portfolio_value)
+            
             total_risk = sum(
                 abs(pos['current_price'] - pos['stop_loss']) * pos['quantity']
                 for pos in positions
@@ -113,5 +119,100 @@ class RiskCalculator:
             logger.error(f"Error validating trade: {str(e)}")
             return False, f"Error validating trade: {str(e)}"
 
+    def calculate_position_sizes(self, prices, stop_losses, portfolio_value):
+        """Vectorized calculate_position_size for arrays of candidate trades"""
+        try:
+            prices = np.asarray(prices, dtype=float)
+            stop_losses = np.asarray(stop_losses, dtype=float)
+            if not portfolio_value:
+                return np.zeros(np.broadcast(prices, stop_losses).shape, dtype=np.int64)
+
+            with np.errstate(divide='ignore', invalid='ignore'):
+                # Calculate risk per share
+                risk_per_share = np.abs(prices - stop_losses)
+
+                # Calculate number of shares based on risk
+                max_risk_amount = portfolio_value * self.max_loss_percent
+                shares = max_risk_amount / risk_per_share
+                position_value = shares * prices
+
+                # Cap against maximum position size and portfolio risk, in the
+                # same order as the scalar version
+                shares = np.where(position_value > self.max_position_size,
+                                  self.max_position_size / prices, shares)
+                max_position_value = portfolio_value * self.max_portfolio_risk
+                shares = np.where(position_value > max_position_value,
+                                  max_position_value / prices, shares)
+
+            valid = (prices != 0) & (stop_losses != 0) & (risk_per_share != 0) & np.isfinite(shares)
+            return np.where(valid, np.trunc(np.where(valid, shares, 0)), 0).astype(np.int64)
+        except Exception as e:
+            logger.error(f"Error calculating position sizes: {str(e)}")
+            return np.zeros(np.shape(prices), dtype=np.int64)
+
+    def calculate_risk_reward_ratios(self, entry_prices, stop_losses, target_prices):
+        """Vectorized calculate_risk_reward_ratio for arrays of candidate trades"""
+        try:
+            entry_prices = np.asarray(entry_prices, dtype=float)
+            stop_losses = np.asarray(stop_losses, dtype=float)
+            target_prices = np.asarray(target_prices, dtype=float)
+
+            risk = np.abs(entry_prices - stop_losses)
+            reward = np.abs(target_prices - entry_prices)
+
+            # Missing (None/NaN/zero) inputs and zero risk score 0, as in the scalar version
+            valid = ((entry_prices != 0) & (stop_losses != 0) & (target_prices != 0)
+                     & np.isfinite(risk) & np.isfinite(reward) & (risk != 0))
+            with np.errstate(divide='ignore', invalid='ignore'):
+                return np.where(valid, reward / np.where(valid, risk, 1), 0.0)
+        except Exception as e:
+            logger.error(f"Error calculating risk-reward ratios: {str(e)}")
+            return np.zeros(np.shape(entry_prices))
+
+    def validate_trades(self, prices, quantities, stop_losses, portfolio_value, existing_positions=None):
+        """Vectorized validate_trade; returns arrays of flags and reasons"""
+        try:
+            prices = np.asarray(prices, dtype=float)
+            quantities = np.asarray(quantities, dtype=float)
+            stop_losses = np.asarray(stop_losses, dtype=float)
+            shape = np.broadcast(prices, quantities, stop_losses).shape
+
+            if not portfolio_value:
+                return np.zeros(shape, dtype=bool), np.full(shape, "Missing required parameters", dtype=object)
+
+            missing = ~((prices != 0) & (quantities != 0) & (stop_losses != 0)
+                        & np.isfinite(prices) & np.isfinite(quantities) & np.isfinite(stop_losses))
+
+            # Calculate position value and trade risk
+            position_value = prices * quantities
+            risk_percent = np.abs(prices - stop_losses) * quantities / portfolio_value
+
+            # Portfolio risk only depends on the existing book, so sum it once
+            if existing_positions:
+                current_portfolio_risk = self.calculate_portfolio_risk(existing_positions, portfolio_value)
+                portfolio_breach = current_portfolio_risk + risk_percent > self.max_portfolio_risk
+            else:
+                portfolio_breach = np.zeros(shape, dtype=bool)
+
+            conditions = [
+                missing,
+                position_value > self.max_position_size,
+                risk_percent > self.max_loss_percent,
+                portfolio_breach
+            ]
+            reasons = [
+                "Missing required parameters",
+                "Position size exceeds maximum limit",
+                "Trade risk exceeds maximum allowed loss percentage",
+                "Total portfolio risk would exceed maximum limit"
+            ]
+            reason = np.select(conditions, reasons, default="Trade meets risk management criteria")
+            valid = ~np.logical_or.reduce([np.broadcast_to(c, shape) for c in conditions])
+            return valid, reason.astype(object)
+        except Exception as e:
+            logger.error(f"Error validating trades: {str(e)}")
+            shape = np.shape(prices)
+            return np.zeros(shape, dtype=bool), np.full(shape, f"Error validating trades: {str(e)}", dtype=object)
+
 # Create a risk calculator instance
 risk_calculator = RiskCalculator()
@@ -0,0 +1,129 @@
+import logging
+import math
+import threading
+
+logger = logging.getLogger(__name__)
+
+class PortfolioRiskBook:
+    """Open positions with a running total of stop-loss risk
+
+    Every update adjusts ``total_risk`` by the change in one position's risk,
+    so fills, stop-loss moves and price ticks cost O(1) and pre-trade checks
+    never re-sum the book.
+    """
+
+    def __init__(self, positions=None, resync_interval=100000):
+        self.total_risk = 0.0
+        self.resync_interval = resync_interval  # Updates between exact re-sums
+        self._positions = {}  # symbol -> [quantity, current_price, stop_loss, risk]
+        self._updates = 0
+        self._lock = threading.Lock()
+        for pos in positions or []:
+            self.on_fill(pos['symbol'], pos['quantity'], pos.get('current_price'), pos.get('stop_loss'))
+
+    def __len__(self):
+        return len(self._positions)
+
+    def __contains__(self, symbol):
+        return symbol in self._positions
+
+    @staticmethod
+    def _position_risk(quantity, current_price, stop_loss):
+        """Risk of a single position, matching RiskCalculator.calculate_portfolio_risk"""
+        if stop_loss is None or current_price is None:
+            return 0.0
+        return abs(current_price - stop_loss) * quantity
+
+    def _set(self, symbol, quantity, current_price, stop_loss):
+        """Replace a position and adjust the running total; caller holds the lock"""
+        entry = self._positions.get(symbol)
+        old_risk = entry[3] if entry else 0.0
+
+        if quantity == 0:
+            self._positions.pop(symbol, None)
+            new_risk = 0.0
+        else:
+            new_risk = self._position_risk(quantity, current_price, stop_loss)
+            self._positions[symbol] = [quantity, current_price, stop_loss, new_risk]
+
+        self.total_risk += new_risk - old_risk
+        self._updates += 1
+        if self._updates >= self.resync_interval:
+            self._resync()
+
+    def _resync(self):
+        """Recompute the total exactly to shed accumulated rounding error"""
+        self.total_risk = math.fsum(entry[3] for entry in self._positions.values())
+        self._updates = 0
+
+    def on_fill(self, symbol, quantity, price=None, stop_loss=None):
+        """Apply a fill; positive quantity adds to the position, negative reduces it"""
+        with self._lock:
+            entry = self._positions.get(symbol)
+            current_quantity, current_price, current_stop = entry[:3] if entry else (0, None, None)
+            self._set(
+                symbol,
+                current_quantity + quantity,
+                price if price is not None else current_price,
+                stop_loss if stop_loss is not None else current_stop
+            )
+
+    def on_stop_loss(self, symbol, stop_loss):
+        """Move the stop loss of an open position"""
+        with self._lock:
+            entry = self._positions.get(symbol)
+            if entry:
+                self._set(symbol, entry[0], entry[1], stop_loss)
+
+    def on_price(self, symbol, price):
+        """Mark an open position to a new price"""
+        with self._lock:
+            entry = self._positions.get(symbol)
+            if entry:
+                self._set(symbol, entry[0], price, entry[2])
+
+    def reconcile(self, positions):
+        """Match the book to the broker's open positions
+
+        Positions the broker no longer reports are dropped and new ones are
+        added. Quantities and prices come from the broker; a position reported
+        without a stop loss keeps the one the book already has.
+        """
+        reported = {pos['symbol']: pos for pos in positions or [] if pos.get('quantity')}
+        with self._lock:
+            for symbol in list(self._positions):
+                if symbol not in reported:
+                    self._set(symbol, 0, None, None)
+            for symbol, pos in reported.items():
+                entry = self._positions.get(symbol)
+                current_price, stop_loss = entry[1:3] if entry else (None, None)
+                self._set(
+                    symbol,
+                    pos['quantity'],
+                    pos['current_price'] if pos.get('current_price') is not None else current_price,
+                    pos['stop_loss'] if pos.get('stop_loss') is not None else stop_loss
+                )
+            self._resync()
+
+    def get_position(self, symbol):
+        """Get a single position in the same shape the broker returns"""
+        entry = self._positions.get(symbol)
+        if not entry:
+            return None
+        quantity, current_price, stop_loss, _ = entry
+        position = {'symbol': symbol, 'quantity': quantity, 'current_price': current_price}
+        if stop_loss is not None:
+            position['stop_loss'] = stop_loss
+        return position
+
+    def portfolio_risk(self, portfolio_value):
+        """Total risk as a fraction of portfolio value"""
+        if not portfolio_value:
+            return 0
+        return self.total_risk / portfolio_value
+
+    def check_trade(self, trade_risk, portfolio_value, max_portfolio_risk):
+        """Check whether adding trade_risk (in currency) keeps the book within limits"""
+        if not portfolio_value:
+            return False
+        return (self.total_risk + trade_risk) / portfolio_value <= max_portfolio_risk
@@ -0,0 +1,131 @@
+import logging
+import threading
+from statistics import NormalDist
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+class CovarianceRiskEngine:
+    """EWMA covariance of universe returns with parametric and historical VaR
+
+    The covariance is the RiskMetrics-style exponentially weighted estimate,
+    updated once per bar in O(n^2) rather than recomputed from history. The
+    running weight total normalises the estimate so early bars are not biased
+    towards zero.
+    """
+
+    def __init__(self, symbols, decay=0.94, history=500):
+        self.symbols = list(symbols)
+        self.decay = decay          # EWMA decay factor (lambda)
+        self.history = history      # Bars of returns kept for historical VaR
+        self.observations = 0
+
+        n = len(self.symbols)
+        self._index = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self._weighted_sum = np.zeros((n, n))
+        self._weight = 0.0
+        self._last_prices = np.full(n, np.nan)
+        self._returns = np.zeros((history, n))  # Ring buffer of past returns
+        self._cursor = 0
+        self._lock = threading.Lock()
+
+    @property
+    def covariance(self):
+        """Current EWMA covariance matrix of log returns"""
+        if not self._weight:
+            return np.zeros_like(self._weighted_sum)
+        return self._weighted_sum / self._weight
+
+    def correlation(self):
+        """Current EWMA correlation matrix"""
+        covariance = self.covariance
+        vol = np.sqrt(np.diag(covariance))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            correlation = covariance / np.outer(vol, vol)
+        return np.nan_to_num(correlation)
+
+    def _as_vector(self, values, fill=np.nan):
+        """Align a {symbol: value} mapping or a sequence with the universe"""
+        if isinstance(values, dict):
+            vector = np.full(len(self.symbols), fill, dtype=float)
+            for symbol, value in values.items():
+                i = self._index.get(symbol)
+                if i is None:
+                    logger.warning(f"{symbol} is not in the risk universe; ignoring it")
+                    continue
+                vector[i] = value
+            return vector
+        return np.asarray(values, dtype=float)
+
+    def seed(self, returns):
+        """Initialise the estimate from a (bars x symbols) matrix of past returns"""
+        returns = np.nan_to_num(np.asarray(returns, dtype=float))
+        weights = (1 - self.decay) * self.decay ** np.arange(len(returns) - 1, -1, -1)
+        with self._lock:
+            self._weighted_sum = (returns * weights[:, None]).T @ returns
+            self._weight = weights.sum()
+            self.observations = len(returns)
+            tail = returns[-self.history:]
+            self._returns[:len(tail)] = tail
+            self._cursor = len(tail) % self.history
+
+    def update_returns(self, returns):
+        """Fold one bar of returns into the covariance; missing returns count as zero"""
+        returns = np.nan_to_num(self._as_vector(returns, fill=0.0))
+        with self._lock:
+            self._weighted_sum *= self.decay
+            self._weighted_sum += (1 - self.decay) * np.outer(returns, returns)
+            self._weight = self.decay * self._weight + (1 - self.decay)
+            self._returns[self._cursor] = returns
+            self._cursor = (self._cursor + 1) % self.history
+            self.observations += 1
+
+    def update_prices(self, prices):
+        """Fold one bar of closing prices in, using log returns from the previous bar"""
+        prices = self._as_vector(prices)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            returns = np.log(prices / self._last_prices)
+        first_bar = not np.isfinite(self._last_prices).any()
+        self._last_prices = np.where(np.isfinite(prices), prices, self._last_prices)
+        if not first_bar:
+            self.update_returns(returns)
+
+    def exposures_from_positions(self, positions):
+        """Build a currency exposure vector from broker-style position dicts"""
+        exposures = {}
+        for pos in positions:
+            exposures[pos['symbol']] = exposures.get(pos['symbol'], 0) + pos['quantity'] * pos['current_price']
+        return self._as_vector(exposures, fill=0.0)
+
+    def parametric_var(self, exposures, confidence=0.99, horizon=1):
+        """Variance-covariance VaR of the book, in currency"""
+        exposures = np.nan_to_num(self._as_vector(exposures, fill=0.0))
+        variance = exposures @ self.covariance @ exposures
+        z = NormalDist().inv_cdf(confidence)
+        return float(z * np.sqrt(max(variance, 0.0)) * np.sqrt(horizon))
+
+    def historical_var(self, exposures, confidence=0.99):
+        """Historical-simulation VaR of the book over the stored return window, in currency"""
+        exposures = np.nan_to_num(self._as_vector(exposures, fill=0.0))
+        filled = min(self.observations, self.history)
+        if not filled:
+            return 0.0
+        pnl = np.expm1(self._returns[:filled]) @ exposures
+        return float(max(-np.quantile(pnl, 1 - confidence), 0.0))
+
+    def pre_trade_check(self, exposures, trade_exposures, var_limit, confidence=0.99, method='parametric'):
+        """Check whether the book stays within var_limit after adding a trade
+
+        Returns a (passed, var_after) tuple.
+        """
+        try:
+            book = np.nan_to_num(self._as_vector(exposures, fill=0.0))
+            trade = np.nan_to_num(self._as_vector(trade_exposures, fill=0.0))
+            if method == 'historical':
+                var_after = self.historical_var(book + trade, confidence)
+            else:
+                var_after = self.parametric_var(book + trade, confidence)
+            return var_after <= var_limit, var_after
+        except Exception as e:
+            logger.error(f"Error running VaR pre-trade check: {str(e)}")
+            return False, None
@@ -3,53 +3,69 @@ import pandas as pd
 from concurrent.futures import ThreadPoolExecutor
 from backend.technical_analysis.analyzer import TechnicalAnalyzer
 from backend.broker_integration.broker import BrokerClient
+from backend.market_data.quotes import QuoteService
 import logging
 import time
 
 logger = logging.getLogger(__name__)
 
+# Indices whose constituents make up the default universe
+DEFAULT_INDICES = {
+    'NIFTY50': '^NSEI',
+    'NIFTYBANK': '^NSEBANK'
+}
+
+# Fallback constituents for when yfinance does not provide them
+PREDEFINED_STOCKS = {
+    'NIFTY50': [
+        'RELIANCE.NS', 'TCS.NS', 'HDFCBANK.NS', 'INFY.NS', 'ICICIBANK.NS',
+        'HINDUNILVR.NS', 'ITC.NS', 'SBIN.NS', 'BHARTIARTL.NS', 'KOTAKBANK.NS'
+        # Add more stocks as needed
+    ],
+    'NIFTYBANK': [
+        'HDFCBANK.NS', 'ICICIBANK.NS', 'KOTAKBANK.NS', 'AXISBANK.NS', 'SBIN.NS',
+        'INDUSINDBK.NS', 'BANDHANBNK.NS', 'FEDERALBNK.NS', 'IDFCFIRSTB.NS', 'PNB.NS'
+        # Add more stocks as needed
+    ]
+}
+
+def get_index_stocks(indices=None):
+    """All stocks from the given indices (index name -> yfinance symbol)"""
+    stocks = set()
+    for index_name, index_symbol in (indices or DEFAULT_INDICES).items():
+        try:
+            index = yf.Ticker(index_symbol)
+            # Get constituents if available
+            if hasattr(index, 'constituents'):
+                stocks.update(index.constituents)
+            else:
+                # Fallback to predefined lists if needed
+                stocks.update(PREDEFINED_STOCKS.get(index_name, []))
+        except Exception as e:
+            logger.error(f"Error fetching stocks for {index_name}: {e}")
+    return list(stocks)
+
 class StockScreener:
-    def __init__(self, indices=None):
+    def __init__(self, indices=None, feed=None):
         self.analyzer = TechnicalAnalyzer()
         self.broker = BrokerClient()
-        self.indices = indices or {
-            'NIFTY50': '^NSEI',
-            'NIFTYBANK': '^NSEBANK'
-        }
+        self.indices = indices or DEFAULT_INDICES
         self.stocks = self._get_index_stocks()
+        # Optional MarketDataFeed streaming ticks for the screened universe
+        self.feed = feed
+        if self.feed:
+            self.feed.subscribe(self.stocks)
+        # Execution-time prices: feed first, then prices from the latest screen
+        self.quotes = QuoteService(feed=self.feed)
         self.recommendations = []
         
     def _get_index_stocks(self):
         """Get all stocks from the configured indices"""
-        stocks = set()
-        for index_name, index_symbol in self.indices.items():
-            try:
-                index = yf.Ticker(index_symbol)
-                # Get constituents if available
-                if hasattr(index, 'constituents'):
-                    stocks.update(index.constituents)
-                else:
-                    # Fallback to predefined lists if needed
-                    stocks.update(self._get_predefined_stocks(index_name))
-            except Exception as e:
-                logger.error(f"Error fetching stocks for {index_name}: {e}")
-        return list(stocks)
+        return get_index_stocks(self.indices)
     
     def _get_predefined_stocks(self, index_name):
         """Fallback method for predefined stock lists"""
-        if index_name == 'NIFTY50':
-            return [
-                'RELIANCE.NS', 'TCS.NS', 'HDFCBANK.NS', 'INFY.NS', 'ICICIBANK.NS',
-                'HINDUNILVR.NS', 'ITC.NS', 'SBIN.NS', 'BHARTIARTL.NS', 'KOTAKBANK.NS'
-                # Add more stocks as needed
-            ]
-        elif index_name == 'NIFTYBANK':
-            return [
-                'HDFCBANK.NS', 'ICICIBANK.NS', 'KOTAKBANK.NS', 'AXISBANK.NS', 'SBIN.NS',
-                'INDUSINDBK.NS', 'BANDHANBNK.NS', 'FEDERALBNK.NS', 'IDFCFIRSTB.NS', 'PNB.NS'
-                # Add more stocks as needed
-            ]
-        return []
+        return PREDEFINED_STOCKS.get(index_name, [])
 
     def _analyze_stock(self, symbol):
         """Analyze a single stock and generate trading signals"""
@@ -57,6 +73,7 @@ class StockScreener:
             analysis = self.analyzer.analyze(symbol, period='1d', interval='5m')
             if not analysis:
                 return None
+            self.quotes.update({symbol: analysis['current_price']}, max_age=60)
             
             signals = self._generate_signals(symbol, analysis)
             if signals:
@@ -184,7 +201,7 @@ class StockScreener:
 
             # Get the current market price
             symbol = rec['symbol']
-            current_price = yf.Ticker(symbol).info.get('regularMarketPrice')
+            current_price = self.quotes.get_price(symbol)
             
             # Execute the order through broker
             if action == 'BUY':
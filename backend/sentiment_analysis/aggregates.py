@@ -0,0 +1,112 @@
+import math
+import threading
+import time
+from datetime import datetime, timezone
+
+# Seconds for an item's weight to halve, per source
+HALF_LIVES = {'news': 2 * 86400, 'social': 6 * 3600}
+DEFAULT_HALF_LIFE = 86400
+
+def to_timestamp(value):
+    """Epoch seconds from an ISO-8601 string ('2024-01-01T09:00:00Z'), datetime or number; None if unparseable"""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+class SentimentAggregates:
+    """Rolling per-symbol sentiment with exponential time decay
+
+    Each (symbol, source) keeps a decayed sum of polarities and of weights,
+    both expressed at a reference time, plus a cursor: the newest item
+    timestamp seen. Adding items costs O(new items) and skips anything at or
+    behind the cursor that was already counted, so callers can pass whole
+    fetches without tracking what they sent before. Reading a score costs
+    O(1) and never touches the network.
+
+    An item's weight halves every half-life. The score is the decayed mean
+    polarity while there is at least min_weight of recent evidence, and
+    fades toward neutral as that evidence ages.
+    """
+
+    def __init__(self, half_lives=None, min_weight=1.0):
+        self.half_lives = HALF_LIVES if half_lives is None else half_lives
+        self.min_weight = min_weight   # Effective item count below which scores fade toward 0
+        self._state = {}               # (symbol, source) -> [weighted sum, weight, reference time, cursor, ids at cursor]
+        self._lock = threading.Lock()
+
+    def _rate(self, source):
+        return math.log(2) / self.half_lives.get(source, DEFAULT_HALF_LIFE)
+
+    def add(self, symbol, source, items):
+        """Fold (timestamp, polarity, item_id) items into the state; returns how many were new"""
+        rate = self._rate(source)
+        added = 0
+        with self._lock:
+            state = self._state.get((symbol, source))
+            for timestamp, polarity, item_id in sorted(items, key=lambda item: item[0]):
+                if state is None:
+                    state = self._state[(symbol, source)] = [0.0, 0.0, timestamp, timestamp, set()]
+                weighted_sum, weight, reference, cursor, at_cursor = state
+                if timestamp < cursor or (timestamp == cursor and item_id in at_cursor):
+                    continue
+                if timestamp > reference:
+                    # Move the reference forward; everything already counted is older
+                    decay = math.exp(-rate * (timestamp - reference))
+                    weighted_sum, weight, reference = weighted_sum * decay, weight * decay, timestamp
+                item_weight = math.exp(-rate * (reference - timestamp))
+                state[0] = weighted_sum + item_weight * polarity
+                state[1] = weight + item_weight
+                state[2] = reference
+                if timestamp > cursor:
+                    state[3] = timestamp
+                    at_cursor = state[4] = set()
+                at_cursor.add(item_id)
+                added += 1
+        return added
+
+    def cursor(self, symbol, source):
+        """Timestamp of the newest item counted, or None before the first"""
+        state = self._state.get((symbol, source))
+        return state[3] if state is not None else None
+
+    def _decayed(self, symbol, source, now):
+        state = self._state.get((symbol, source))
+        if state is None:
+            return None
+        weighted_sum, weight, reference = state[:3]
+        now = time.time() if now is None else now
+        decay = math.exp(-self._rate(source) * max(now - reference, 0))
+        return weighted_sum * decay, weight * decay
+
+    def score(self, symbol, source, now=None):
+        """Decayed mean polarity of a symbol's items from source, or None if there are none"""
+        decayed = self._decayed(symbol, source, now)
+        if decayed is None:
+            return None
+        weighted_sum, weight = decayed
+        return weighted_sum / max(weight, self.min_weight) if weight else 0.0
+
+    def weight(self, symbol, source, now=None):
+        """Effective number of items behind a score after decay"""
+        decayed = self._decayed(symbol, source, now)
+        return decayed[1] if decayed is not None else 0.0
+
+    def snapshot(self, symbol, now=None):
+        """Score, weight and cursor of every source with items for symbol"""
+        return {
+            source: {
+                'score': self.score(symbol, source, now),
+                'weight': self.weight(symbol, source, now),
+                'cursor': self.cursor(symbol, source)
+            }
+            for (state_symbol, source) in list(self._state) if state_symbol == symbol
+        }
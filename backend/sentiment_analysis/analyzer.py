@@ -1,80 +1,115 @@
 import os
-from textblob import TextBlob
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
 from newsapi import NewsApiClient
+from backend.sentiment_analysis.aggregates import SentimentAggregates, to_timestamp
+from backend.sentiment_analysis.news import NewsIngestor, TimeoutSession
+from backend.sentiment_analysis.scorers import get_scorer
 import tweepy
-from datetime import datetime, timedelta
+
+# Weight of each source in the combined score
+SOURCE_WEIGHTS = {'news': 0.6, 'social': 0.4}
+
+# Shared by all analyzers so concurrent requests do not each start threads
+_executor = ThreadPoolExecutor(max_workers=int(os.getenv('SENTIMENT_WORKERS', 8)), thread_name_prefix='sentiment')
 
 class SentimentAnalyzer:
-    def __init__(self):
+    def __init__(self, news_timeout=5, social_timeout=5, scorer=None):
+        # Per-source time budgets in seconds, measured from the start of analyze()
+        self.timeouts = {'news': news_timeout, 'social': social_timeout}
+        self.scorer = scorer or get_scorer()   # Polarity scorer; SENTIMENT_SCORER picks the default
+        self.aggregates = SentimentAggregates()
+        self._since_ids = {}                   # symbol -> newest tweet id seen
+        
         # Initialize API clients
-        self.newsapi = NewsApiClient(api_key=os.getenv('NEWS_API_KEY'))
+        self.newsapi = NewsApiClient(api_key=os.getenv('NEWS_API_KEY'), session=TimeoutSession(self.timeouts['news']))
+        self.news = NewsIngestor(self.newsapi, scorer=self.scorer, aggregates=self.aggregates)
         
         # Twitter API setup
         auth = tweepy.OAuthHandler(
             os.getenv('TWITTER_API_KEY'),
             os.getenv('TWITTER_API_SECRET')
         )
-        self.twitter_api = tweepy.API(auth)
+        self.twitter_api = tweepy.API(auth, timeout=self.timeouts['social'])
     
     def analyze(self, symbol):
-        news_sentiment = self._analyze_news(symbol)
-        social_sentiment = self._analyze_social_media(symbol)
+        # Fetch both sources concurrently; latency is bounded by the slowest allowed source
+        start = time.monotonic()
+        futures = {
+            'news': _executor.submit(self._analyze_news, symbol),
+            'social': _executor.submit(self._analyze_social_media, symbol)
+        }
         
-        # Combine sentiments with weighted average
-        combined_sentiment = (news_sentiment * 0.6) + (social_sentiment * 0.4)
+        scores = {}
+        for source, future in futures.items():
+            remaining = self.timeouts[source] - (time.monotonic() - start)
+            try:
+                scores[source] = future.result(timeout=max(remaining, 0))
+            except TimeoutError:
+                future.cancel()
+                print(f"Timed out fetching {source} sentiment for {symbol}")
+                scores[source] = None
+        
+        return self._combine(scores)
+    
+    def current(self, symbol):
+        """Sentiment from the rolling aggregates alone, without any network call"""
+        return self._combine({source: self.aggregates.score(symbol, source) for source in SOURCE_WEIGHTS})
+    
+    def _combine(self, scores):
+        # Combine the sources that answered, reweighting so the weights still sum to one
+        answered = [source for source, score in scores.items() if score is not None]
+        total_weight = sum(SOURCE_WEIGHTS[source] for source in answered)
+        combined_sentiment = (
+            sum(scores[source] * SOURCE_WEIGHTS[source] for source in answered) / total_weight
+            if total_weight else 0
+        )
         
         return {
             'overall_score': combined_sentiment,
-            'news_sentiment': news_sentiment,
-            'social_sentiment': social_sentiment
+            'news_sentiment': scores['news'] or 0,
+            'social_sentiment': scores['social'] or 0,
+            'sources': answered
         }
     
+    def refresh_news(self, symbols):
+        """Fetch news for the whole universe in batched queries"""
+        try:
+            return self.news.ingest(symbols)
+        except Exception as e:
+            print(f"Error ingesting news: {str(e)}")
+            return 0
+    
     def _analyze_news(self, symbol):
         try:
-            # Get news articles from last 7 days
-            articles = self.newsapi.get_everything(
-                q=symbol,
-                language='en',
-                from_param=(datetime.now() - timedelta(days=7)).date(),
-                to=datetime.now().date()
-            )
-            
-            if not articles['articles']:
-                return 0
-            
-            # Analyze sentiment of each article
-            sentiments = []
-            for article in articles['articles']:
-                text = f"{article['title']} {article['description']}"
-                blob = TextBlob(text)
-                sentiments.append(blob.sentiment.polarity)
-            
-            return sum(sentiments) / len(sentiments)
+            # Articles come from the shared ingestor; each is fetched and scored once
+            if not self.news.is_fresh(symbol):
+                self.news.ingest([symbol])
+            return self.news.get_sentiment(symbol)
         
         except Exception as e:
             print(f"Error analyzing news: {str(e)}")
-            return 0
+            return None
     
     def _analyze_social_media(self, symbol):
         try:
-            # Get recent tweets
-            tweets = self.twitter_api.search_tweets(
-                q=symbol,
-                lang='en',
-                count=100
-            )
+            # Only tweets newer than the last one seen; older ones are already in the aggregates
+            params = {'q': symbol, 'lang': 'en', 'count': 100}
+            if symbol in self._since_ids:
+                params['since_id'] = self._since_ids[symbol]
+            tweets = self.twitter_api.search_tweets(**params)
             
-            if not tweets:
-                return 0
+            if tweets:
+                # Score all new tweets in one batch
+                sentiments = self.scorer.score_batch([tweet.text for tweet in tweets])
+                self.aggregates.add(symbol, 'social', [
+                    (to_timestamp(tweet.created_at) or time.time(), float(sentiment), tweet.id)
+                    for tweet, sentiment in zip(tweets, sentiments)
+                ])
+                self._since_ids[symbol] = max(tweet.id for tweet in tweets)
             
-            # Analyze sentiment of each tweet
-            sentiments = []
-            for tweet in tweets:
-                blob = TextBlob(tweet.text)
-                sentiments.append(blob.sentiment.polarity)
-            
-            return sum(sentiments) / len(sentiments)
+            return self.aggregates.score(symbol, 'social') or 0
         
         except Exception as e:
             print(f"Error analyzing social media: {str(e)}")
-            return 0
+            return None
@@ -0,0 +1,104 @@
+import re
+from collections import deque
+
+# Company names and common short forms for the screener universe
+DEFAULT_ALIASES = {
+    'RELIANCE.NS': ['Reliance Industries', 'RIL'],
+    'TCS.NS': ['Tata Consultancy Services'],
+    'HDFCBANK.NS': ['HDFC Bank'],
+    'INFY.NS': ['Infosys'],
+    'ICICIBANK.NS': ['ICICI Bank'],
+    'HINDUNILVR.NS': ['Hindustan Unilever', 'HUL'],
+    'ITC.NS': ['ITC Limited'],
+    'SBIN.NS': ['State Bank of India', 'SBI'],
+    'BHARTIARTL.NS': ['Bharti Airtel', 'Airtel'],
+    'KOTAKBANK.NS': ['Kotak Mahindra Bank', 'Kotak Bank'],
+    'AXISBANK.NS': ['Axis Bank'],
+    'INDUSINDBK.NS': ['IndusInd Bank'],
+    'BANDHANBNK.NS': ['Bandhan Bank'],
+    'FEDERALBNK.NS': ['Federal Bank'],
+    'IDFCFIRSTB.NS': ['IDFC First Bank'],
+    'PNB.NS': ['Punjab National Bank']
+}
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+def tokenize(text):
+    """Lower-case word tokens; punctuation and hyphens separate words"""
+    return _TOKEN.findall(text.lower())
+
+class SymbolMatcher:
+    """Multi-pattern article-to-symbol matcher
+
+    An Aho-Corasick automaton over word tokens built from every symbol's
+    ticker and aliases. Tagging an article is one pass over its tokens,
+    independent of the number of symbols, and matches only whole words
+    ('ITC' does not match 'switch'). Overlapping names are all reported.
+    """
+
+    def __init__(self, aliases):
+        self._goto = [{}]       # State -> {token: next state}
+        self._fail = [0]
+        self._output = [()]     # State -> symbols whose names end here
+        for symbol, names in aliases.items():
+            for name in {symbol.split('.')[0], *names}:
+                self._add(tokenize(name), symbol)
+        self._build_failure_links()
+
+    @classmethod
+    def from_symbols(cls, symbols, aliases=None):
+        """Matcher for symbols, using DEFAULT_ALIASES unless aliases are given"""
+        aliases = DEFAULT_ALIASES if aliases is None else aliases
+        return cls({symbol: aliases.get(symbol, ()) for symbol in symbols})
+
+    def __len__(self):
+        return len(self._goto)
+
+    def _add(self, tokens, symbol):
+        if not tokens:
+            return
+        state = 0
+        for token in tokens:
+            next_state = self._goto[state].get(token)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][token] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(())
+            state = next_state
+        if symbol not in self._output[state]:
+            self._output[state] += (symbol,)
+
+    def _build_failure_links(self):
+        """Breadth-first pass linking each state to its longest proper suffix state"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for token, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and token not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(token, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                # Inherit matches that end at the suffix state
+                self._output[next_state] += tuple(s for s in self._output[self._fail[next_state]]
+                                                  if s not in self._output[next_state])
+
+    def match(self, text):
+        """Symbols mentioned in text"""
+        goto, fail, output = self._goto, self._fail, self._output
+        found = set()
+        state = 0
+        for token in tokenize(text):
+            while state and token not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(token, 0)
+            if output[state]:
+                found.update(output[state])
+        return found
+
+    def tag(self, texts):
+        """Symbols mentioned in each text"""
+        return [self.match(text) for text in texts]
@@ -0,0 +1,245 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+import requests
+from backend.sentiment_analysis.aggregates import SentimentAggregates, to_timestamp
+from backend.sentiment_analysis.matcher import DEFAULT_ALIASES, SymbolMatcher
+from backend.sentiment_analysis.scorers import get_scorer
+
+# NewsAPI rejects queries longer than this
+MAX_QUERY_LENGTH = 500
+
+class TimeoutSession(requests.Session):
+    """requests session that caps every request's timeout
+
+    NewsApiClient always asks for a 30 second timeout; this keeps a slow
+    NewsAPI from holding a worker past the caller's budget.
+    """
+
+    def __init__(self, timeout):
+        super().__init__()
+        self.timeout = timeout   # Seconds allowed per request
+
+    def request(self, *args, **kwargs):
+        timeout = kwargs.get('timeout')
+        kwargs['timeout'] = min(timeout, self.timeout) if isinstance(timeout, (int, float)) else self.timeout
+        return super().request(*args, **kwargs)
+
+class NewsIngestor:
+    """Batched news ingestion for a universe of symbols
+
+    Pulls articles for many symbols with a few OR-joined get_everything
+    queries instead of one query per symbol, paging through each query's
+    results up to max_pages so busy symbols do not crowd quieter ones out
+    of a single page. Articles are deduplicated by a hash of
+    their text and each distinct article is scored once, with all of an
+    ingest's new articles in one scorer batch. Every article is attributed
+    to all symbols it mentions, so a headline naming several stocks counts
+    for each of them without being fetched or scored again.
+
+    Per-symbol sentiment lives in SentimentAggregates. Each query asks only
+    for articles published since the oldest cursor among its symbols, and
+    only articles newer than a symbol's cursor change its score. When the
+    page budget runs out before a query is drained, its articles are held
+    and its symbols' cursors stay put; the next ingest continues below the
+    oldest article fetched, and the whole range is counted once drained.
+    """
+
+    def __init__(self, newsapi, aliases=None, lookback_days=7, refresh_interval=300, cache_size=20000, scorer=None,
+                 aggregates=None, page_size=100, max_pages=5):
+        self.newsapi = newsapi
+        self.scorer = scorer or get_scorer()   # SentimentScorer for article polarity
+        self.aggregates = aggregates or SentimentAggregates()
+        self.aliases = DEFAULT_ALIASES if aliases is None else aliases   # symbol -> company names and short forms
+        self.lookback_days = lookback_days
+        self.refresh_interval = refresh_interval    # Seconds before a symbol's news is fetched again
+        self.cache_size = cache_size                # Articles whose polarity is kept
+        self.page_size = page_size                  # Articles per get_everything page (NewsAPI allows 100)
+        self.max_pages = max_pages                  # Pages fetched per query and ingest
+        self.scored = 0                             # Articles scored so far, for monitoring
+
+        self._polarity = OrderedDict()   # Content hash -> polarity; LRU
+        self._fetched_at = {}            # symbol -> monotonic time of its last fetch
+        self._pending = {}               # query -> (since, until, articles) of a query not yet drained
+        self._matcher = None
+        self._matcher_symbols = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _term(symbol):
+        """Search term for a symbol: 'RELIANCE.NS' -> 'RELIANCE'"""
+        return symbol.split('.')[0]
+
+    def _get_matcher(self, symbols):
+        """Matcher for the symbol set, rebuilt only when the universe changes"""
+        symbols = frozenset(symbols)
+        if self._matcher_symbols != symbols:
+            self._matcher = SymbolMatcher({symbol: self.aliases.get(symbol, ()) for symbol in symbols})
+            self._matcher_symbols = symbols
+        return self._matcher
+
+    @staticmethod
+    def content_hash(article):
+        """Hash of an article's normalised title and description"""
+        text = f"{article.get('title') or ''} {article.get('description') or ''}"
+        normalised = ' '.join(text.lower().split())
+        return hashlib.sha1(normalised.encode()).hexdigest()
+
+    def _search_terms(self, symbols):
+        """Map each search term to the symbols it stands for"""
+        terms = {}
+        for symbol in symbols:
+            for term in [self._term(symbol)] + list(self.aliases.get(symbol, ())):
+                terms.setdefault(term.lower(), set()).add(symbol)
+        return terms
+
+    @staticmethod
+    def _batch_queries(terms):
+        """OR-join terms into as few queries as fit the query length limit
+
+        Returns (query, terms in the query) pairs.
+        """
+        queries, current = [], []
+        for term in terms:
+            if current and len(' OR '.join(f'"{t}"' for t in current + [term])) > MAX_QUERY_LENGTH:
+                queries.append(current)
+                current = []
+            current.append(term)
+        if current:
+            queries.append(current)
+        return [(' OR '.join(f'"{t}"' for t in batch), batch) for batch in queries]
+
+    def _fetch_query(self, query, since, until=None):
+        """Articles for one query between two timestamps, newest first, paged up to max_pages
+
+        Returns (articles, drained); drained is False when the page budget ran
+        out before every matching article was fetched.
+        """
+        articles = []
+        params = {'to': datetime.fromtimestamp(until, timezone.utc)} if until is not None else {}
+        for page in range(1, self.max_pages + 1):
+            response = self.newsapi.get_everything(
+                q=query,
+                language='en',
+                from_param=datetime.fromtimestamp(since, timezone.utc),
+                sort_by='publishedAt',
+                page_size=self.page_size,
+                page=page,
+                **params
+            )
+            batch = response.get('articles') or []
+            articles.extend(batch)
+            total = response.get('totalResults')
+            if len(batch) < self.page_size or (total is not None and len(articles) >= total):
+                return articles, True
+        return articles, False
+
+    def _store(self, key, polarity):
+        """Cache an article's polarity, evicting the least recently used"""
+        self._polarity[key] = polarity
+        if len(self._polarity) > self.cache_size:
+            self._polarity.popitem(last=False)
+
+    def _collect(self, query, query_terms, terms, lookback):
+        """Fetch a query's articles; returns (articles, held) where held is None once its range is drained"""
+        pending = self._pending.pop(query, None)
+        if pending is not None:
+            # Continue below the oldest article of the undrained range
+            since, until, fetched = pending
+            seen = {(self.content_hash(a), a.get('publishedAt')) for a in fetched}
+            more, drained = self._fetch_query(query, since, until)
+            fetched = fetched + [a for a in more if (self.content_hash(a), a.get('publishedAt')) not in seen]
+        else:
+            # Only articles since the least recently updated symbol in the query
+            cursors = [self.aggregates.cursor(s, 'news') for term in query_terms for s in terms[term]]
+            since = max(min((c if c is not None else lookback) for c in cursors), lookback)
+            fetched, drained = self._fetch_query(query, since)
+        if not drained:
+            oldest = min(filter(None, (to_timestamp(a.get('publishedAt')) for a in fetched)), default=None)
+            if oldest is not None:
+                self._pending[query] = (since, oldest, fetched)
+                return fetched, {s for term in query_terms for s in terms[term]}
+        return fetched, None
+
+    def _score(self, keys, articles):
+        """Polarity of every article by key, scoring unseen ones in one batch; returns (polarity_of, unseen)"""
+        # Take the polarity of every article seen before now, ahead of storing this
+        # batch's new ones, whose inserts may evict entries the batch still needs
+        polarity_of = {}
+        unseen = {}
+        with self._lock:
+            for key, (article, _) in zip(keys, articles):
+                if key in self._polarity:
+                    polarity_of[key] = self._polarity[key]
+                    self._polarity.move_to_end(key)
+                elif key not in polarity_of:
+                    unseen[key] = article
+
+        polarities = self.scorer.score_batch(
+            [f"{a.get('title')} {a.get('description')}" for a in unseen.values()]
+        ) if unseen else []
+        new_polarities = {key: float(polarity) for key, polarity in zip(unseen, polarities)}
+        polarity_of.update(new_polarities)
+
+        with self._lock:
+            for key, polarity in new_polarities.items():
+                self._store(key, polarity)
+            self.scored += len(unseen)
+        return polarity_of, unseen
+
+    def _attribute(self, symbols, terms, keys, articles, polarity_of, now):
+        """Group scored articles by every symbol they mention"""
+        matcher = self._get_matcher(symbols)
+        items = {}
+        for key, (article, query_terms) in zip(keys, articles):
+            text = f"{article.get('title')} {article.get('description')}"
+            mentioned = matcher.match(text)
+            if not mentioned and len(query_terms) == 1:
+                # Matched the query in the body; a single-term query still identifies the symbol
+                mentioned = terms[query_terms[0]]
+            published_at = to_timestamp(article.get('publishedAt')) or now.timestamp()
+            for symbol in mentioned:
+                items.setdefault(symbol, []).append((published_at, polarity_of[key], key))
+        return items
+
+    def ingest(self, symbols):
+        """Fetch, deduplicate and score news for symbols; returns the number of new articles"""
+        terms = self._search_terms(symbols)
+        if not terms:
+            return 0
+        now = datetime.now(timezone.utc)
+        lookback = (now - timedelta(days=self.lookback_days)).timestamp()
+
+        articles = []
+        held = set()   # Symbols of queries not drained yet; their cursors must not move
+        for query, query_terms in self._batch_queries(terms):
+            fetched, query_held = self._collect(query, query_terms, terms, lookback)
+            if query_held is not None:
+                held |= query_held
+                continue
+            articles.extend((article, query_terms) for article in fetched)
+
+        keys = [self.content_hash(article) for article, _ in articles]
+        polarity_of, unseen = self._score(keys, articles)
+
+        with self._lock:
+            items = self._attribute(symbols, terms, keys, articles, polarity_of, now)
+            fetched_at = time.monotonic()
+            for symbol in symbols:
+                if symbol not in held:
+                    self._fetched_at[symbol] = fetched_at
+        for symbol, symbol_items in items.items():
+            if symbol not in held:   # Refetched from the unmoved cursor once the range is drained
+                self.aggregates.add(symbol, 'news', symbol_items)
+        return len(unseen)
+
+    def is_fresh(self, symbol):
+        """Whether symbol's news was fetched within the refresh interval"""
+        fetched_at = self._fetched_at.get(symbol)
+        return fetched_at is not None and time.monotonic() - fetched_at < self.refresh_interval
+
+    def get_sentiment(self, symbol):
+        """Time-decayed polarity of a symbol's articles, or 0 if there are none"""
+        return self.aggregates.score(symbol, 'news') or 0
@@ -0,0 +1,238 @@
+import logging
+import os
+import re
+import xml.etree.ElementTree as ElementTree
+from abc import ABC, abstractmethod
+import numpy as np
+import pandas as pd
+from textblob import TextBlob
+
+logger = logging.getLogger(__name__)
+
+NEGATIONS = ("no", "not", "never")
+
+# Emoticons TextBlob scores, with their polarity
+EMOTICONS = {
+    '<3': 1.0, '\u2665': 1.0,
+    ':d': 1.0, ':-d': 1.0, '=d': 1.0, '=-d': 1.0, '>:d': 1.0, '8-d': 1.0, 'x-d': 1.0,
+    ':p': 0.75, ':-p': 0.75, '>:p': 0.75, ':b': 0.75, ':-b': 0.75, ':c)': 0.75, ':o)': 0.75, ':^)': 0.75,
+    ':)': 0.5, ':-)': 0.5, '8)': 0.5, '8-)': 0.5, ':]': 0.5, ':3': 0.5, ':}': 0.5, '=)': 0.5, ':>': 0.5,
+    '=]': 0.5, '>:)': 0.5,
+    ';)': 0.25, ';-)': 0.25, ';-]': 0.25, ';d': 0.25, '>;]': 0.25, ';]': 0.25, ';^)': 0.25, '*)': 0.25, '*-)': 0.25,
+    ':o': 0.05, ':-o': 0.05, '>:o': 0.05, 'o.o': 0.05, 'o_o': 0.05, '\u00b0o\u00b0': 0.05,
+    ':s': -0.25, ':-s': -0.25, ':/': -0.25, ':-/': -0.25, '>:/': -0.25, ':\\': -0.25, '>:\\': -0.25, ':-.': -0.25,
+    '>.>': -0.25,
+    ':(': -0.75, ':-(': -0.75, ':[': -0.75, ':-[': -0.75, '>:[': -0.75, ':{': -0.75, ':c': -0.75, ':-c': -0.75,
+    ':-<': -0.75, '=(': -0.75, '=/': -0.75,
+    ":'(": -1.0, ";'(": -1.0, ":'''(": -1.0,
+    '(!)': 0.0
+}
+
+# TextBlob's tokenizer splits leading and trailing punctuation off words and
+# every quote into its own token; a word's inner punctuation is kept
+_PUNCTUATION = re.escape(".,;:!?()[]{}`'\"@#$^&*+-|=~_")
+_QUOTES = "'\"\u201c\u201d\u2018\u2019"
+_TOKEN = re.compile(
+    r'(?=[<\u2665:;=>8x*(o\u00b0])(?:' + '|'.join(re.escape(e) for e in sorted(EMOTICONS, key=len, reverse=True)) + r')(?=\s|$)'
+    + r"|\.\.\."
+    + rf"|[^\s{_QUOTES}{_PUNCTUATION.replace(re.escape('.'), '')}](?:[^\s{_QUOTES}]*[^\s{_QUOTES}{_PUNCTUATION}])?"
+    + r"|\S"
+)
+
+class SentimentScorer(ABC):
+    """Scores the polarity of texts on a -1 to 1 scale"""
+
+    name = None
+
+    def score(self, text):
+        """Polarity of one text"""
+        return float(self.score_batch([text])[0])
+
+    @abstractmethod
+    def score_batch(self, texts):
+        """Polarity of each text, as a numpy array"""
+
+class TextBlobScorer(SentimentScorer):
+    """TextBlob's pattern analyzer, one text at a time"""
+
+    name = 'textblob'
+
+    def score_batch(self, texts):
+        return np.array([TextBlob(text).sentiment.polarity for text in texts], dtype=float)
+
+class LexiconScorer(SentimentScorer):
+    """Batch scorer over TextBlob's own sentiment lexicon
+
+    Reproduces TextBlob's polarity (tokenization, modifiers, negations, "!"
+    and emoticons) with array operations over a whole batch: texts are
+    tokenized with one regex, mapped to vocabulary ids with a single hashed
+    lookup, and TextBlob's word-by-word state machine is replaced by
+    nearest-previous-token lookups. The one known divergence is an emoticon
+    inside a modifier chain ("really :) not good"), which TextBlob folds
+    into the chain; see parity_report.
+    """
+
+    name = 'lexicon'
+
+    def __init__(self, path=None):
+        if path is None:
+            import textblob
+            path = os.path.join(os.path.dirname(textblob.__file__), 'en', 'en-sentiment.xml')
+        self._load(path)
+
+    def _load(self, path):
+        """Average scores over senses, then over parts of speech, as TextBlob does
+
+        Like TextBlob, every adjective also yields its adverb ("terrible" ->
+        "terribly"), which takes over that word's scores.
+        """
+        senses = {}
+        for word in ElementTree.parse(path).getroot().findall('word'):
+            form = word.attrib.get('form')
+            if not form:
+                continue
+            senses.setdefault(form, {}).setdefault(word.attrib.get('pos'), []).append(
+                (float(word.attrib.get('polarity', 0.0)), float(word.attrib.get('intensity', 1.0)))
+            )
+
+        lexicon = {}
+        for form, by_pos in senses.items():
+            scores = {pos: tuple(np.mean(values, axis=0)) for pos, values in by_pos.items()}
+            scores[None] = tuple(np.mean(list(scores.values()), axis=0))
+            lexicon[form] = scores
+        for form, scores in list(lexicon.items()):
+            if 'JJ' in scores:
+                stem = form[:-1] + 'i' if form.endswith('y') else form
+                stem = stem[:-2] if stem.endswith('le') else stem
+                adverb = lexicon.setdefault(stem + 'ly', {})
+                adverb['RB'] = adverb[None] = scores['JJ']
+
+        vocabulary = sorted(lexicon)
+        self.polarity = np.array([lexicon[form][None][0] for form in vocabulary])
+        self.intensity = np.array([lexicon[form][None][1] for form in vocabulary])
+        self.modifier = np.array(['RB' in lexicon[form] for form in vocabulary])
+        self.adverb = self.modifier & np.char.endswith(np.array(vocabulary), 'ly')
+        self.vocabulary = pd.Index(vocabulary)
+        self.emoticons = pd.Index(list(EMOTICONS))
+        self.emoticon_polarity = np.array(list(EMOTICONS.values()))
+
+    def _tokenize(self, texts):
+        """Token array for all texts and the index of the text each token came from
+
+        The texts are tokenized in one pass, joined by a separator token.
+        """
+        joined = ' \0 '.join(text.replace('\0', ' ').replace("n't", " n't") for text in texts).lower()
+        tokens = np.array(_TOKEN.findall(joined), dtype=str)
+        separator = tokens == '\0'
+        return tokens[~separator], np.cumsum(separator)[~separator]
+
+    def score_batch(self, texts):
+        texts = list(texts)
+        tokens, doc = self._tokenize(texts)
+        if not len(tokens):
+            return np.zeros(len(texts))
+        count = len(tokens)
+        position = np.arange(count)
+
+        def last_before(mask):
+            """Index of the nearest earlier token in the same text where mask holds, else -1"""
+            latest = np.maximum.accumulate(np.where(mask, position, -1))
+            latest = np.r_[-1, latest[:-1]]
+            return np.where((latest >= 0) & (doc[np.maximum(latest, 0)] == doc), latest, -1)
+
+        ids = self.vocabulary.get_indexer(tokens)
+        known = ids >= 0
+        polarity = np.where(known, self.polarity[ids], 0.0)
+        intensity = np.where(known, self.intensity[ids], 1.0)
+        modifier = known & self.modifier[ids]
+        adverb = known & self.adverb[ids]
+        negation = np.isin(tokens, NEGATIONS)
+        emoticon = self.emoticons.get_indexer(tokens)
+        is_emoticon = emoticon >= 0
+        polarity = np.where(is_emoticon, self.emoticon_polarity[emoticon], polarity)
+        exclamation = tokens == '!'
+        lengths = np.char.str_len(tokens)
+        stripped = np.where(tokens == "'", 0, lengths)
+
+        # A modifier ("very") carries over to the next known word unless a
+        # longer unknown word comes between them; a negation that follows an
+        # -ly modifier ("really not good") negates the modifier's assessment
+        previous_known = last_before(known)
+        anchor = np.maximum(previous_known, 0)
+        after_adverb = (previous_known >= 0) & adverb[anchor]
+        breaks_modifier = ~known & (lengths > 2) & ~(negation & after_adverb)
+        modifier_alive = (previous_known >= 0) & modifier[anchor] & (last_before(breaks_modifier) < previous_known)
+        modified = known & modifier_alive
+        negates_modifier = negation & after_adverb & modifier_alive
+
+        # Any other negation applies to the next known word unless a longer word comes first
+        sets_negation = negation & ~negates_modifier
+        clears_negation = known | negates_modifier | (~known & ~negation & (stripped > 1))
+        negated = known & (last_before(sets_negation) > last_before(clears_negation))
+
+        # "not very good": a negated modifier divides the next word's score by its intensity
+        effective = np.where(negated, 1.0 / intensity, intensity)
+        value = np.where(modified, np.clip(polarity * effective[anchor], -1, 1), polarity)
+
+        # Each unmodified known word or emoticon starts an assessment; modified words extend it
+        starts = (known & ~modified) | is_emoticon
+        member = starts | modified
+        assessment = np.cumsum(starts) - 1
+        total = int(starts.sum())
+        if not total:
+            return np.zeros(len(texts))
+        members = position[member]
+        last_member = np.zeros(count, dtype=bool)
+        last_member[members[np.r_[assessment[members][1:] != assessment[members][:-1], True]]] = True
+
+        flagged = np.zeros(count)
+        np.add.at(flagged, previous_known[negates_modifier], 1)
+        flipped = np.bincount(assessment[member], weights=(negated | (flagged > 0))[member], minlength=total) > 0
+
+        # "!" boosts the latest assessment, unless a later modified word replaces its score
+        target = last_before(member)[exclamation]
+        target = target[(target >= 0) & last_member[np.maximum(target, 0)]]
+        boosts = np.bincount(assessment[target], minlength=total)
+
+        scores = np.zeros(total)
+        scores[assessment[last_member]] = value[last_member]
+        scores = np.clip(scores * 1.25 ** boosts, -1, 1)
+        scores = np.where(flipped, scores * -0.5, scores)
+
+        assessment_doc = doc[starts]
+        totals = np.bincount(assessment_doc, weights=scores, minlength=len(texts))
+        counts = np.bincount(assessment_doc, minlength=len(texts))
+        return totals / np.maximum(counts, 1)
+
+SCORERS = {
+    TextBlobScorer.name: TextBlobScorer,
+    LexiconScorer.name: LexiconScorer
+}
+
+_scorers = {}
+
+def get_scorer(name=None):
+    """Shared scorer instance; SENTIMENT_SCORER selects it, defaulting to TextBlob"""
+    name = name or os.getenv('SENTIMENT_SCORER', TextBlobScorer.name)
+    if name not in SCORERS:
+        logger.warning(f"Unknown sentiment scorer {name}, using {TextBlobScorer.name}")
+        name = TextBlobScorer.name
+    if name not in _scorers:
+        _scorers[name] = SCORERS[name]()
+    return _scorers[name]
+
+def parity_report(texts, candidate=None, reference=None):
+    """Compare a scorer's polarities against TextBlob's on the same texts"""
+    candidate = candidate or LexiconScorer()
+    reference = reference or TextBlobScorer()
+    expected = reference.score_batch(texts)
+    actual = candidate.score_batch(texts)
+    diff = np.abs(actual - expected)
+    return {
+        'texts': len(texts),
+        'mean_abs_diff': float(diff.mean()),
+        'max_abs_diff': float(diff.max()),
+        'exact_share': float(np.mean(diff < 1e-9)),
+        'sign_agreement': float(np.mean(np.sign(np.round(actual, 9)) == np.sign(np.round(expected, 9)))),
+        'correlation': float(np.corrcoef(actual, expected)[0, 1]) if np.std(actual) and np.std(expected) else 1.0
+    }
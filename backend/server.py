@@ -4,6 +4,7 @@ from backend.screener.screener import StockScreener
 from backend.recommendations.engine import RecommendationEngine
 import threading
 import logging
+import queue
 import os
 
 # Configure logging
@@ -70,12 +71,24 @@ def execute_trade():
         if not recommendation_id:
             return jsonify({'status': 'error', 'error': 'Missing recommendation_id'})
         
-        result = recommendation_engine.execute_recommendation(recommendation_id)
-        return jsonify(result)
+        # Queue the order and return straight away; the client polls the tracking id
+        idempotency_key = request.headers.get('Idempotency-Key') or data.get('idempotency_key')
+        tracking_id = recommendation_engine.submit_recommendation(recommendation_id, idempotency_key)
+        return jsonify({'status': 'queued', 'tracking_id': tracking_id}), 202
+    except queue.Full:
+        logger.warning("Order queue is full, rejecting trade request")
+        return jsonify({'status': 'error', 'error': 'Order queue is full, try again shortly'}), 503
     except Exception as e:
         logger.error(f"Error executing trade: {e}")
         return jsonify({'status': 'error', 'error': str(e)})
 
+@app.route('/api/execute-trade/<tracking_id>')
+def get_trade_status(tracking_id):
+    job = recommendation_engine.get_execution_status(tracking_id)
+    if not job:
+        return jsonify({'status': 'error', 'error': 'Unknown tracking id'}), 404
+    return jsonify(job)
+
 def main():
     try:
         # Start the screener in a background thread
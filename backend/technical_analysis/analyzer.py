@@ -8,7 +8,8 @@ from ta.trend import ADXIndicator
 from ta.volume import OnBalanceVolumeIndicator, AccDistIndexIndicator
 
 class TechnicalAnalyzer:
-    def __init__(self):
+    def __init__(self, timeout=10):
+        self.timeout = timeout  # Seconds allowed for the price history download
         self.patterns = {
             'hammer': self._is_hammer,
             'shooting_star': self._is_shooting_star,
@@ -21,8 +22,15 @@ class TechnicalAnalyzer:
     def analyze(self, symbol, period='1y', interval='1d'):
         # Get historical data
         stock = yf.Ticker(symbol)
-        df = stock.history(period=period, interval=interval)
+        df = stock.history(period=period, interval=interval, timeout=self.timeout)
         
+        if df.empty:
+            return None
+        
+        return self.analyze_dataframe(df)
+    
+    def analyze_dataframe(self, df):
+        """Analyze OHLCV bars, e.g. from yfinance or a BarAggregator"""
         if df.empty:
             return None
         
@@ -0,0 +1,25 @@
+"""BarAggregator throughput on batched ticks: python -m benchmarks.bars"""
+import time
+import numpy as np
+from backend.market_data.bars import BarAggregator
+
+def main():
+    rng = np.random.default_rng(0)
+    n_symbols, n_ticks, batch_size = 200, 1_000_000, 5000
+    aggregator = BarAggregator([f"SYM{i}" for i in range(n_symbols)])
+    timestamps = np.sort(rng.integers(0, 3_600_000, n_ticks))
+    symbols = rng.integers(0, n_symbols, n_ticks).astype(np.int32)
+    prices = 100 + rng.standard_normal(n_ticks).cumsum() * 0.01
+    volumes = np.arange(n_ticks)
+    start = time.perf_counter()
+    for i in range(0, n_ticks, batch_size):
+        window = slice(i, i + batch_size)
+        aggregator.update({
+            'symbol_index': symbols[window], 'price': prices[window],
+            'volume': volumes[window], 'timestamp': timestamps[window]
+        })
+    elapsed = time.perf_counter() - start
+    print(f"{n_ticks / elapsed:,.0f} ticks/s in batches of {batch_size}")
+
+if __name__ == '__main__':
+    main()
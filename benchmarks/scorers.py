@@ -0,0 +1,30 @@
+"""LexiconScorer parity with TextBlob and throughput of both scorers
+
+python -m benchmarks.scorers
+"""
+import random
+import time
+from backend.sentiment_analysis.scorers import LexiconScorer, TextBlobScorer, parity_report
+
+def main():
+    rng = random.Random(0)
+    lexicon = LexiconScorer()
+    words = list(lexicon.vocabulary)
+    filler = ['the', 'shares', 'of', 'company', 'after', 'results', 'quarter', 'market', 'a', 'on', 'in', 'stock']
+    extras = ['not', 'very', 'really', 'never', "isn't", '!', 'no']
+    texts = [
+        ' '.join(rng.choice(words) if rng.random() < 0.25 else rng.choice(extras if rng.random() < 0.15 else filler)
+                 for _ in range(rng.randint(8, 40)))
+        for _ in range(20000)
+    ]
+
+    print(parity_report(texts[:5000], lexicon))
+    for scorer in (TextBlobScorer(), lexicon):
+        sample = texts if scorer is lexicon else texts[:2000]
+        start = time.perf_counter()
+        scorer.score_batch(sample)
+        elapsed = time.perf_counter() - start
+        print(f"{scorer.name}: {len(sample) / elapsed:,.0f} texts/s")
+
+if __name__ == '__main__':
+    main()
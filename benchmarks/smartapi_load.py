@@ -0,0 +1,55 @@
+"""Load test AngelBroker against a local SmartAPI stub and report p50/p99 order latency
+
+python -m benchmarks.smartapi_load --orders 2000 --latency 0.005 --error-rate 0.01 --rate-limit 20
+"""
+import argparse
+import os
+import tempfile
+from flask import Flask
+from backend.broker_integration.smartapi_stub import INSTRUMENTS_PATH, SmartAPIStubServer, run_load
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the order path against a local SmartAPI stub")
+    parser.add_argument('--orders', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=10)
+    parser.add_argument('--latency', type=float, default=0.005)
+    parser.add_argument('--jitter', type=float, default=0.005)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--rate-limit', type=float, default=None)
+    args = parser.parse_args()
+
+    stub = SmartAPIStubServer(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                              order_rate_limit=args.rate_limit, seed=0).start()
+    os.environ.update({
+        'ANGEL_API_ROOT': stub.url, 'ANGEL_CLIENT_ID': 'STUB', 'ANGEL_PIN': '0000',
+        'ANGEL_TOTP_KEY': 'JBSWY3DPEHPK3PXP', 'SMART_TRADER_CACHE_DIR': tempfile.mkdtemp()
+    })
+
+    # Imported once the environment points at the stub
+    from backend.broker_integration.broker import AngelBroker
+    from backend.broker_integration.instruments import InstrumentIndex
+
+    app = Flask(__name__)
+    broker = AngelBroker()
+    broker.instruments.stop()
+    broker.instruments = InstrumentIndex(url=stub.url + INSTRUMENTS_PATH)
+    broker.instruments.refresh()
+
+    def place(**order):
+        with app.app_context():
+            return broker.execute_trade(**order)
+
+    with app.app_context():
+        broker.login()
+    symbols = [i['name'] for i in stub.instruments]
+    orders = [{'symbol': symbols[i % len(symbols)], 'transaction_type': 'BUY', 'quantity': 1}
+              for i in range(args.orders)]
+    report = run_load(place, orders, concurrency=args.concurrency)
+    stub.stop()
+
+    print(f"{report['orders']} orders, {report['failed']} failed, {report['throughput']:.0f} orders/s")
+    print(f"p50 {report['p50_ms']:.1f} ms  p99 {report['p99_ms']:.1f} ms  max {report['max_ms']:.1f} ms")
+    print(f"stub: {stub.stats}")
+
+if __name__ == '__main__':
+    main()
@@ -164,10 +164,10 @@ async function executeTrade(recommendationId, modal) {
         
         const result = await response.json();
         
-        if (result.status === 'success') {
-            showSuccess('Trade executed successfully!');
+        if (result.status === 'queued') {
+            showSuccess('Trade queued for execution');
             modal.hide();
-            refreshData();
+            pollTradeStatus(result.tracking_id);
         } else {
             throw new Error(result.error || 'Failed to execute trade');
         }
@@ -177,6 +177,25 @@ async function executeTrade(recommendationId, modal) {
     }
 }
 
+async function pollTradeStatus(trackingId) {
+    try {
+        const response = await fetch(`/api/execute-trade/${trackingId}`);
+        const job = await response.json();
+        
+        if (job.status === 'COMPLETED') {
+            showSuccess('Trade executed successfully!');
+            refreshData();
+        } else if (job.status === 'FAILED') {
+            throw new Error(job.error || 'Failed to execute trade');
+        } else {
+            setTimeout(() => pollTradeStatus(trackingId), 1000);
+        }
+    } catch (error) {
+        console.error('Error checking trade status:', error);
+        showError(error.message);
+    }
+}
+
 function updatePositions(positions) {
     const container = document.getElementById('positions-container');
     container.innerHTML = positions.map(position => `
@@ -1,8 +1,22 @@
+import hashlib
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
 import pytest
 from unittest.mock import Mock, patch
+from datetime import datetime, timezone
+from backend.sentiment_analysis.aggregates import SentimentAggregates, to_timestamp
 from backend.sentiment_analysis.analyzer import SentimentAnalyzer
+from backend.sentiment_analysis.matcher import SymbolMatcher
+from backend.sentiment_analysis.news import NewsIngestor
+from backend.sentiment_analysis.scorers import LexiconScorer, SentimentScorer, TextBlobScorer, get_scorer, parity_report
 from backend.technical_analysis.analyzer import TechnicalAnalyzer
 from backend.fundamental_analysis.analyzer import FundamentalAnalyzer
+from backend.fundamental_analysis.cross_section import CrossSection
+from backend.fundamental_analysis.earnings import EarningsFetcher, parse_earnings
+from backend.fundamental_analysis.snapshot import FundamentalsSnapshot
 
 @pytest.fixture
 def mock_newsapi():
@@ -32,6 +46,245 @@ class TestSentimentAnalyzer:
         assert isinstance(result, dict)
         assert 'overall_score' in result
 
+    def test_sources_run_concurrently_and_slow_source_is_dropped(self, mock_newsapi, mock_twitter, mock_auth):
+        analyzer = SentimentAnalyzer(news_timeout=1, social_timeout=0.2)
+
+        def news(symbol):
+            time.sleep(0.1)
+            return 0.5
+
+        def social(symbol):
+            time.sleep(1)
+            return -0.5
+
+        analyzer._analyze_news = news
+        analyzer._analyze_social_media = social
+        start = time.monotonic()
+        result = analyzer.analyze('TCS')
+
+        assert time.monotonic() - start < 0.5
+        assert result['sources'] == ['news']
+        assert result['overall_score'] == 0.5
+        assert result['social_sentiment'] == 0
+
+    def test_news_requests_are_bounded_by_the_news_timeout(self, mock_newsapi, mock_twitter, mock_auth):
+        analyzer = SentimentAnalyzer(news_timeout=2)
+        with patch('requests.Session.request') as request:
+            request.return_value = Mock(status_code=200, json=Mock(return_value={'articles': []}))
+            analyzer.newsapi.get_everything(q='TCS')
+        assert request.call_args.kwargs['timeout'] == 2
+
+    def test_weights_both_sources_when_both_answer(self, mock_newsapi, mock_twitter, mock_auth):
+        analyzer = SentimentAnalyzer()
+        analyzer._analyze_news = lambda symbol: 0.5
+        analyzer._analyze_social_media = lambda symbol: -0.5
+        result = analyzer.analyze('TCS')
+        assert result['sources'] == ['news', 'social']
+        assert result['overall_score'] == pytest.approx(0.1)
+
+class TestSymbolMatcher:
+    def test_matches_tickers_and_aliases_on_word_boundaries(self):
+        matcher = SymbolMatcher.from_symbols(['HDFCBANK.NS', 'SBIN.NS', 'ITC.NS', 'BHARTIARTL.NS', 'RELIANCE.NS'])
+
+        assert matcher.match('HDFC Bank and State Bank of India raise lending rates') == {'HDFCBANK.NS', 'SBIN.NS'}
+        assert matcher.match('Bharti-Airtel tariffs; RIL gains') == {'BHARTIARTL.NS', 'RELIANCE.NS'}
+        assert matcher.match('ITC hits a record high') == {'ITC.NS'}
+        # Substrings of other words are not mentions
+        assert matcher.match('Investors switch to defensive stocks') == set()
+
+    def test_overlapping_names_are_all_reported(self):
+        matcher = SymbolMatcher({'A.NS': ['alpha beta gamma'], 'B.NS': ['beta'], 'C.NS': ['beta gamma delta']})
+        assert matcher.match('alpha beta gamma delta') == {'A.NS', 'B.NS', 'C.NS'}
+        assert matcher.match('alpha beta delta') == {'B.NS'}
+        assert matcher.tag(['a.ns rallies', 'nothing here']) == [{'A.NS'}, set()]
+
+class TestNewsIngestor:
+    ARTICLES = [
+        {'title': 'TCS and Infosys rally on strong deal wins', 'description': 'IT stocks gain', 'publishedAt': '2099-01-01T09:00:00Z'},
+        {'title': 'Reliance shares slump after weak results', 'description': 'Bad quarter', 'publishedAt': '2099-01-01T10:00:00Z'},
+        # Same story syndicated with different whitespace and case
+        {'title': 'TCS and  Infosys rally on strong deal wins', 'description': 'IT STOCKS GAIN', 'publishedAt': '2099-01-01T11:00:00Z'}
+    ]
+
+    def test_one_batched_query_and_each_article_scored_once(self):
+        newsapi = Mock()
+        newsapi.get_everything.return_value = {'articles': self.ARTICLES}
+        ingestor = NewsIngestor(newsapi, aliases={'INFY.NS': ['Infosys']})
+
+        assert ingestor.ingest(['TCS.NS', 'INFY.NS', 'RELIANCE.NS']) == 2
+        newsapi.get_everything.assert_called_once()
+        assert newsapi.get_everything.call_args.kwargs['q'] == '"tcs" OR "infy" OR "infosys" OR "reliance"'
+        assert ingestor.scored == 2
+
+        # The shared headline counts for both companies it names
+        assert ingestor.get_sentiment('TCS.NS') == ingestor.get_sentiment('INFY.NS') > 0
+        assert ingestor.get_sentiment('RELIANCE.NS') < 0
+
+        # Later cycles return the same articles; nothing is scored again
+        ingestor.ingest(['TCS.NS'])
+        assert ingestor.scored == 2
+
+    def test_seen_articles_survive_eviction_by_the_same_batch(self):
+        newsapi = Mock()
+        ingestor = NewsIngestor(newsapi, cache_size=2)
+        newsapi.get_everything.return_value = {'articles': self.ARTICLES[:2]}
+        ingestor.ingest(['TCS.NS', 'RELIANCE.NS'])
+
+        # Two new articles push both cached ones out while they are still needed
+        newsapi.get_everything.return_value = {'articles': self.ARTICLES[:2] + [
+            {'title': 'TCS wins a large deal', 'description': 'Good news', 'publishedAt': '2099-01-02T09:00:00Z'},
+            {'title': 'Reliance faces a weak outlook', 'description': 'Bad news', 'publishedAt': '2099-01-02T10:00:00Z'}
+        ]}
+        assert ingestor.ingest(['TCS.NS', 'RELIANCE.NS']) == 2
+        assert len(ingestor._polarity) == 2
+        assert ingestor.get_sentiment('RELIANCE.NS') < 0
+
+    def test_queries_page_through_results_within_the_budget(self):
+        articles = [
+            {'title': f'TCS headline {i}', 'description': 'IT stocks gain', 'publishedAt': f'2099-01-01T{20 - i:02d}:00:00Z'}
+            for i in range(7)
+        ]
+        newsapi = Mock()
+        newsapi.get_everything.side_effect = lambda page, page_size, **kwargs: {
+            'articles': articles[(page - 1) * page_size:page * page_size], 'totalResults': len(articles)
+        }
+
+        NewsIngestor(newsapi, page_size=3).ingest(['TCS.NS'])
+        assert [call.kwargs['page'] for call in newsapi.get_everything.call_args_list] == [1, 2, 3]
+
+        newsapi.get_everything.reset_mock()
+        assert NewsIngestor(newsapi, page_size=3, max_pages=2)._fetch_query('"tcs"', 0) == (articles[:6], False)
+        assert newsapi.get_everything.call_count == 2
+
+    def test_cursor_waits_until_the_range_is_drained(self):
+        articles = [
+            {'title': f'TCS headline {i}', 'description': 'IT stocks gain', 'publishedAt': f'2099-01-01T{20 - i:02d}:00:00Z'}
+            for i in range(3)
+        ]
+
+        def get_everything(page, page_size, to=None, **kwargs):
+            matching = [a for a in articles if to is None or to_timestamp(a['publishedAt']) <= to.timestamp()]
+            return {'articles': matching[(page - 1) * page_size:page * page_size], 'totalResults': len(matching)}
+
+        newsapi = Mock()
+        newsapi.get_everything.side_effect = get_everything
+        ingestor = NewsIngestor(newsapi, page_size=2, max_pages=1)
+
+        # One page of two: the oldest article is still unfetched, so nothing is counted yet
+        ingestor.ingest(['TCS.NS'])
+        assert ingestor.aggregates.cursor('TCS.NS', 'news') is None
+        assert not ingestor.is_fresh('TCS.NS')
+
+        ingestor.ingest(['TCS.NS'])
+        assert newsapi.get_everything.call_args.kwargs['to'].timestamp() == to_timestamp(articles[1]['publishedAt'])
+        assert ingestor.scored == 3
+        assert ingestor.aggregates.cursor('TCS.NS', 'news') == to_timestamp(articles[0]['publishedAt'])
+        assert ingestor.is_fresh('TCS.NS')
+
+    def test_queries_are_split_at_the_length_limit(self):
+        terms = {f"company{i:03d}": {f"C{i}.NS"} for i in range(60)}
+        queries = NewsIngestor._batch_queries(terms)
+        assert len(queries) > 1
+        assert all(len(query) <= 500 for query, _ in queries)
+        assert sum(len(batch) for _, batch in queries) == 60
+
+    def test_analyzer_reuses_fresh_universe_news(self, mock_newsapi, mock_twitter, mock_auth):
+        analyzer = SentimentAnalyzer()
+        analyzer.newsapi = analyzer.news.newsapi = Mock()
+        analyzer.newsapi.get_everything.return_value = {'articles': self.ARTICLES}
+        analyzer.refresh_news(['TCS.NS', 'RELIANCE.NS'])
+
+        assert analyzer._analyze_news('RELIANCE.NS') < 0
+        analyzer.newsapi.get_everything.assert_called_once()
+
+class TestSentimentScorers:
+    TEXTS = [
+        'Reliance shares slump after weak results',
+        'TCS posts a really strong quarter!!',
+        "Infosys guidance is not good, but it isn't terrible either",
+        'Not very good numbers from HDFC Bank... analysts are disappointed :(',
+        'Extremely bullish on ITC :) great dividend, "solid" outlook',
+        'Never a dull day: markets fell sharply -- then recovered',
+        '',
+        '2024 Q3 EPS in line'
+    ]
+
+    @pytest.fixture(scope='class')
+    def lexicon(self):
+        return LexiconScorer()
+
+    def test_modifiers_negations_and_exclamations(self, lexicon):
+        good = lexicon.score('good')
+        assert good > 0
+        assert lexicon.score('not good') == pytest.approx(-0.5 * good)
+        assert lexicon.score('very good') > good
+        assert lexicon.score('good!') == pytest.approx(min(good * 1.25, 1))
+        assert lexicon.score('shares in line') == 0
+
+    def test_matches_textblob(self, lexicon):
+        report = parity_report(self.TEXTS, lexicon)
+        assert report['max_abs_diff'] < 1e-9
+        assert list(lexicon.score_batch(self.TEXTS)) == pytest.approx(list(TextBlobScorer().score_batch(self.TEXTS)))
+
+    def test_unknown_scorer_falls_back_to_textblob(self, caplog):
+        assert isinstance(get_scorer('bogus'), TextBlobScorer)
+        assert 'Unknown sentiment scorer bogus' in caplog.text
+        with pytest.raises(TypeError):
+            SentimentScorer()
+        assert get_scorer('textblob') is get_scorer('textblob')
+
+    def test_ingestor_scores_new_articles_in_one_batch(self, lexicon):
+        scorer = Mock(wraps=lexicon)
+        newsapi = Mock()
+        newsapi.get_everything.return_value = {'articles': TestNewsIngestor.ARTICLES}
+        ingestor = NewsIngestor(newsapi, scorer=scorer)
+
+        ingestor.ingest(['TCS.NS', 'RELIANCE.NS'])
+        ingestor.ingest(['TCS.NS', 'RELIANCE.NS'])
+        scorer.score_batch.assert_called_once()
+        assert len(scorer.score_batch.call_args.args[0]) == 2
+        assert ingestor.get_sentiment('RELIANCE.NS') < 0
+
+class TestSentimentAggregates:
+    def test_items_decay_by_half_life(self):
+        aggregates = SentimentAggregates(half_lives={'news': 100}, min_weight=0)
+        aggregates.add('TCS.NS', 'news', [(1000, 1.0, 'a'), (1100, -1.0, 'b')])
+
+        # The older item carries half the weight of the newer one
+        assert aggregates.score('TCS.NS', 'news', now=1100) == pytest.approx((0.5 - 1) / 1.5)
+        assert aggregates.weight('TCS.NS', 'news', now=1200) == pytest.approx(0.75)
+        assert aggregates.score('INFY.NS', 'news') is None
+
+    def test_only_items_past_the_cursor_are_counted(self):
+        aggregates = SentimentAggregates(half_lives={'news': 100})
+        assert aggregates.add('TCS.NS', 'news', [(1000, 0.5, 'a'), (1000, 0.5, 'b')]) == 2
+        # A refetch returns the same items plus one new one
+        assert aggregates.add('TCS.NS', 'news', [(1000, 0.5, 'a'), (1000, 0.5, 'b'), (900, 1.0, 'old'), (1050, 0.5, 'c')]) == 1
+        assert aggregates.cursor('TCS.NS', 'news') == 1050
+
+    def test_stale_scores_fade_toward_neutral(self):
+        aggregates = SentimentAggregates(half_lives={'social': 60}, min_weight=1.0)
+        aggregates.add('TCS.NS', 'social', [(0, 0.8, 1)])
+        assert aggregates.score('TCS.NS', 'social', now=0) == pytest.approx(0.8)
+        assert aggregates.score('TCS.NS', 'social', now=60) == pytest.approx(0.4)
+
+    def test_analyzer_fetches_only_new_tweets(self, mock_newsapi, mock_twitter, mock_auth):
+        analyzer = SentimentAnalyzer()
+        tweet = lambda id, text: Mock(id=id, text=text, created_at=datetime.now(timezone.utc))
+        analyzer.twitter_api = Mock()
+        analyzer.twitter_api.search_tweets.return_value = [tweet(1, 'Great results'), tweet(2, 'Good quarter')]
+        first = analyzer._analyze_social_media('TCS')
+        assert first > 0
+
+        analyzer.twitter_api.search_tweets.return_value = []
+        assert analyzer._analyze_social_media('TCS') == pytest.approx(first)
+        assert analyzer.twitter_api.search_tweets.call_args.kwargs['since_id'] == 2
+
+        analyzer.twitter_api.reset_mock()
+        assert analyzer.current('TCS')['social_sentiment'] == pytest.approx(first, rel=1e-3)
+        assert analyzer.current('TCS')['sources'] == ['social']
+        analyzer.twitter_api.search_tweets.assert_not_called()
+
 class TestTechnicalAnalyzer:
     def test_initialization(self):
         analyzer = TechnicalAnalyzer()
@@ -81,3 +334,197 @@ class TestFundamentalAnalyzer:
         assert isinstance(result, dict)
         assert 'market_cap' in result
         assert result['market_cap'] == 1000000
+
+class TestFundamentalsSnapshot:
+    INFO = {
+        'TCS.NS': {'marketCap': 1.5e13, 'trailingPE': 30, 'profitMargins': 0.19, 'sector': 'Technology'},
+        'SBIN.NS': {'marketCap': 7e12, 'trailingPE': 10, 'sector': 'Financial Services'}
+    }
+
+    @pytest.fixture
+    def ticker(self):
+        def make(symbol):
+            if symbol not in self.INFO:
+                raise ValueError('unknown symbol')
+            return Mock(info=self.INFO[symbol], quarterly_financials=Mock(empty=True))
+        with patch('backend.fundamental_analysis.snapshot.yf.Ticker', side_effect=make) as mock:
+            yield mock
+
+    def test_refresh_writes_a_snapshot_served_without_network(self, tmp_path, ticker):
+        snapshot = FundamentalsSnapshot(cache_dir=str(tmp_path))
+        assert snapshot.refresh(['TCS.NS', 'SBIN.NS'])
+
+        reloaded = FundamentalsSnapshot(cache_dir=str(tmp_path))
+        assert reloaded.load() and len(reloaded) == 2
+        assert reloaded.get('TCS.NS') == {
+            'market_cap': 1.5e13, 'pe_ratio': 30.0, 'profit_margins': 0.19, 'sector': 'Technology'
+        }
+
+        analyzer = FundamentalAnalyzer(snapshot=reloaded)
+        with patch('yfinance.Ticker') as live:
+            assert analyzer.analyze('SBIN.NS')['pe_ratio'] == 10.0
+            live.assert_not_called()
+
+    def test_misses_fall_back_to_live_and_join_the_next_refresh(self, tmp_path, ticker):
+        snapshot = FundamentalsSnapshot(cache_dir=str(tmp_path))
+        snapshot.refresh(['TCS.NS'])
+        analyzer = FundamentalAnalyzer(snapshot=snapshot)
+
+        with patch('yfinance.Ticker', return_value=Mock(info=self.INFO['SBIN.NS'], quarterly_financials=Mock(empty=True))):
+            assert analyzer.analyze('SBIN.NS')['sector'] == 'Financial Services'
+        assert 'SBIN.NS' not in snapshot
+
+        snapshot.refresh({'SBIN.NS'}, full=False)
+        assert 'SBIN.NS' in snapshot and 'TCS.NS' in snapshot
+
+    def test_failed_fetch_keeps_the_previous_row(self, tmp_path, ticker):
+        snapshot = FundamentalsSnapshot(cache_dir=str(tmp_path))
+        snapshot.refresh(['TCS.NS'])
+        ticker.side_effect = RuntimeError('rate limited')
+        assert snapshot.refresh()
+        assert snapshot.get('TCS.NS')['pe_ratio'] == 30.0
+
+    def test_failed_misses_are_dropped_and_bounded(self, tmp_path, ticker):
+        snapshot = FundamentalsSnapshot(cache_dir=str(tmp_path), max_misses=2)
+        snapshot.refresh(['TCS.NS'])
+        for symbol in ['BOGUS.NS', 'SBIN.NS', 'OTHER.NS']:
+            assert snapshot.get(symbol) is None
+        assert snapshot._misses == {'BOGUS.NS', 'SBIN.NS'}
+
+        snapshot.refresh(set(snapshot._misses), full=False)
+        assert 'SBIN.NS' in snapshot and not snapshot._misses
+
+        # The invalid symbol is not recorded again, so later refreshes stop retrying it
+        snapshot.get('BOGUS.NS')
+        assert not snapshot._misses
+        ticker.reset_mock()
+        snapshot.refresh()
+        assert {c.args[0] for c in ticker.call_args_list} == {'SBIN.NS', 'TCS.NS'}
+
+    def test_lookups_never_mix_two_snapshots(self, tmp_path):
+        snapshot = FundamentalsSnapshot(cache_dir=str(tmp_path))
+        rows = {f"S{i}.NS": {'pe_ratio': float(i), 'sector': f"S{i}.NS"} for i in range(200)}
+        forward = snapshot.build(rows)
+        shifted = snapshot.build({'A0.NS': {'pe_ratio': -1.0, 'sector': 'A0.NS'}, **rows})
+        snapshot._install(forward, 1.0)
+        stop = threading.Event()
+
+        def swap():
+            while not stop.is_set():
+                snapshot._install(forward, 1.0)
+                snapshot._install(shifted, 2.0)
+
+        swapper = threading.Thread(target=swap)
+        swapper.start()
+        try:
+            for _ in range(20000):
+                assert snapshot.get('S150.NS')['sector'] == 'S150.NS'
+        finally:
+            stop.set()
+            swapper.join()
+
+class TestCrossSection:
+    @pytest.fixture
+    def cross_section(self):
+        # Banks trade on low P/E, software on high; each is cheap or dear only against its peers
+        banks = {f"BANK{i}.NS": {'pe_ratio': 8 + i, 'revenue_growth': 5 - i, 'profit_margins': 0.2, 'sector': 'Financial Services'}
+                 for i in range(5)}
+        tech = {f"TECH{i}.NS": {'pe_ratio': 30 + 5 * i, 'revenue_growth': 10 + i, 'profit_margins': 0.25, 'sector': 'Technology'}
+                for i in range(5)}
+        other = {'LOSS.NS': {'pe_ratio': -4, 'revenue_growth': 2, 'sector': 'Energy'}, 'NEW.NS': {}}
+        return CrossSection.from_metrics({**banks, **tech, **other})
+
+    def test_ranks_are_relative_to_sector_peers(self, cross_section):
+        frame = cross_section.frame
+        # The cheapest software stock ranks as cheap as the cheapest bank
+        assert frame.loc['TECH0.NS', 'pe_ratio_quintile'] == frame.loc['BANK0.NS', 'pe_ratio_quintile'] == 1
+        assert frame.loc['TECH4.NS', 'pe_ratio_rank'] == 1.0
+        # Loss-makers get no P/E rank; a lone sector is ranked against the universe
+        assert np.isnan(frame.loc['LOSS.NS', 'pe_ratio_rank'])
+        assert frame.loc['LOSS.NS', 'revenue_growth_rank'] == pytest.approx(2.5 / 11)   # Tied with BANK3
+
+    def test_composite_and_screens(self, cross_section):
+        scores = cross_section.scores()
+        assert scores['BANK0.NS'] > scores['BANK4.NS']
+        assert scores['NEW.NS'] == 0.5
+        assert set(cross_section.screen('pe_ratio_quintile == 1 and revenue_growth > 0')) == {'TECH0.NS', 'BANK0.NS'}
+
+    def test_builds_from_snapshot(self, tmp_path):
+        snapshot = FundamentalsSnapshot(cache_dir=str(tmp_path))
+        snapshot._install(snapshot.build({'TCS.NS': {'pe_ratio': 30.0, 'sector': 'Technology'}}), 0.0)
+        cross_section = CrossSection.from_snapshot(snapshot)
+        assert len(cross_section) == 1
+        assert cross_section.frame.loc['TCS.NS', 'pe_ratio_rank'] == 1.0
+
+EARNINGS_FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures', 'earnings')
+
+@pytest.fixture
+def earnings_server():
+    """Serves the saved analysis pages with ETag revalidation, recording each request"""
+    requests_seen = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            symbol = self.path.split('/')[2]
+            requests_seen.append((symbol, self.headers.get('If-None-Match')))
+            path = os.path.join(EARNINGS_FIXTURES, f"{symbol}.html")
+            if not os.path.exists(path):
+                self.send_response(404)
+                self.end_headers()
+                return
+            with open(path, 'rb') as f:
+                body = f.read()
+            etag = f'"{hashlib.sha1(body).hexdigest()}"'
+            if self.headers.get('If-None-Match') == etag:
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html')
+            self.send_header('Content-Length', str(len(body)))
+            self.send_header('ETag', etag)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    server.requests_seen = requests_seen
+    server.url = f"http://127.0.0.1:{server.server_address[1]}/quote/{{symbol}}/analysis"
+    yield server
+    server.shutdown()
+    server.server_close()
+
+class TestEarningsFetcher:
+    def test_parses_the_earnings_history_table(self):
+        with open(os.path.join(EARNINGS_FIXTURES, 'TCS.NS.html'), 'rb') as f:
+            earnings = parse_earnings(f.read())
+        assert len(earnings) == 4
+        assert earnings[0] == {'quarter': '6/29/2023', 'eps_estimate': '29.5', 'eps_actual': '30.26', 'surprise': '2.60%'}
+
+    def test_batch_fetch_and_revalidation(self, earnings_server):
+        fetcher = EarningsFetcher(url=earnings_server.url, concurrency=2)
+        try:
+            results = fetcher.fetch(['TCS.NS', 'INFY.NS', 'MISSING.NS'])
+            assert len(results['TCS.NS']) == 4
+            assert results['INFY.NS'] is None and results['MISSING.NS'] is None
+            assert fetcher.stats == {'fetched': 2, 'not_modified': 0, 'errors': 1}
+
+            # Second batch revalidates: the unchanged pages come back 304 and are not re-parsed
+            again = fetcher.fetch(['TCS.NS', 'INFY.NS'])
+            assert again['TCS.NS'] == results['TCS.NS']
+            assert fetcher.stats['not_modified'] == 2
+            assert all(etag for symbol, etag in earnings_server.requests_seen[-2:])
+        finally:
+            fetcher.close()
+
+    def test_analyzer_uses_the_fetcher(self, earnings_server):
+        analyzer = FundamentalAnalyzer()
+        analyzer.earnings = EarningsFetcher(url=earnings_server.url)
+        try:
+            assert analyzer._get_quarterly_earnings('TCS.NS')[-1]['eps_actual'] == '34.37'
+        finally:
+            analyzer.earnings.close()
@@ -0,0 +1,84 @@
+import importlib
+import threading
+import time
+import pytest
+from unittest.mock import patch
+from backend.cache.swr import StaleWhileRevalidateCache
+from backend.screener.screener import get_index_stocks
+
+@pytest.fixture(scope='module')
+def app_module(tmp_path_factory):
+    env = {
+        'TWITTER_API_KEY': 'key', 'TWITTER_API_SECRET': 'secret', 'NEWS_API_KEY': 'key',
+        'SMART_TRADER_CACHE_DIR': str(tmp_path_factory.mktemp('cache'))
+    }
+    with patch.dict('os.environ', env), \
+         patch('backend.fundamental_analysis.snapshot.FundamentalsSnapshot.start'):
+        yield importlib.import_module('app')
+
+@pytest.fixture
+def components(app_module):
+    release = threading.Event()
+
+    def slow_fundamentals(symbol):
+        release.wait(5)
+        return {'pe_ratio': 20}
+
+    with patch.object(app_module.sentiment_cache, 'get', lambda symbol: {'overall_score': 0.4}), \
+         patch.object(app_module.technical_analyzer, 'analyze', lambda symbol: {'current_price': 100.0, 'indicators': {}}), \
+         patch.object(app_module.fundamental_cache, 'get', slow_fundamentals), \
+         patch.dict(app_module.ANALYSIS_TIMEOUTS, {'fundamental': 0.3}):
+        yield app_module
+    release.set()
+
+class TestAppSetup:
+    def test_snapshot_covers_the_screener_universe(self, app_module):
+        universe = app_module.fundamental_snapshot.start.call_args.args[0]
+        assert set(universe) == set(get_index_stocks()) and 'TCS.NS' in universe
+
+class TestCacheLoaders:
+    def test_outages_are_failures_so_stale_values_are_kept(self, app_module):
+        answered = {'overall_score': 0.4, 'news_sentiment': 0.4, 'social_sentiment': 0, 'sources': ['news']}
+        outage = {'overall_score': 0, 'news_sentiment': 0, 'social_sentiment': 0, 'sources': []}
+        with patch.object(app_module.sentiment_analyzer, 'analyze', side_effect=[answered, outage]):
+            cache = StaleWhileRevalidateCache(app_module.load_sentiment, soft_ttl=60, hard_ttl=100)
+            assert cache.get('TCS.NS') == answered
+            _, failed = cache.refresh('TCS.NS').result(timeout=5)
+            assert failed
+            assert cache.get('TCS.NS') == answered
+
+        with patch.object(app_module.fundamental_analyzer, 'analyze', return_value={}):
+            assert app_module.load_fundamentals('UNKNOWN.NS') is None
+
+class TestAnalyzeEndpoint:
+    def test_slow_component_is_dropped_at_its_deadline(self, components):
+        client = components.app.test_client()
+        start = time.monotonic()
+        response = client.post('/api/v1/analyze', json={'symbol': 'TCS.NS'})
+
+        assert time.monotonic() - start < 1
+        assert response.status_code == 200
+        body = response.get_json()
+        assert body['timed_out'] == ['fundamental'] and body['rejected'] == []
+        assert body['fundamental'] is None
+        assert body['sentiment'] == {'overall_score': 0.4}
+        assert body['recommendation']['scores']['sentiment'] == pytest.approx(0.7)
+        assert body['recommendation']['scores']['fundamental'] == 0.5
+
+    def test_saturated_pool_rejects_instead_of_queueing(self, components):
+        client = components.app.test_client()
+
+        def sentiment(symbol):
+            time.sleep(0.1)   # Holds the only worker while the other components are submitted
+            return {'overall_score': 0.4}
+
+        with patch.object(components, 'analysis_slots', threading.BoundedSemaphore(1)), \
+             patch.object(components.sentiment_cache, 'get', sentiment):
+            body = client.post('/api/v1/analyze', json={'symbol': 'TCS.NS'}).get_json()
+            assert body['sentiment'] == {'overall_score': 0.4}
+            assert body['rejected'] == ['technical', 'fundamental']
+
+            components.analysis_slots.acquire()
+            response = client.post('/api/v1/analyze', json={'symbol': 'TCS.NS'})
+            assert response.status_code == 503
+            assert response.headers['Retry-After'] == '1'
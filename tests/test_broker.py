@@ -0,0 +1,315 @@
+import base64
+import json
+import os
+import queue
+import threading
+import time
+import pytest
+import requests
+from unittest.mock import Mock, patch
+from backend.broker_integration.broker import AngelBroker, BrokerClient
+from backend.broker_integration.instruments import InstrumentIndex
+from backend.broker_integration.order_store import OrderStore
+from backend.broker_integration.order_queue import OrderQueue
+from backend.broker_integration.rate_limiter import TokenBucket
+from backend.broker_integration.session import BrokerSession, token_expiry
+from backend.broker_integration.smartapi_stub import SmartAPIStubServer, run_load
+
+@pytest.fixture
+def instrument_master():
+    return [
+        {'token': '2885', 'symbol': 'RELIANCE-EQ', 'name': 'RELIANCE', 'exch_seg': 'NSE'},
+        {'token': '1333', 'symbol': 'HDFCBANK-EQ', 'name': 'HDFCBANK', 'exch_seg': 'NSE'},
+        {'token': '500325', 'symbol': 'RELIANCE', 'name': 'RELIANCE', 'exch_seg': 'BSE'},
+        {'token': '35001', 'symbol': 'NIFTY26DEC2426000CE', 'name': 'NIFTY', 'exch_seg': 'NFO'}
+    ]
+
+class TestInstrumentIndex:
+    def test_lookup_after_refresh_and_reload(self, tmp_path, instrument_master):
+        index = InstrumentIndex(cache_dir=str(tmp_path))
+        assert index.get_token('RELIANCE.NS') is None
+
+        response = Mock()
+        response.json.return_value = instrument_master
+        with patch('backend.broker_integration.instruments.requests.get', return_value=response):
+            assert index.refresh()
+
+        assert index.get_token('RELIANCE.NS') == '2885'
+        assert index.get_token('RELIANCE-EQ') == '2885'
+        assert index.get_token('HDFCBANK') == '1333'
+        assert index.get_token('RELIANCE.BO') == '500325'
+        assert index.get_token('NIFTY26DEC2426000CE', exchange='NFO') is None
+        assert index.get_token('UNKNOWN.NS') is None
+
+        # A fresh process only needs to memory-map the saved file
+        reloaded = InstrumentIndex(cache_dir=str(tmp_path))
+        assert reloaded.load()
+        assert reloaded.get_token('HDFCBANK.NS') == '1333'
+        assert len(reloaded) == len(index) == 5
+
+    def test_failed_refresh_keeps_current_index(self, tmp_path, instrument_master):
+        index = InstrumentIndex(cache_dir=str(tmp_path))
+        index._table = index.build(instrument_master)
+        with patch('backend.broker_integration.instruments.requests.get', side_effect=Exception('timeout')):
+            assert not index.refresh()
+        assert index.get_token('RELIANCE.NS') == '2885'
+        assert not os.listdir(tmp_path)
+
+class TestOrderStore:
+    def test_postbacks_update_seeded_book(self):
+        store = OrderStore()
+        store.seed([
+            {'orderid': '1001', 'tradingsymbol': 'TCS-EQ', 'status': 'open'},
+            {'orderid': '1002', 'tradingsymbol': 'INFY-EQ', 'status': 'complete'}
+        ])
+
+        store.apply_postback({'feed_type': 'order', 'order_id': '1001', 'status': 'complete'})
+        # A late postback must not reopen a finished order
+        store.apply_postback({'orderid': '1002', 'orderstatus': 'open'})
+
+        assert store.get_status('1001') == 'complete'
+        assert store.get('1001')['tradingsymbol'] == 'TCS-EQ'
+        assert store.get_status('1002') == 'complete'
+        assert store.get_status('9999') is None
+
+    def test_reconcile_corrects_local_state(self):
+        store = OrderStore()
+        store.upsert({'orderid': '2001', 'status': 'open pending'})
+        changed = store.reconcile([
+            {'orderid': '2001', 'status': 'rejected'},
+            {'orderid': '2002', 'status': 'open'}
+        ])
+        assert changed == 2
+        assert store.get_status('2001') == 'rejected'
+        assert len(store) == 2
+
+class TestTokenBucket:
+    def test_burst_then_paced(self):
+        bucket = TokenBucket(rate=50, capacity=5)
+        assert all(bucket.try_acquire() for _ in range(5))
+        assert not bucket.try_acquire()
+        start = time.monotonic()
+        assert bucket.acquire()
+        assert time.monotonic() - start >= 0.015
+        assert not bucket.acquire(tokens=5, timeout=0.01)
+
+class TestOrderQueue:
+    def test_priority_idempotency_and_status(self):
+        gate = threading.Event()
+        executed = []
+
+        def handler(payload):
+            gate.wait(5)
+            executed.append(payload)
+            return {'status': 'error', 'error': 'rejected'} if payload == 'bad' else {'status': 'success'}
+
+        orders = OrderQueue(handler, workers=1, rate_limiter=TokenBucket(1000))
+        first = orders.submit('first', priority=1)
+        time.sleep(0.05)  # Let the worker pick up the first job and block on the gate
+        low = orders.submit('low', priority=1)
+        high = orders.submit('high', priority=9, idempotency_key='rec-high')
+        bad = orders.submit('bad', priority=5)
+
+        assert orders.submit('high again', priority=9, idempotency_key='rec-high') == high
+        assert orders.get(low)['status'] == 'QUEUED'
+
+        gate.set()
+        orders.stop()
+
+        assert executed == ['first', 'high', 'bad', 'low']
+        assert orders.get(first)['status'] == 'COMPLETED'
+        assert orders.get(bad)['status'] == 'FAILED'
+        assert orders.get(bad)['error'] == 'rejected'
+
+    def test_failed_job_can_be_retried_with_the_same_key(self):
+        attempts = []
+
+        def handler(payload):
+            attempts.append(payload)
+            return {'status': 'error', 'error': 'rejected'} if len(attempts) == 1 else {'status': 'success'}
+
+        orders = OrderQueue(handler, workers=1, rate_limiter=TokenBucket(1000))
+        failed = orders.submit('order', idempotency_key='rec-1')
+        orders._queue.join()
+        assert orders.get(failed)['status'] == 'FAILED'
+
+        retry = orders.submit('order', idempotency_key='rec-1')
+        orders._queue.join()
+        assert retry != failed
+        assert orders.get(retry)['status'] == 'COMPLETED'
+        assert orders.submit('order', idempotency_key='rec-1') == retry
+        assert len(attempts) == 2
+        orders.stop()
+
+    def test_bounded_queue_rejects_when_full(self):
+        gate = threading.Event()
+        orders = OrderQueue(lambda payload: gate.wait(5), workers=1, maxsize=1, rate_limiter=TokenBucket(1000))
+        orders.submit('running')
+        time.sleep(0.05)
+        orders.submit('waiting')
+        with pytest.raises(queue.Full):
+            orders.submit('overflow')
+        gate.set()
+        orders.stop()
+
+class TestBasketOrders:
+    def test_collects_partial_failures(self):
+        client = BrokerClient()
+        calls = []
+
+        def place_order(symbol, quantity, transaction_type, **kwargs):
+            calls.append(symbol)
+            time.sleep(0.1)
+            if symbol == 'BAD.NS':
+                raise Exception('Invalid symbol')
+            return {'order_id': f'ord_{symbol}', 'status': 'PLACED'}
+
+        client.place_order = place_order
+        orders = [{'symbol': s, 'quantity': 1, 'transaction_type': 'BUY'} for s in ['TCS.NS', 'BAD.NS', 'INFY.NS', 'SBIN.NS']]
+
+        start = time.monotonic()
+        basket = client.place_basket_order(orders)
+
+        # Orders go out concurrently, so the basket costs about one round trip
+        assert time.monotonic() - start < 0.3
+        assert basket['status'] == 'partial'
+        assert basket['succeeded'] == 3 and basket['failed'] == 1
+        assert [r['symbol'] for r in basket['results']] == ['TCS.NS', 'BAD.NS', 'INFY.NS', 'SBIN.NS']
+        assert basket['results'][1] == {'symbol': 'BAD.NS', 'status': 'error', 'error': 'Invalid symbol'}
+        assert basket['results'][0]['order']['order_id'] == 'ord_TCS.NS'
+
+    def test_angel_basket_takes_the_common_order_shape(self):
+        broker = AngelBroker.__new__(AngelBroker)
+        broker.order_rate_limiter = TokenBucket(1000)
+        broker.execute_trade = Mock(return_value={'status': 'success', 'order_id': '1'})
+        orders = [
+            {'symbol': 'TCS.NS', 'quantity': 2, 'transaction_type': 'BUY', 'order_type': 'MARKET', 'stop_loss': 3400.0, 'target': 3800.0},
+            {'symbol': 'INFY.NS', 'quantity': 3, 'transaction_type': 'SELL', 'order_type': 'LIMIT', 'price': 1500.0}
+        ]
+
+        orders.append({'symbol': 'SBIN.NS', 'quantity': 1, 'transaction_type': 'BUY'})
+
+        basket = broker.place_basket_order(orders)
+        assert basket['status'] == 'partial'
+        # The order with a stop loss is rejected instead of going out unprotected
+        assert basket['results'][0] == {
+            'symbol': 'TCS.NS', 'status': 'error', 'error': 'Stop loss and target are not supported on Angel basket orders'
+        }
+        calls = sorted(call.args for call in broker.execute_trade.call_args_list)
+        assert calls == [('INFY.NS', 'SELL', 3, 1500.0), ('SBIN.NS', 'BUY', 1, None)]
+
+def make_jwt(exp):
+    payload = base64.urlsafe_b64encode(json.dumps({'exp': exp}).encode()).decode().rstrip('=')
+    return f"header.{payload}.signature"
+
+class TestBrokerSession:
+    def make_session(self, expires_in, refresh_margin=300):
+        session = BrokerSession('key', 'client', '1234', 'JBSWY3DPEHPK3PXP', refresh_margin=refresh_margin)
+        session._client = Mock()
+        session.access_token = make_jwt(time.time() + expires_in)
+        session.refresh_token = 'refresh-1'
+        session.expires_at = token_expiry(session.access_token)
+        return session
+
+    def test_token_expiry_reads_exp_claim(self):
+        assert token_expiry(make_jwt(1700000000)) == 1700000000
+        assert token_expiry('not-a-jwt') is None
+
+    def test_valid_token_needs_no_broker_call(self):
+        session = self.make_session(expires_in=3600)
+        session.ensure_session()
+        session._client.generateToken.assert_not_called()
+        session._client.generateSession.assert_not_called()
+
+    def test_expiring_token_is_renewed_with_refresh_token(self):
+        session = self.make_session(expires_in=60)
+        new_token = make_jwt(time.time() + 3600)
+        session._client.generateToken.return_value = {
+            'data': {'jwtToken': new_token, 'refreshToken': 'refresh-2', 'feedToken': 'feed-2'}
+        }
+        session.ensure_session()
+
+        session._client.generateToken.assert_called_once_with('refresh-1')
+        assert session.access_token == new_token
+        assert session.refresh_token == 'refresh-2'
+        assert session.feed_token == 'feed-2'
+
+    def test_failed_renewal_falls_back_to_login(self):
+        session = self.make_session(expires_in=60)
+        session._client.generateToken.side_effect = Exception('refresh token expired')
+        session._client.generateSession.return_value = {'status': True, 'data': {'refreshToken': 'refresh-3'}}
+        session._client.access_token = make_jwt(time.time() + 3600)
+        session._client.getfeedToken.return_value = 'feed-3'
+        session.refresh()
+
+        session._client.generateSession.assert_called_once()
+        assert session.refresh_token == 'refresh-3'
+        assert session.access_token == session._client.access_token
+
+    def test_background_thread_renews_before_expiry(self):
+        session = self.make_session(expires_in=0.2, refresh_margin=0.1)
+        renewed = threading.Event()
+
+        def generate_token(refresh_token):
+            renewed.set()
+            return {'data': {'jwtToken': make_jwt(time.time() + 3600)}}
+
+        session._client.generateToken.side_effect = generate_token
+        session.start()
+        try:
+            assert renewed.wait(2)
+        finally:
+            session.stop()
+        assert session.expires_at > time.time() + 3000
+
+@pytest.fixture
+def smartapi_stub():
+    stub = SmartAPIStubServer(seed=0).start()
+    yield stub
+    stub.stop()
+
+class TestSmartAPIStub:
+    ORDER = {'variety': 'NORMAL', 'tradingsymbol': 'TCS-EQ', 'symboltoken': '11536', 'transactiontype': 'BUY',
+             'exchange': 'NSE', 'ordertype': 'MARKET', 'producttype': 'DELIVERY', 'duration': 'DAY', 'quantity': 2}
+
+    def login(self, stub, http):
+        response = http.post(f"{stub.url}/rest/auth/angelbroking/user/v1/loginByPassword",
+                             json={'clientcode': 'A123', 'password': '0000', 'totp': '123456'})
+        data = response.json()['data']
+        assert token_expiry(data['jwtToken']) > time.time()
+        http.headers['Authorization'] = f"Bearer {data['jwtToken']}"
+        return data
+
+    def test_order_lifecycle(self, smartapi_stub):
+        http = requests.Session()
+        secure = f"{smartapi_stub.url}/rest/secure/angelbroking"
+        assert http.get(f"{secure}/order/v1/getOrderBook").status_code == 403
+        self.login(smartapi_stub, http)
+
+        placed = http.post(f"{secure}/order/v1/placeOrder", json=self.ORDER).json()
+        assert placed['status'] is True
+        book = http.get(f"{secure}/order/v1/getOrderBook").json()['data']
+        assert [o['orderid'] for o in book] == [placed['data']['orderid']]
+        assert book[0]['status'] == 'complete'
+        positions = http.get(f"{secure}/order/v1/getPosition").json()['data']
+        assert positions[0]['netqty'] == '2'
+        assert http.get(f"{secure}/user/v1/getRMS").json()['data']['availablecash']
+
+    def test_rate_limit_and_error_injection(self):
+        stub = SmartAPIStubServer(order_rate_limit=5, seed=1).start()
+        try:
+            http = requests.Session()
+            self.login(stub, http)
+            stub.error_rate = 0.2
+
+            def place(**order):
+                return http.post(f"{stub.url}/rest/secure/angelbroking/order/v1/placeOrder", json=order).json()
+
+            report = run_load(place, [self.ORDER] * 40, concurrency=1)
+        finally:
+            stub.stop()
+
+        assert stub.stats['rate_limited'] > 0 and stub.stats['errors_injected'] > 0
+        assert report['failed'] == stub.stats['rate_limited'] + stub.stats['errors_injected']
+        assert report['orders'] - report['failed'] == stub.stats['orders']
+        assert 0 < report['p50_ms'] <= report['p99_ms'] <= report['max_ms']
@@ -0,0 +1,111 @@
+import threading
+import time
+import pytest
+from unittest.mock import Mock, patch
+from backend.cache.swr import StaleWhileRevalidateCache
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock():
+    clock = Clock()
+    with patch('backend.cache.swr.time.monotonic', clock):
+        yield clock
+
+class TestStaleWhileRevalidateCache:
+    def test_serves_fresh_then_stale_with_one_background_refresh(self, clock):
+        loader = Mock(side_effect=['v1', 'v2'])
+        cache = StaleWhileRevalidateCache(loader, soft_ttl=10, hard_ttl=100)
+
+        assert cache.get('TCS') == 'v1'
+        clock.now += 5
+        assert cache.get('TCS') == 'v1'
+        assert loader.call_count == 1
+
+        clock.now += 10
+        assert cache.get('TCS') == 'v1'   # Stale: served, and refreshed in the background
+        deadline = time.perf_counter() + 5
+        while cache.get('TCS') != 'v2' and time.perf_counter() < deadline:
+            time.sleep(0.01)
+        assert cache.get('TCS') == 'v2'
+        assert loader.call_count == 2
+        assert cache.stats['refreshes'] == 1
+
+    def test_stale_read_does_not_wait_for_a_slow_upstream(self, clock):
+        release = threading.Event()
+        values = iter(['v1', 'v2'])
+
+        def loader(key):
+            value = next(values)
+            if value == 'v2':
+                release.wait(5)
+            return value
+
+        cache = StaleWhileRevalidateCache(loader, soft_ttl=10, hard_ttl=100)
+        cache.get('TCS')
+        clock.now += 20
+        start = time.perf_counter()
+        assert cache.get('TCS') == 'v1'
+        assert cache.get('TCS') == 'v1'
+        assert time.perf_counter() - start < 0.5
+        assert cache.stats['refreshes'] == 1
+        release.set()
+
+    def test_concurrent_misses_share_one_load(self, clock):
+        calls = []
+
+        def loader(key):
+            calls.append(key)
+            time.sleep(0.1)
+            return key.lower()
+
+        cache = StaleWhileRevalidateCache(loader, soft_ttl=10, hard_ttl=100)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cache.get('TCS'))) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert results == ['tcs'] * 8
+        assert calls == ['TCS']
+
+    def test_failures_are_negatively_cached(self, clock):
+        loader = Mock(side_effect=[RuntimeError('rate limited'), None, 'ok'])
+        cache = StaleWhileRevalidateCache(loader, soft_ttl=10, hard_ttl=100, negative_ttl=30)
+
+        assert cache.get('TCS', default='n/a') == 'n/a'
+        assert cache.get('TCS', default='n/a') == 'n/a'
+        assert loader.call_count == 1
+
+        clock.now += 31
+        assert cache.get('TCS') is None     # Loader returned None: also a failure
+        clock.now += 31
+        assert cache.get('TCS') == 'ok'
+        assert cache.stats['failures'] == 2
+
+    def test_failed_refresh_keeps_stale_value_until_hard_ttl(self, clock):
+        loader = Mock(side_effect=['v1', RuntimeError('down'), RuntimeError('down')])
+        cache = StaleWhileRevalidateCache(loader, soft_ttl=10, hard_ttl=100, negative_ttl=30)
+        cache.get('TCS')
+
+        clock.now += 20
+        cache.refresh('TCS').result(timeout=5)
+        assert cache.get('TCS') == 'v1'
+        assert loader.call_count == 2       # Backing off: no refresh while the failure is recent
+
+        clock.now += 100
+        assert cache.get('TCS') is None
+
+    def test_evicts_least_recently_used(self, clock):
+        cache = StaleWhileRevalidateCache(str.lower, soft_ttl=10, hard_ttl=100, max_size=2)
+        cache.get('A')
+        cache.get('B')
+        cache.get('A')
+        cache.get('C')
+        assert len(cache) == 2
+        assert 'B' not in cache._entries
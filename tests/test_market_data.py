@@ -0,0 +1,193 @@
+import time
+import numpy as np
+import pandas as pd
+import pytest
+from types import SimpleNamespace
+from unittest.mock import patch
+from backend.market_data.bars import BarAggregator
+from backend.market_data.feed import MarketDataFeed, TickRing, MODE_LTP
+from backend.market_data.feed_server import LocalFeedServer, encode_tick
+from backend.market_data.quotes import QuoteService
+from backend.technical_analysis.analyzer import TechnicalAnalyzer
+
+TOKENS = {'RELIANCE.NS': '2885', 'TCS.NS': '11536', 'INFY.NS': '1594'}
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+@pytest.fixture
+def feed_server():
+    server = LocalFeedServer().start()
+    yield server
+    server.stop()
+
+@pytest.fixture
+def feed(feed_server):
+    session = SimpleNamespace(access_token='jwt', api_key='key', client_id='A123', feed_token='feed')
+    instruments = SimpleNamespace(get_token=TOKENS.get)
+    feed = MarketDataFeed(session, instruments, url=feed_server.url, reconnect_delay=0.05)
+    yield feed
+    feed.stop()
+
+class TestTickRing:
+    def test_drains_in_order_across_wraparound(self):
+        ring = TickRing(capacity=4)
+        for i in range(3):
+            ring.push(i, 100.0 + i, 10, i)
+        assert list(ring.drain(max_items=2)['price']) == [100.0, 101.0]
+
+        for i in range(3, 7):
+            ring.push(i, 100.0 + i, 10, i)
+        # Only three slots were free; the last tick is dropped, not overwritten
+        assert ring.dropped == 1
+        batch = ring.drain()
+        assert list(batch['symbol_index']) == [2, 3, 4, 5]
+        assert len(ring) == 0
+
+class TestMarketDataFeed:
+    def test_streams_ticks_for_subscribed_symbols(self, feed_server, feed):
+        feed.start(['RELIANCE.NS', 'TCS.NS', 'UNKNOWN.NS'])
+        assert wait_for(lambda: feed_server.subscribed_tokens() == {'2885', '11536'})
+        assert feed_server.headers[0]['x-feed-token'] == 'feed'
+
+        feed_server.publish('2885', 2456.35, volume=1200, exchange_timestamp=1700000000000)
+        feed_server.publish('11536', 3890.1, volume=300)
+        feed_server.publish('1594', 1500.0)  # Not subscribed
+        assert wait_for(lambda: len(feed.ticks) == 2)
+
+        batch = feed.ticks.drain()
+        assert [feed.symbols[i] for i in batch['symbol_index']] == ['RELIANCE.NS', 'TCS.NS']
+        np.testing.assert_allclose(batch['price'], [2456.35, 3890.1])
+        assert list(batch['volume']) == [1200, 300]
+        assert batch['timestamp'][0] == 1700000000000
+        assert feed.get_ltp('RELIANCE.NS') == pytest.approx(2456.35)
+        assert feed.get_ltp('INFY.NS') is None
+
+    def test_resubscribes_after_reconnect(self, feed_server, feed):
+        feed.start(['RELIANCE.NS'])
+        assert wait_for(lambda: feed_server.subscribed_tokens() == {'2885'})
+        feed.subscribe(['INFY.NS'])
+        assert wait_for(lambda: feed_server.subscribed_tokens() == {'2885', '1594'})
+
+        feed_server.disconnect_all()
+        assert wait_for(lambda: feed_server.connections == 2 and feed_server.subscribed_tokens() == {'2885', '1594'})
+        feed_server.publish('1594', 1501.5)
+        assert wait_for(lambda: feed.get_ltp('INFY.NS') == pytest.approx(1501.5))
+
+    def test_decodes_ltp_mode_packets(self, feed):
+        feed.subscribe(['TCS.NS'])
+        feed._on_packet(encode_tick('11536', 3891.25, mode=MODE_LTP))
+        batch = feed.ticks.drain()
+        assert batch['price'][0] == pytest.approx(3891.25)
+        assert batch['volume'][0] == 0
+
+def ticks(*rows):
+    symbols, prices, volumes, timestamps = zip(*rows)
+    return {
+        'symbol_index': np.array(symbols, dtype=np.int32),
+        'price': np.array(prices, dtype=float),
+        'volume': np.array(volumes, dtype=np.int64),
+        'timestamp': np.array(timestamps, dtype=np.int64)
+    }
+
+class TestBarAggregator:
+    def test_builds_bars_and_emits_on_close(self):
+        aggregator = BarAggregator(['TCS.NS', 'INFY.NS'], intervals=(60,), grace=2)
+        events = []
+        aggregator.on_bar_close(events.append)
+
+        # Unordered within the batch; cumulative volume 100 -> 160 for TCS
+        assert aggregator.update(ticks(
+            (0, 101.0, 130, 20_000),
+            (0, 100.0, 100, 1_000),
+            (1, 50.0, 10, 5_000),
+            (0, 99.5, 160, 59_000),
+            (0, 103.0, 120, 10_000)
+        )) == []
+        # 61s is inside the 2s grace window, so the first minute stays open
+        aggregator.update(ticks((0, 104.0, 170, 61_000)))
+        assert events == []
+
+        closed = aggregator.update(ticks((1, 51.0, 15, 62_500)))
+        assert [(b['symbol'], b['timestamp']) for b in closed] == [('TCS.NS', 0), ('INFY.NS', 0)]
+        assert closed[0] == {
+            'symbol': 'TCS.NS', 'interval': 60, 'timestamp': 0,
+            'open': 100.0, 'high': 103.0, 'low': 99.5, 'close': 99.5, 'volume': 60.0
+        }
+        assert events == closed
+
+    def test_late_ticks_within_grace_are_kept(self):
+        aggregator = BarAggregator(['TCS.NS'], intervals=(60,), grace=2)
+        aggregator.update(ticks((0, 100.0, 0, 30_000), (0, 105.0, 0, 61_000)))
+        # Arrives after a tick from the next minute but within the grace window
+        aggregator.update(ticks((0, 90.0, 0, 59_500)))
+        aggregator.update(ticks((0, 106.0, 0, 70_000)))
+        # Now past the watermark: dropped
+        aggregator.update(ticks((0, 80.0, 0, 59_900)))
+
+        bars = aggregator.to_frame('TCS.NS')
+        assert len(bars) == 1
+        assert bars.iloc[0]['Low'] == 90.0
+        assert bars.iloc[0]['Close'] == 90.0
+        assert aggregator.late_ticks == 1
+
+    def test_frames_feed_the_technical_analyzer(self):
+        rng = np.random.default_rng(1)
+        n = 250 * 20
+        timestamps = np.arange(n) * 3_000
+        aggregator = BarAggregator(['TCS.NS'], intervals=(60,), grace=0)
+        aggregator.update(ticks(*zip(
+            np.zeros(n, dtype=int), 100 + rng.standard_normal(n).cumsum() * 0.1, np.arange(n) * 10, timestamps
+        )))
+        aggregator.flush()
+
+        df = aggregator.to_frame('TCS.NS')
+        assert list(df.columns) == ['Open', 'High', 'Low', 'Close', 'Volume']
+        assert len(df) == 250
+        analysis = TechnicalAnalyzer().analyze_dataframe(df)
+        assert analysis['current_price'] == df['Close'].iloc[-1]
+
+def minute_closes(prices):
+    index = pd.date_range('2024-01-02 09:15', periods=2, freq='1min')
+    columns = pd.MultiIndex.from_product([['Close'], list(prices)])
+    rows = [[p - 1 for p in prices.values()], list(prices.values())]
+    return pd.DataFrame(rows, index=index, columns=columns)
+
+class TestQuoteService:
+    def test_batches_missing_symbols_into_one_download(self):
+        quotes = QuoteService(ttl=60)
+        quotes.update({'TCS.NS': 3890.0})
+        with patch('backend.market_data.quotes.yf.download',
+                   return_value=minute_closes({'INFY.NS': 1501.0, 'SBIN.NS': 601.5})) as download:
+            prices = quotes.get_prices(['TCS.NS', 'INFY.NS', 'SBIN.NS'])
+            # Now served from memory
+            assert quotes.get_price('SBIN.NS') == 601.5
+
+        assert prices == {'TCS.NS': 3890.0, 'INFY.NS': 1501.0, 'SBIN.NS': 601.5}
+        download.assert_called_once()
+        assert download.call_args[0][0] == ['INFY.NS', 'SBIN.NS']
+
+    def test_micro_cache_expires_and_feed_wins(self):
+        feed = SimpleNamespace(get_ltp={'RELIANCE.NS': 2456.35}.get)
+        quotes = QuoteService(feed=feed, ttl=0.05)
+        with patch('backend.market_data.quotes.yf.download',
+                   return_value=minute_closes({'TCS.NS': 3890.0})) as download:
+            assert quotes.get_price('RELIANCE.NS') == 2456.35
+            assert quotes.get_price('TCS.NS') == 3890.0
+            assert quotes.get_price('TCS.NS') == 3890.0
+            assert download.call_count == 1
+            time.sleep(0.06)
+            assert quotes.get_price('TCS.NS') == 3890.0
+            assert download.call_count == 2
+
+    def test_stale_price_when_download_fails(self):
+        quotes = QuoteService()
+        quotes.update({'TCS.NS': 3890.0}, max_age=0)
+        with patch('backend.market_data.quotes.yf.download', side_effect=Exception('timeout')):
+            assert quotes.get_price('TCS.NS') == 3890.0
+            assert quotes.get_price('INFY.NS') is None
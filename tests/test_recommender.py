@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+import pytest
+from backend.fundamental_analysis.cross_section import CrossSection
+from backend.recommendation_engine.recommender import TradeRecommender
+
+@pytest.fixture
+def recommender():
+    return TradeRecommender()
+
+@pytest.fixture
+def universe():
+    rng = np.random.default_rng(3)
+    rows = []
+    for i in range(200):
+        sentiment = {'overall_score': rng.uniform(-1, 1)} if i % 7 else None
+        technical = {
+            'current_price': rng.uniform(100, 3000),
+            'indicators': {
+                'rsi': rng.uniform(10, 90),
+                'macd': {'macd': rng.normal(), 'signal': rng.normal()},
+                'sma': {'20': rng.uniform(90, 110), '50': rng.uniform(90, 110)}
+            }
+        } if i % 11 else None
+        fundamental = {
+            'pe_ratio': rng.uniform(-10, 80),
+            'revenue_growth': rng.uniform(-20, 30),
+            'profit_margins': rng.uniform(-0.1, 0.4)
+        } if i % 5 else {}
+        rows.append((f"SYM{i}.NS", sentiment, technical, fundamental))
+    return rows
+
+class TestTradeRecommenderBatch:
+    def test_batch_matches_scalar(self, recommender, universe):
+        features = pd.DataFrame.from_dict({
+            symbol: TradeRecommender.features_from_analysis(s, t, f) for symbol, s, t, f in universe
+        }, orient='index')
+
+        batch = recommender.get_recommendations_batch(features)
+
+        for symbol, sentiment, technical, fundamental in universe:
+            scalar = recommender.get_recommendation(sentiment, technical, fundamental)
+            row = batch.loc[symbol]
+            assert row['recommendation'] == scalar['recommendation']
+            assert row['confidence'] == pytest.approx(scalar['confidence'])
+            assert row['overall_score'] == pytest.approx(scalar['scores']['overall'])
+            if scalar['target_price'] is None:
+                assert np.isnan(row['target_price']) and np.isnan(row['stop_loss'])
+            else:
+                assert row['target_price'] == pytest.approx(scalar['target_price'])
+                assert row['stop_loss'] == pytest.approx(scalar['stop_loss'])
+
+    def test_uses_current_price(self, recommender):
+        features = pd.DataFrame({
+            'overall_score': [1.0, -1.0],
+            'rsi': [20, 80],
+            'macd': [1, -1], 'macd_signal': [0, 0],
+            'sma_20': [110, 90], 'sma_50': [100, 100],
+            'pe_ratio': [15, 60], 'revenue_growth': [20, -5], 'profit_margins': [0.3, -0.1],
+            'current_price': [2500.0, 800.0]
+        }, index=['TCS.NS', 'PNB.NS'])
+
+        ranked = recommender.rank_universe(features)
+
+        assert ranked.index.tolist() == ['TCS.NS', 'PNB.NS']
+        assert ranked['recommendation'].tolist() == ['BUY', 'SELL']
+        assert ranked.loc['TCS.NS', 'target_price'] == pytest.approx(2750.0)
+        assert ranked.loc['PNB.NS', 'stop_loss'] == pytest.approx(840.0)
+
+    def test_cross_section_replaces_absolute_fundamental_score(self, recommender, universe):
+        features = pd.DataFrame.from_dict({
+            symbol: TradeRecommender.features_from_analysis(s, t, f) for symbol, s, t, f in universe
+        }, orient='index')
+        ranked = {symbol: f for symbol, _, _, f in universe[:100] if f}
+        cross_section = CrossSection.from_metrics(ranked)
+
+        absolute = recommender.get_recommendations_batch(features)
+        relative = recommender.get_recommendations_batch(features, cross_section)
+
+        in_section = features.index.isin(list(ranked))
+        assert relative['fundamental_score'][in_section].tolist() == pytest.approx(
+            cross_section.scores(features.index[in_section]).tolist()
+        )
+        assert relative['fundamental_score'][~in_section].tolist() == absolute['fundamental_score'][~in_section].tolist()
@@ -0,0 +1,295 @@
+import numpy as np
+import pytest
+from unittest.mock import Mock
+from backend.risk_management.calculator import RiskCalculator
+from backend.risk_management.allocator import PortfolioAllocator
+from backend.risk_management.risk_book import PortfolioRiskBook
+from backend.risk_management.var_engine import CovarianceRiskEngine
+from backend.risk_management.stress import MonteCarloStressSimulator
+from backend.recommendations.engine import RecommendationEngine
+
+@pytest.fixture
+def calculator():
+    return RiskCalculator()
+
+@pytest.fixture
+def candidate_trades():
+    rng = np.random.default_rng(7)
+    prices = rng.uniform(50, 5000, 300)
+    stop_losses = prices * rng.uniform(0.8, 1.0, 300)
+    targets = prices * rng.uniform(1.0, 1.3, 300)
+    # Degenerate rows the scalar versions special-case
+    prices[:3] = [0, 100, 250]
+    stop_losses[:3] = [95, 100, 0]
+    return prices, stop_losses, targets
+
+class TestRiskCalculatorBatch:
+    def test_position_sizes_match_scalar(self, calculator, candidate_trades):
+        prices, stop_losses, _ = candidate_trades
+        for portfolio_value in [0, 50000, 1000000, 5000000]:
+            batch = calculator.calculate_position_sizes(prices, stop_losses, portfolio_value)
+            scalar = [calculator.calculate_position_size(p, s, portfolio_value)
+                      for p, s in zip(prices, stop_losses)]
+            assert batch.tolist() == scalar
+
+    def test_risk_reward_ratios_match_scalar(self, calculator, candidate_trades):
+        prices, stop_losses, targets = candidate_trades
+        batch = calculator.calculate_risk_reward_ratios(prices, stop_losses, targets)
+        scalar = [calculator.calculate_risk_reward_ratio(p, s, t)
+                  for p, s, t in zip(prices, stop_losses, targets)]
+        assert batch.tolist() == scalar
+
+    def test_validate_trades_match_scalar(self, calculator, candidate_trades):
+        prices, stop_losses, _ = candidate_trades
+        quantities = calculator.calculate_position_sizes(prices, stop_losses, 1000000) + 5
+        positions = [
+            {'symbol': 'TCS.NS', 'current_price': 3500, 'stop_loss': 3300, 'quantity': 100},
+            {'symbol': 'INFY.NS', 'current_price': 1500, 'quantity': 10}
+        ]
+        for existing in [None, positions]:
+            valid, reasons = calculator.validate_trades(prices, quantities, stop_losses, 1000000, existing)
+            scalar = [calculator.validate_trade(p, q, s, 1000000, existing)
+                      for p, q, s in zip(prices, quantities, stop_losses)]
+            assert valid.tolist() == [ok for ok, _ in scalar]
+            assert reasons.tolist() == [reason for _, reason in scalar]
+
+class TestRecommendationEngine:
+    def _screening_result(self, symbol, price, atr, resistance):
+        return {
+            'symbol': symbol,
+            'signals': [
+                {'type': 'BUY', 'reason': 'MACD bullish crossover', 'strength': 'strong'},
+                {'type': 'BUY', 'reason': 'RSI oversold (25.00)', 'strength': 'medium'}
+            ],
+            'analysis': {
+                'current_price': price,
+                'indicators': {'volatility': {'atr': atr}},
+                'support_resistance': [price * 0.9, resistance]
+            }
+        }
+
+    def test_process_signals_sizes_entries(self):
+        engine = RecommendationEngine()
+        engine.broker = Mock()
+        engine.broker.get_positions.return_value = []
+        engine.broker.get_portfolio_value.return_value = 1000000
+
+        recommendations = engine.process_signals([
+            self._screening_result('TCS.NS', 3500.0, 40.0, 3800.0),
+            # Resistance right above price gives a poor risk-reward and is skipped
+            self._screening_result('INFY.NS', 1500.0, 30.0, 1510.0)
+        ])
+
+        assert [r['symbol'] for r in recommendations] == ['TCS.NS']
+        rec = recommendations[0]
+        assert rec['stop_loss'] == 3420.0
+        assert rec['target'] == 3800.0
+        assert rec['quantity'] == engine.risk_calculator.calculate_position_size(3500.0, 3420.0, 1000000)
+        assert rec['risk_level'] == 'LOW'
+
+class TestPortfolioAllocator:
+    def test_respects_budget_slots_and_priority(self):
+        allocator = PortfolioAllocator(RiskCalculator(), max_active_trades=3, max_position_size=0.1)
+        prices = np.array([100.0, 200.0, 300.0, 400.0, 500.0])
+        stop_losses = prices - 10
+        quantities = np.array([100, 100, 100, 100, 100])
+        priorities = np.array([1, 5, 3, 4, 2])
+        existing = [{'symbol': 'TCS.NS', 'current_price': 3500, 'stop_loss': 3000, 'quantity': 50}]
+
+        # Budget: 5% of 1,000,000 minus 25,000 existing risk = 25,000; one slot is taken
+        allocation = allocator.allocate(prices, stop_losses, quantities, priorities, 1000000, existing)
+
+        assert np.count_nonzero(allocation) == 2
+        assert allocation[1] == 100 and allocation[3] == 100
+        total_risk = (allocation * (prices - stop_losses)).sum() + 25000
+        assert total_risk <= 0.05 * 1000000
+
+    def test_partial_fill_when_budget_binds(self):
+        allocator = PortfolioAllocator(RiskCalculator(), max_active_trades=5, max_position_size=1.0)
+        allocator.risk_calculator.max_position_size = 10 ** 9
+        allocation = allocator.allocate([100.0, 100.0], [50.0, 50.0], [800, 800], [2, 1], 1000000)
+        # 50,000 budget at 50 risk per share
+        assert allocation.tolist() == [800, 200]
+
+class TestPortfolioRiskBook:
+    def test_running_total_matches_full_resum(self):
+        calculator = RiskCalculator()
+        book = PortfolioRiskBook()
+        book.on_fill('TCS.NS', 100, 3500.0, 3300.0)
+        book.on_fill('INFY.NS', 50, 1500.0, 1450.0)
+        book.on_fill('SBIN.NS', 10, 600.0)
+        book.on_price('TCS.NS', 3550.0)
+        book.on_stop_loss('INFY.NS', 1480.0)
+        book.on_fill('TCS.NS', -40)
+        book.on_fill('SBIN.NS', -10)
+
+        positions = [book.get_position(s) for s in ['TCS.NS', 'INFY.NS']]
+        expected = calculator.calculate_portfolio_risk(positions, 1000000)
+
+        assert 'SBIN.NS' not in book
+        assert book.total_risk == pytest.approx(60 * 250 + 50 * 20)
+        assert calculator.calculate_portfolio_risk(book, 1000000) == pytest.approx(expected)
+
+    def test_validate_trade_accepts_book(self):
+        calculator = RiskCalculator()
+        book = PortfolioRiskBook([{'symbol': 'TCS.NS', 'current_price': 3500, 'stop_loss': 3000, 'quantity': 90}])
+        ok, reason = calculator.validate_trade(100, 100, 95, 1000000, book)
+        assert ok
+        ok, reason = calculator.validate_trade(100, 100, 30, 1000000, book)
+        assert not ok
+        assert reason == "Total portfolio risk would exceed maximum limit"
+
+    def test_reconcile_matches_broker_positions(self):
+        book = PortfolioRiskBook()
+        book.on_fill('TCS.NS', 100, 3500.0, 3300.0)
+        book.on_fill('INFY.NS', 50, 1500.0, 1450.0)
+        book.reconcile([
+            {'symbol': 'TCS.NS', 'quantity': 60, 'current_price': 3400.0},
+            {'symbol': 'SBIN.NS', 'quantity': 10, 'current_price': 600.0, 'stop_loss': 580.0}
+        ])
+
+        assert 'INFY.NS' not in book
+        assert book.get_position('TCS.NS') == {'symbol': 'TCS.NS', 'quantity': 60, 'current_price': 3400.0, 'stop_loss': 3300.0}
+        assert book.total_risk == pytest.approx(60 * 100 + 10 * 20)
+
+class TestCovarianceRiskEngine:
+    @pytest.fixture
+    def returns(self):
+        rng = np.random.default_rng(11)
+        covariance = np.array([[4.0, 3.0, 0.0], [3.0, 4.0, 0.0], [0.0, 0.0, 1.0]]) * 1e-4
+        return rng.multivariate_normal(np.zeros(3), covariance, size=400)
+
+    def test_incremental_update_matches_batch_seed(self, returns):
+        symbols = ['HDFCBANK.NS', 'ICICIBANK.NS', 'TCS.NS']
+        incremental = CovarianceRiskEngine(symbols, history=100)
+        for row in returns:
+            incremental.update_returns(row)
+        seeded = CovarianceRiskEngine(symbols, history=100)
+        seeded.seed(returns)
+
+        np.testing.assert_allclose(incremental.covariance, seeded.covariance)
+        assert incremental.correlation()[0, 1] > 0.5
+        assert incremental.historical_var({'TCS.NS': 1e6}) == pytest.approx(seeded.historical_var({'TCS.NS': 1e6}))
+
+    def test_parametric_var_and_pre_trade_check(self, returns):
+        engine = CovarianceRiskEngine(['HDFCBANK.NS', 'ICICIBANK.NS', 'TCS.NS'], decay=0.97)
+        engine.seed(returns)
+        covariance = engine.covariance
+        book = {'HDFCBANK.NS': 500000, 'TCS.NS': 200000}
+
+        expected = 2.3263478740408408 * np.sqrt(np.array([5e5, 0, 2e5]) @ covariance @ np.array([5e5, 0, 2e5]))
+        assert engine.parametric_var(book) == pytest.approx(expected)
+
+        # A correlated bank adds more VaR than the same notional in TCS
+        _, with_bank = engine.pre_trade_check(book, {'ICICIBANK.NS': 300000}, var_limit=1e9)
+        _, with_tcs = engine.pre_trade_check(book, {'TCS.NS': 300000}, var_limit=1e9)
+        assert with_bank > with_tcs
+        passed, _ = engine.pre_trade_check(book, {'ICICIBANK.NS': 300000}, var_limit=with_tcs)
+        assert not passed
+
+class TestMonteCarloStressSimulator:
+    def test_reproducible_across_worker_counts(self):
+        positions = [
+            {'symbol': 'HDFCBANK.NS', 'quantity': 100, 'current_price': 1600.0, 'stop_loss': 1520.0},
+            {'symbol': 'ICICIBANK.NS', 'quantity': 150, 'current_price': 1000.0}
+        ]
+        covariance = np.array([[4.0, 3.0], [3.0, 4.0]]) * 1e-4
+
+        inline = MonteCarloStressSimulator(n_paths=3000, horizon=5, block_size=1000, workers=1, seed=42)
+        pooled = MonteCarloStressSimulator(n_paths=3000, horizon=5, block_size=1000, workers=2, seed=42)
+        first = inline.run(positions, covariance, portfolio_value=1000000)
+        second = pooled.run(positions, covariance, portfolio_value=1000000)
+
+        np.testing.assert_array_equal(first['losses'], second['losses'])
+        np.testing.assert_array_equal(first['max_drawdowns'], second['max_drawdowns'])
+        assert first['summary']['paths'] == 3000
+        assert first['summary']['var_99'] >= first['summary']['var_95']
+        assert (first['max_drawdowns'] >= np.maximum(first['losses'], 0) - 1e-9).all()
+
+    def test_stop_loss_caps_losses(self):
+        positions = [{'symbol': 'TCS.NS', 'quantity': 10, 'current_price': 100.0, 'stop_loss': 95.0}]
+        simulator = MonteCarloStressSimulator(n_paths=2000, horizon=20, block_size=500, workers=1, seed=1)
+        capped = simulator.run(positions, [[1e-4]])
+        uncapped = simulator.run([dict(positions[0], stop_loss=None)], [[1e-4]])
+
+        assert capped['losses'].max() < uncapped['losses'].max()
+        assert capped['summary']['mean_stop_outs'] > 0
+
+class TestRecommendationExecution:
+    def test_submit_runs_through_order_queue(self):
+        engine = RecommendationEngine()
+        engine.risk_book = PortfolioRiskBook()
+        engine.active_recommendations = [{
+            'id': 'REC_TCS', 'symbol': 'TCS.NS', 'action': 'BUY', 'quantity': 10,
+            'priority': 5, 'entry_price': 3500.0, 'stop_loss': 3420.0, 'target': 3800.0
+        }]
+
+        tracking_id = engine.submit_recommendation('REC_TCS')
+        assert engine.submit_recommendation('REC_TCS') == tracking_id
+        engine.order_queue.stop()
+
+        job = engine.get_execution_status(tracking_id)
+        assert job['status'] == 'COMPLETED'
+        assert job['result']['trade']['order_id'] == 'mock_order_123'
+        assert engine.active_recommendations == []
+        assert engine.risk_book.total_risk == pytest.approx(800.0)
+
+    def test_closed_positions_free_the_allocator(self):
+        engine = RecommendationEngine()
+        held = ['TCS.NS', 'INFY.NS', 'SBIN.NS', 'ITC.NS', 'HDFCBANK.NS']
+        for symbol in held:
+            engine.risk_book.on_fill(symbol, 10, 1000.0, 950.0)
+        signal = {
+            'symbol': 'WIPRO.NS',
+            'signals': [{'type': 'BUY', 'strength': 'strong', 'reason': 'Breakout'}],
+            'analysis': {'current_price': 500.0, 'indicators': {'volatility': {'atr': 10.0}}}
+        }
+
+        # Every slot is taken until the broker reports the positions closed
+        engine.broker = Mock()
+        engine.broker.get_portfolio_value.return_value = 1000000
+        engine.broker.get_positions.return_value = [{'symbol': s, 'quantity': 10, 'current_price': 1000.0} for s in held]
+        assert engine.process_signals([signal]) == []
+
+        engine.broker.get_positions.return_value = [{'symbol': 'TCS.NS', 'quantity': 10, 'current_price': 1010.0}]
+        recommendations = engine.process_signals([signal])
+        assert [r['symbol'] for r in recommendations] == ['WIPRO.NS']
+        assert len(engine.risk_book) == 1
+        assert engine.risk_book.total_risk == pytest.approx(10 * 60)
+
+        engine.update_stop_loss('TCS.NS', 1000.0)
+        assert engine.risk_book.total_risk == pytest.approx(10 * 10)
+        engine.order_queue.stop()
+
+    def test_execute_recommendations_as_basket(self):
+        engine = RecommendationEngine()
+        engine.active_recommendations = [
+            {'id': f'REC_{s}', 'symbol': s, 'action': 'BUY', 'quantity': 5, 'priority': 3}
+            for s in ['TCS.NS', 'INFY.NS']
+        ]
+        result = engine.execute_recommendations(['REC_TCS.NS', 'REC_INFY.NS'])
+
+        assert result['status'] == 'success'
+        assert [t['symbol'] for t in result['trades']] == ['TCS.NS', 'INFY.NS']
+        assert engine.active_recommendations == []
+
+    def test_basket_claims_recommendations_and_shares_the_queue_rate_limit(self):
+        engine = RecommendationEngine()
+        engine.active_recommendations = [
+            {'id': f'REC_{s}', 'symbol': s, 'action': 'BUY', 'quantity': 5, 'priority': 3}
+            for s in ['TCS.NS', 'BAD.NS']
+        ]
+        engine.broker = Mock()
+        engine.broker.place_basket_order.return_value = {'status': 'partial', 'results': [
+            {'symbol': 'TCS.NS', 'status': 'success', 'order': {'order_id': '1'}},
+            {'symbol': 'BAD.NS', 'status': 'error', 'error': 'Invalid symbol'}
+        ]}
+
+        result = engine.execute_recommendations(['REC_TCS.NS', 'REC_BAD.NS'])
+        assert engine.broker.place_basket_order.call_args.kwargs['rate_limiter'] is engine.order_queue.rate_limiter
+        assert [t['symbol'] for t in result['trades']] == ['TCS.NS']
+
+        # The executed recommendation cannot be placed again; the failed one can be retried
+        with pytest.raises(ValueError):
+            engine.submit_recommendation('REC_TCS.NS')
+        assert [r['id'] for r in engine.active_recommendations] == ['REC_BAD.NS']